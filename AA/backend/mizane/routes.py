@@ -2,10 +2,10 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 import urllib.request
 from calendar import monthrange
 from contextlib import closing
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Sequence, Tuple
@@ -15,13 +15,27 @@ import psycopg2
 import requests
 from psycopg2.extras import RealDictCursor, register_default_json, register_default_jsonb
 from flask import Blueprint, jsonify, request
-from sentence_transformers import SentenceTransformer
 import sys
 from pathlib import Path
 # Add project root to path to import from shared/
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent))
-from shared.r2_storage import build_public_url, generate_presigned_url, get_r2_session
+from shared.r2_storage import generate_presigned_url, get_r2_reader
 from shared.postgres import get_connection_simple
+from shared.embedding_index import (
+    EmbeddingIndex,
+    RefreshThrottle,
+    build_index,
+    collect_items,
+    get_snapshot_dir,
+    load_snapshot,
+    save_snapshot,
+    snapshot_version,
+    top_k_indices,
+)
+from shared.ann_index import AnnCache, resolve_search_mode
+from shared.pgvector_store import count_embedded, nearest, pgvector_enabled
+from shared.query_encoder import QueryEncoder
+from shared.model_registry import DEFAULT_MODEL, get_model, warm_up
 
 mizane_bp = Blueprint("mizane", __name__)
 
@@ -30,77 +44,33 @@ register_default_json(loads=json.loads, globally=True)
 register_default_jsonb(loads=json.loads, globally=True)
 
 DEFAULT_LIMIT = 20
-_R2_SESSION = get_r2_session()
+_R2 = get_r2_reader()
 
 VALID_SORT_FIELDS = {"date", "year", "number"}
 VALID_SORT_ORDER = {"asc", "desc"}
-_CS_EMBED_MODEL = None
-_CS_EMBED_CACHE = None
-_JORADP_EMBED_CACHE = None
-_WARMED_UP = False
-_WARM_LOCK = False
+CS_INDEX_FIELDS = (
+    "decision_number",
+    "publication_date",
+    "url",
+    "file_path_fr",
+    "file_path_ar",
+    "text_path_fr",
+    "text_path_ar",
+)
+JORADP_INDEX_FIELDS = ("publication_date", "url", "file_path", "text_path")
+_EMBED_INDEXES: Dict[str, EmbeddingIndex] = {}
+_EMBED_LOCKS = {"cour_supreme": threading.Lock(), "joradp": threading.Lock()}
+_EMBED_REFRESH = {"cour_supreme": RefreshThrottle(), "joradp": RefreshThrottle()}
+# Snapshots et index ANN préfixés "aa_" : BB indexe d'autres colonnes sous les mêmes corpus.
+SNAPSHOT_PREFIX = "aa_"
+_EMBED_ANN = {corpus: AnnCache(SNAPSHOT_PREFIX + corpus) for corpus in ("cour_supreme", "joradp")}
+_WARM_STARTED = False
+_WARM_GUARD = threading.Lock()
 CACHE_DIR = os.getenv("EMBED_CACHE_DIR")
 
 
-def _get_cache_file(corpus: str) -> Path | None:
-    if not CACHE_DIR:
-        return None
-    try:
-        path = Path(CACHE_DIR).expanduser().resolve()
-        path.mkdir(parents=True, exist_ok=True)
-        return path / f"{corpus}_embed_cache_v1.json"
-    except Exception:
-        return None
-
-
-def _load_cache_from_disk(corpus: str):
-    cache_file = _get_cache_file(corpus)
-    if not cache_file or not cache_file.exists():
-        return None
-    try:
-        with cache_file.open("r", encoding="utf-8") as f:
-            payload = json.load(f)
-        items = []
-        for raw in payload.get("items", []):
-            vec = raw.get("vector")
-            if vec is None:
-                continue
-            arr = np.array(vec, dtype=np.float32)
-            if arr.size == 0:
-                continue
-            norm = np.linalg.norm(arr)
-            if norm == 0:
-                continue
-            arr = arr / norm
-            raw["vector"] = arr
-            items.append(raw)
-        return items
-    except Exception:
-        return None
-
-
-def _persist_cache_to_disk(corpus: str, items: List[Dict[str, Any]]):
-    cache_file = _get_cache_file(corpus)
-    if not cache_file:
-        return
-    try:
-        serializable: List[Dict[str, Any]] = []
-        for row in items:
-            vec = row.get("vector")
-            if vec is None:
-                continue
-            serializable.append(
-                {
-                    **{k: v for k, v in row.items() if k != "vector"},
-                    "vector": vec.tolist() if isinstance(vec, np.ndarray) else vec,
-                }
-            )
-        tmp_path = cache_file.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump({"items": serializable, "created_at": datetime.utcnow().isoformat()}, f)
-        tmp_path.replace(cache_file)
-    except Exception:
-        return
+def _get_snapshot_dir() -> Path | None:
+    return get_snapshot_dir(Path(CACHE_DIR) if CACHE_DIR else None)
 
 
 def get_connection():
@@ -151,29 +121,11 @@ def _serialize_date(value: Any) -> Any:
 
 
 def _get_embedding_model():
-    global _CS_EMBED_MODEL
-    if _CS_EMBED_MODEL is None:
-        _CS_EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-    return _CS_EMBED_MODEL
-
+    return get_model()
 
-def _build_embedding_url(raw_path: str | None) -> str | None:
-    if not raw_path:
-        return None
-    signed = generate_presigned_url(raw_path)
-    if signed:
-        return signed
-    return build_public_url(raw_path)
 
-
-def _download_embedding(url: str) -> bytes | None:
-    try:
-        resp = _R2_SESSION.get(url, timeout=20)
-        if resp.ok:
-            return resp.content
-    except Exception:
-        return None
-    return None
+# Vecteurs de requêtes : cache LRU + encodage groupé des requêtes concurrentes.
+_QUERY_ENCODER = QueryEncoder(_get_embedding_model, DEFAULT_MODEL)
 
 
 def _decode_embedding(blob: bytes | None) -> np.ndarray | None:
@@ -260,83 +212,58 @@ def _build_filters(config: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
     return where, params
 
 
-def _load_cour_supreme_embeddings_cache():
-    global _CS_EMBED_CACHE
-    if _CS_EMBED_CACHE is not None:
-        return _CS_EMBED_CACHE
-    disk_cache = _load_cache_from_disk("cour_supreme")
-    if disk_cache is not None:
-        _CS_EMBED_CACHE = disk_cache
-        return _CS_EMBED_CACHE
-    _warm_cache_async()
+def _fetch_embedding_vector(raw_path: str) -> np.ndarray | None:
+    return _decode_embedding(_R2.get(raw_path, timeout=20))
 
-    cache: List[Dict[str, Any]] = []
-    with closing(get_connection()) as conn, conn.cursor() as cur:
-        cur.execute(
-            """
+
+# Requêtes de chargement par corpus ; `{where}` reçoit le filtre de rafraîchissement incrémental.
+_EMBED_CORPORA: Dict[str, Dict[str, Any]] = {
+    "cour_supreme": {
+        "fields": CS_INDEX_FIELDS,
+        "source": lambda row: row.get("embeddings_fr_r2") or row.get("embeddings_ar_r2"),
+        "changed_at": "updated_at",
+        "select": """
             SELECT
                 id,
                 decision_number,
                 COALESCE(decision_date, created_at) AS publication_date,
                 url,
-                file_path_fr_r2,
-                file_path_ar_r2,
-                html_content_fr_r2,
-                html_content_ar_r2,
+                file_path_fr_r2 AS file_path_fr,
+                file_path_ar_r2 AS file_path_ar,
+                html_content_fr_r2 AS text_path_fr,
+                html_content_ar_r2 AS text_path_ar,
                 embeddings_fr_r2,
                 embeddings_ar_r2
             FROM supreme_court_decisions
+            WHERE (embeddings_fr_r2 IS NOT NULL OR embeddings_ar_r2 IS NOT NULL) {where}
+        """,
+        "stamp": """
+            SELECT COUNT(*) AS row_count, MAX(updated_at) AS updated_at
+            FROM supreme_court_decisions
             WHERE embeddings_fr_r2 IS NOT NULL OR embeddings_ar_r2 IS NOT NULL
-            """
-        )
-        rows = cur.fetchall()
-
-    def worker(row: Dict[str, Any]):
-        emb_url = _build_embedding_url(row.get("embeddings_fr_r2") or row.get("embeddings_ar_r2"))
-        if not emb_url:
-            return None
-        blob = _download_embedding(emb_url)
-        vec = _decode_embedding(blob)
-        if vec is None:
-            return None
-        return {
-            "id": row["id"],
-            "decision_number": row.get("decision_number"),
-            "publication_date": _serialize_date(row.get("publication_date")),
-            "url": row.get("url"),
-            "file_path_fr": row.get("file_path_fr_r2"),
-            "file_path_ar": row.get("file_path_ar_r2"),
-            "text_path_fr": row.get("html_content_fr_r2"),
-            "text_path_ar": row.get("html_content_ar_r2"),
-            "vector": vec,
-        }
-
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = [executor.submit(worker, row) for row in rows]
-        for fut in as_completed(futures):
-            item = fut.result()
-            if item:
-                cache.append(item)
-
-    _CS_EMBED_CACHE = cache
-    _persist_cache_to_disk("cour_supreme", cache)
-    return _CS_EMBED_CACHE
-
-
-def _load_joradp_embeddings_cache():
-    global _JORADP_EMBED_CACHE
-    if _JORADP_EMBED_CACHE is not None:
-        return _JORADP_EMBED_CACHE
-    disk_cache = _load_cache_from_disk("joradp")
-    if disk_cache is not None:
-        _JORADP_EMBED_CACHE = disk_cache
-        return _JORADP_EMBED_CACHE
-    _warm_cache_async()
-
-    cache: List[Dict[str, Any]] = []
-    with closing(get_connection()) as conn, conn.cursor() as cur:
-        cur.execute(
-            """
+        """,
+        "live_ids": """
+            SELECT id FROM supreme_court_decisions
+            WHERE embeddings_fr_r2 IS NOT NULL OR embeddings_ar_r2 IS NOT NULL
+        """,
+        "table": "supreme_court_decisions",
+        "date": "COALESCE(decision_date, created_at)",
+        "columns": (
+            "id",
+            "decision_number",
+            "COALESCE(decision_date, created_at) AS publication_date",
+            "url",
+            "file_path_fr_r2 AS file_path_fr",
+            "file_path_ar_r2 AS file_path_ar",
+            "html_content_fr_r2 AS text_path_fr",
+            "html_content_ar_r2 AS text_path_ar",
+        ),
+    },
+    "joradp": {
+        "fields": JORADP_INDEX_FIELDS,
+        "source": lambda row: row.get("embeddings_r2"),
+        "changed_at": "GREATEST(d.updated_at, d.embedded_at)",
+        "select": """
             SELECT
                 d.id,
                 COALESCE(d.publication_date, d.created_at) AS publication_date,
@@ -345,94 +272,249 @@ def _load_joradp_embeddings_cache():
                 d.text_path_r2 AS text_path,
                 d.embeddings_r2
             FROM joradp_documents d
+            WHERE d.embeddings_r2 IS NOT NULL {where}
+        """,
+        "stamp": """
+            SELECT COUNT(*) AS row_count, MAX(GREATEST(d.updated_at, d.embedded_at)) AS updated_at
+            FROM joradp_documents d
             WHERE d.embeddings_r2 IS NOT NULL
-            """
-        )
-        rows = cur.fetchall()
+        """,
+        "live_ids": "SELECT id FROM joradp_documents WHERE embeddings_r2 IS NOT NULL",
+        "table": "joradp_documents",
+        "date": "COALESCE(publication_date, created_at)",
+        "columns": (
+            "id",
+            "COALESCE(publication_date, created_at) AS publication_date",
+            "url",
+            "file_path_r2 AS file_path",
+            "text_path_r2 AS text_path",
+        ),
+    },
+}
+
+
+def _fetch_embedding_rows(cur, corpus: str, watermark: str | None = None) -> List[Dict[str, Any]]:
+    config = _EMBED_CORPORA[corpus]
+    if watermark is None:
+        cur.execute(config["select"].format(where=""))
+    else:
+        cur.execute(config["select"].format(where=f"AND {config['changed_at']} >= %s"), (watermark,))
+    return [
+        {**row, "publication_date": _serialize_date(row.get("publication_date"))}
+        for row in cur.fetchall()
+    ]
 
-    def worker(row: Dict[str, Any]):
-        emb_url = _build_embedding_url(row.get("embeddings_r2"))
-        if not emb_url:
-            return None
-        blob = _download_embedding(emb_url)
-        vec = _decode_embedding(blob)
-        if vec is None:
-            return None
-        return {
-            "id": row["id"],
-            "publication_date": _serialize_date(row.get("publication_date")),
-            "url": row.get("url"),
-            "file_path": row.get("file_path"),
-            "text_path": row.get("text_path"),
-            "vector": vec,
-        }
 
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = [executor.submit(worker, row) for row in rows]
-        for fut in as_completed(futures):
-            item = fut.result()
-            if item:
-                cache.append(item)
+def _load_embeddings_index(corpus: str) -> EmbeddingIndex:
+    """
+    Index d'un corpus : snapshot disque si présent (rattrapé ensuite par le
+    rafraîchissement incrémental), sinon chargement complet depuis R2.
+    """
+    index = _EMBED_INDEXES.get(corpus)
+    if index is not None:
+        return index
+    with _EMBED_LOCKS[corpus]:
+        index = _EMBED_INDEXES.get(corpus)
+        if index is not None:
+            return index
+        snapshot_dir = _get_snapshot_dir()
+        config = _EMBED_CORPORA[corpus]
+        index = load_snapshot(snapshot_dir, SNAPSHOT_PREFIX + corpus, config["fields"])
+        if index is None:
+            with closing(get_connection()) as conn, conn.cursor() as cur:
+                cur.execute(config["stamp"])
+                stamp = cur.fetchone()
+                rows = _fetch_embedding_rows(cur, corpus)
+            index, _ = build_index(
+                rows,
+                config["fields"],
+                source_of=config["source"],
+                fetch_vector=_fetch_embedding_vector,
+                max_workers=12,
+            )
+            index.version = snapshot_version(stamp["row_count"], stamp["updated_at"])
+            save_snapshot(index, snapshot_dir, SNAPSHOT_PREFIX + corpus)
+        _EMBED_INDEXES[corpus] = index
+        return index
 
-    _JORADP_EMBED_CACHE = cache
-    _persist_cache_to_disk("joradp", cache)
-    return _JORADP_EMBED_CACHE
 
+def _refresh_embeddings_index(corpus: str) -> int:
+    """
+    Fusionne dans l'index les lignes modifiées depuis son watermark
+    (seuls les vecteurs dont le chemin R2 a changé sont téléchargés).
+    Retourne le nombre de lignes fusionnées.
+    """
+    index = _EMBED_INDEXES.get(corpus)
+    if index is None:
+        return 0
+    config = _EMBED_CORPORA[corpus]
+    with closing(get_connection()) as conn, conn.cursor() as cur:
+        cur.execute(config["stamp"])
+        stamp = cur.fetchone()
+        version = snapshot_version(stamp["row_count"], stamp["updated_at"])
+        if version == index.version:
+            return 0
+        rows = _fetch_embedding_rows(cur, corpus, index.watermark)
+        live_ids = None
+        if len(index) + len(rows) > version["rows"]:
+            cur.execute(config["live_ids"])
+            live_ids = {row["id"] for row in cur.fetchall()}
+
+    items, _ = collect_items(
+        rows,
+        config["fields"],
+        source_of=config["source"],
+        fetch_vector=_fetch_embedding_vector,
+        previous=index,
+        max_workers=12,
+    )
+    with _EMBED_LOCKS[corpus]:
+        current = _EMBED_INDEXES[corpus]
+        drop_ids = [] if live_ids is None else [i for i in current.ids.tolist() if i not in live_ids]
+        updated = current.upsert(items, drop_ids)
+        updated.version = version
+        _EMBED_INDEXES[corpus] = updated
+    save_snapshot(updated, _get_snapshot_dir(), SNAPSHOT_PREFIX + corpus)
+    return len(items)
 
-def _warm_cache_async():
-    global _WARMED_UP, _WARM_LOCK
-    if _WARMED_UP or _WARM_LOCK:
-        return
-    _WARM_LOCK = True
 
-    def worker():
-        try:
-            _load_joradp_embeddings_cache()
-            _load_cour_supreme_embeddings_cache()
-        finally:
-            _WARMED_UP = True
-            _WARM_LOCK = False
+def _load_cour_supreme_embeddings_cache() -> EmbeddingIndex:
+    index = _load_embeddings_index("cour_supreme")
+    _EMBED_REFRESH["cour_supreme"].trigger(lambda: _refresh_embeddings_index("cour_supreme"))
+    return index
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        executor.submit(worker)
 
+def _load_joradp_embeddings_cache() -> EmbeddingIndex:
+    index = _load_embeddings_index("joradp")
+    _EMBED_REFRESH["joradp"].trigger(lambda: _refresh_embeddings_index("joradp"))
+    return index
 
-def _semantic_search_cour_supreme(query: str, limit: int = 50, score_threshold: float = 0.0) -> List[Dict[str, Any]]:
-    model = _get_embedding_model()
-    if model is None:
-        raise RuntimeError("Modèle d'embedding indisponible")
 
-    cache = _load_cour_supreme_embeddings_cache()
-    if not cache:
-        return []
+def _warm_cache_async():
+    """Charge le modèle puis les deux index en arrière-plan (sans bloquer l'appelant)."""
+    global _WARM_STARTED
+    with _WARM_GUARD:
+        if _WARM_STARTED:
+            return
+        _WARM_STARTED = True
 
-    q_vec = model.encode(query, convert_to_numpy=True)
-    norm = np.linalg.norm(q_vec)
-    if norm == 0:
-        return []
-    q_vec = q_vec / norm
+    def worker():
+        try:
+            warm_up()
+        except Exception as exc:
+            print(f"⚠️ Pré-chargement du modèle d'embedding échoué: {exc}")
+        # En mode pgvector, aucun index n'est chargé en mémoire.
+        if pgvector_enabled():
+            return
+        for loader in (_load_joradp_embeddings_cache, _load_cour_supreme_embeddings_cache):
+            try:
+                loader()
+            except Exception as exc:
+                print(f"⚠️ Pré-chargement embeddings échoué ({loader.__name__}): {exc}")
+
+    threading.Thread(target=worker, name="embeddings-warmup", daemon=True).start()
+
+
+def _semantic_date_bounds(payload: Dict[str, Any]) -> Tuple[str | None, str | None]:
+    """Bornes ISO des filtres `year` / `from` / `to` (mêmes paramètres que les listes)."""
+    year = str(payload.get("year") or "").strip()
+    start = _parse_date(str(payload.get("from") or ""))
+    end = _parse_date(str(payload.get("to") or ""), is_end=True)
+    year_start, year_end = _parse_date(year), _parse_date(year, is_end=True)
+    if year_start:
+        start = max(start, year_start) if start else year_start
+        end = min(end, year_end) if end else year_end
+    return start, end
+
+
+def _rank_with_pgvector(
+    corpus: str, q_vec: np.ndarray, limit: int, start: str | None, end: str | None
+) -> List[Dict[str, Any]]:
+    config = _EMBED_CORPORA[corpus]
+    where: List[str] = []
+    params: List[Any] = []
+    if start:
+        where.append(f"{config['date']} >= %s")
+        params.append(start)
+    if end:
+        where.append(f"{config['date']} <= %s")
+        params.append(end)
+    with closing(get_connection()) as conn, conn.cursor() as cur:
+        if not limit or limit <= 0:
+            limit = max(count_embedded(cur, config["table"]), 1)
+        rows = nearest(cur, config["table"], config["columns"], q_vec, limit, where, params)
+    for row in rows:
+        row["publication_date"] = _serialize_date(row.get("publication_date"))
+        row["score"] = float(row["score"])
+    return rows
+
+
+def _rank_index(
+    corpus: str,
+    query: str,
+    limit: int,
+    score_threshold: float,
+    mode: str = "exact",
+    filters: Dict[str, Any] | None = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    q_vec = _QUERY_ENCODER.encode(query)
+    if q_vec is None:
+        return [], mode
+    start, end = _semantic_date_bounds(filters or {})
+
+    if pgvector_enabled():
+        scored = _rank_with_pgvector(corpus, q_vec, limit, start, end)
+        if score_threshold:
+            scored = [row for row in scored if row["score"] >= score_threshold]
+        return scored, "pgvector"
+
+    if corpus == "cour_supreme":
+        index = _load_cour_supreme_embeddings_cache()
+    else:
+        index = _load_joradp_embeddings_cache()
+    if not len(index):
+        return [], mode
+
+    # Filtre de dates en masque : seules les lignes retenues sont scorées.
+    subset = None
+    if start or end:
+        subset = np.flatnonzero(index.date_mask("publication_date", start, end))
+    total = len(index) if subset is None else int(subset.size)
+
+    k = limit if limit and limit > 0 else total
+    hits = None
+    if mode == "ann" and subset is None and k < total:
+        hits = _EMBED_ANN[corpus].search(index, q_vec, k, _get_snapshot_dir())
+    if hits is not None:
+        top, top_scores = hits
+    else:
+        # Calcul exact (filtre actif, ou index ANN pas encore prêt).
+        mode = "exact"
+        scores = index.scores(q_vec, subset)
+        top = top_k_indices(scores, k)
+        top_scores = scores[top]
+        if subset is not None:
+            top = subset[top]
+    if score_threshold:
+        keep = top_scores >= score_threshold
+        top, top_scores = top[keep], top_scores[keep]
 
     scored: List[Dict[str, Any]] = []
-    for item in cache:
-        score = float(np.dot(q_vec, item["vector"]))
-        if score_threshold and score < score_threshold:
-            continue
-        entry = {
-            "id": item["id"],
-            "decision_number": item.get("decision_number"),
-            "publication_date": _serialize_date(item.get("publication_date")),
-            "url": item.get("url"),
-            "file_path_fr": item.get("file_path_fr"),
-            "file_path_ar": item.get("file_path_ar"),
-            "text_path_fr": item.get("text_path_fr"),
-            "text_path_ar": item.get("text_path_ar"),
-            "score": score,
-        }
-        scored.append(entry)
+    for pos, score in zip(top.tolist(), top_scores.tolist()):
+        row = index.row(pos)
+        row["score"] = float(score)
+        scored.append(row)
+    return scored, mode
+
 
-    scored.sort(key=lambda x: x.get("score") or 0.0, reverse=True)
-    if limit and limit > 0:
-        scored = scored[:limit]
+def _semantic_search_cour_supreme(
+    query: str,
+    limit: int = 50,
+    score_threshold: float = 0.0,
+    mode: str = "exact",
+    filters: Dict[str, Any] | None = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    scored, mode = _rank_index("cour_supreme", query, limit, score_threshold, mode, filters)
 
     labels = _fetch_classification_labels([item["id"] for item in scored])
     for row in scored:
@@ -451,48 +533,23 @@ def _semantic_search_cour_supreme(query: str, limit: int = 50, score_threshold:
         row["text_path_signed"] = generate_presigned_url(row.get("text_path"))
         row["text_path_fr_signed"] = generate_presigned_url(row.get("text_path_fr"))
         row["text_path_ar_signed"] = generate_presigned_url(row.get("text_path_ar"))
-    return scored
+    return scored, mode
 
 
-def _semantic_search_joradp(query: str, limit: int = 50, score_threshold: float = 0.0) -> List[Dict[str, Any]]:
-    model = _get_embedding_model()
-    if model is None:
-        raise RuntimeError("Modèle d'embedding indisponible")
-
-    cache = _load_joradp_embeddings_cache()
-    if not cache:
-        return []
-
-    q_vec = model.encode(query, convert_to_numpy=True)
-    norm = np.linalg.norm(q_vec)
-    if norm == 0:
-        return []
-    q_vec = q_vec / norm
-
-    scored: List[Dict[str, Any]] = []
-    for item in cache:
-        score = float(np.dot(q_vec, item["vector"]))
-        if score_threshold and score < score_threshold:
-            continue
-        row = {
-            "id": item["id"],
-            "publication_date": _serialize_date(item.get("publication_date")),
-            "url": item.get("url"),
-            "file_path": item.get("file_path"),
-            "text_path": item.get("text_path"),
-            "score": score,
-        }
-        scored.append(row)
-
-    scored.sort(key=lambda x: x.get("score") or 0.0, reverse=True)
-    if limit and limit > 0:
-        scored = scored[:limit]
+def _semantic_search_joradp(
+    query: str,
+    limit: int = 50,
+    score_threshold: float = 0.0,
+    mode: str = "exact",
+    filters: Dict[str, Any] | None = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    scored, mode = _rank_index("joradp", query, limit, score_threshold, mode, filters)
 
     # URLs signées pour le front
     for row in scored:
         row["file_path_signed"] = generate_presigned_url(row.get("file_path"))
         row["text_path_signed"] = generate_presigned_url(row.get("text_path"))
-    return scored
+    return scored, mode
 
 
 def _fetch_classification_labels(decision_ids: List[int]) -> Dict[int, Dict[str, str]]:
@@ -818,6 +875,7 @@ def semantic_search():
     query = (payload.get("query") or "").strip()
     limit = int(payload.get("limit") or 50)
     score_threshold = float(payload.get("score_threshold") or 0.0)
+    mode = resolve_search_mode(payload.get("mode"))
     if not query:
         return jsonify({"query": query, "results": [], "message": "Saisissez une question."})
 
@@ -825,10 +883,14 @@ def semantic_search():
 
     try:
         if corpus == "cour_supreme":
-            results = _semantic_search_cour_supreme(query, limit=limit, score_threshold=score_threshold)
-            return jsonify(query=query, results=results, count=len(results))
+            results, mode = _semantic_search_cour_supreme(
+                query, limit=limit, score_threshold=score_threshold, mode=mode, filters=payload
+            )
+            return jsonify(query=query, results=results, count=len(results), mode=mode)
         else:
-            results = _semantic_search_joradp(query, limit=limit, score_threshold=score_threshold)
-            return jsonify(query=query, results=results, count=len(results))
+            results, mode = _semantic_search_joradp(
+                query, limit=limit, score_threshold=score_threshold, mode=mode, filters=payload
+            )
+            return jsonify(query=query, results=results, count=len(results), mode=mode)
     except Exception as e:
         return jsonify({"error": str(e), "query": query, "results": []}), 500
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from pathlib import Path
 
 # Add project root to Python path for shared module
@@ -10,12 +11,16 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 
 # Import des modules
-from modules.joradp.routes import joradp_bp
-from modules.coursupreme.routes import coursupreme_bp
+from modules.joradp.routes import joradp_bp, _load_embeddings_cache as _load_joradp_embeddings
+from modules.coursupreme.routes import coursupreme_bp, _load_cs_embeddings_cache
+from shared.pgvector_store import pgvector_enabled
+from shared.model_registry import model_stats, warm_up
+from shared.r2_storage import get_r2_reader
 
 # Import des anciennes routes (harvest, sites, etc.)
 from collections_api import register_collections_routes
 from harvest_routes_pg import register_harvest_routes
+from jobs_routes import register_job_routes
 from search_routes import register_search_routes
 from sites_routes_pg import register_sites_routes
 
@@ -38,10 +43,36 @@ register_collections_routes(app)
 register_harvest_routes(app)
 register_search_routes(app)
 register_sites_routes(app)
+register_job_routes(app)
+
+
+def _warm_embedding_caches():
+    """Charge le modèle puis les index sémantiques (snapshot disque, sinon R2) hors du chemin des requêtes."""
+    try:
+        warm_up()
+    except Exception as exc:
+        print(f"⚠️ Pré-chargement du modèle d'embedding échoué: {exc}")
+    # En mode pgvector, aucun index n'est chargé en mémoire.
+    if pgvector_enabled():
+        return
+    for loader in (_load_joradp_embeddings, _load_cs_embeddings_cache):
+        try:
+            loader()
+        except Exception as exc:
+            print(f"⚠️ Pré-chargement embeddings échoué ({loader.__name__}): {exc}")
+
+
+if os.getenv("SEMANTIC_WARMUP", "1") == "1":
+    threading.Thread(target=_warm_embedding_caches, name="embeddings-warmup", daemon=True).start()
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok', 'modules': ['joradp', 'coursupreme']})
+    return jsonify({
+        'status': 'ok',
+        'modules': ['joradp', 'coursupreme'],
+        'models': model_stats(),
+        'r2_reads': get_r2_reader().stats(),
+    })
 
 if __name__ == '__main__':
     host = os.getenv("API_HOST", "0.0.0.0")
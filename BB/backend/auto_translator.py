@@ -1,21 +1,39 @@
 import os
+import sys
+from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 import sqlite3
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.llm_cache import get_llm_cache
+
 load_dotenv()
 
+# Incrémenter à chaque modification d'un prompt : invalide le cache LLM correspondant.
+PROMPT_VERSION = 'v1'
+MODEL = "gpt-4o-mini"
+
 class AutoTranslator:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.base_dir = '/Users/djamel/Documents/Textes_juridiques_DZ/Cour_supreme'
+        self.cache = get_llm_cache()
+
+    def _complete(self, kind, text, **kwargs):
+        """Appel OpenAI, ou réponse en cache si le même texte a déjà été traduit."""
+        return self.cache.completion(
+            kind, PROMPT_VERSION, MODEL, text,
+            lambda: self.client.chat.completions.create(model=MODEL, **kwargs).choices[0].message.content,
+        )
     
     def translate_theme(self, theme_ar):
         """Traduit un thème juridique AR -> FR"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            content = self._complete(
+                'autotranslate_theme',
+                theme_ar,
                 messages=[
                     {"role": "system", "content": "Traducteur juridique arabe-français. Traduis uniquement le terme."},
                     {"role": "user", "content": f"Traduis ce terme juridique : {theme_ar}"}
@@ -23,7 +41,7 @@ class AutoTranslator:
                 max_tokens=50,
                 temperature=0.3
             )
-            return response.choices[0].message.content.strip()
+            return content.strip()
         except Exception as e:
             print(f"Erreur traduction theme: {e}")
             return theme_ar
@@ -43,17 +61,16 @@ class AutoTranslator:
             with open(path_ar, 'w', encoding='utf-8') as f:
                 f.write(f"Décision N° {decision_number}\nDate: {decision_date}\n\n{text_ar}")
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            text_fr = self._complete(
+                'autotranslate_decision',
+                text_ar[:3000],
                 messages=[
                     {"role": "system", "content": "Traducteur juridique arabe-français. Traduis le texte complet."},
                     {"role": "user", "content": f"Traduis cette décision:\n\n{text_ar[:3000]}"}
                 ],
                 max_tokens=2000,
                 temperature=0.3
-            )
-            
-            text_fr = response.choices[0].message.content.strip()
+            ).strip()
             
             with open(path_fr, 'w', encoding='utf-8') as f:
                 f.write(f"Décision N° {decision_number}\nDate: {decision_date}\n\n{text_fr}")
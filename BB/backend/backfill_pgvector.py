@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Backfill de la colonne pgvector `embedding` (EMBED_STORAGE=pgvector).
+
+- Cour Suprême : vecteurs R2 `embeddings_fr_r2` (sinon `embeddings_ar_r2`).
+- JORADP : vecteurs R2 `embeddings_r2`, sinon le vecteur JSON stocké dans
+  `document_ai_metadata.extra_metadata` par /batch/embeddings.
+
+Les téléchargements R2 réutilisent les workers du cache sémantique ; chaque
+lot est commité séparément, la commande peut donc être relancée (par défaut
+seules les lignes dont `embedding` est NULL sont traitées).
+
+Usage :
+    python backfill_pgvector.py [--corpus all|cour_supreme|joradp] [--all] [--batch-size 500]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().with_name(".env"))
+
+from shared.pgvector_store import backfill, write_vectors
+from shared.postgres import get_connection
+from modules.coursupreme.routes import _cs_embedding_source, _fetch_cs_vector
+from modules.joradp.routes import _fetch_embedding_vector
+
+
+def backfill_cour_supreme(conn, only_missing: bool, batch_size: int) -> dict:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, embeddings_fr_r2, embeddings_ar_r2
+            FROM supreme_court_decisions
+            WHERE (embeddings_fr_r2 IS NOT NULL OR embeddings_ar_r2 IS NOT NULL)
+              {"AND embedding IS NULL" if only_missing else ""}
+            ORDER BY id
+            """
+        )
+        rows = cur.fetchall()
+    print(f"🧬 Cour Suprême : {len(rows)} décisions à traiter")
+    return backfill(conn, "supreme_court_decisions", rows, _cs_embedding_source, _fetch_cs_vector, batch_size)
+
+
+def backfill_joradp(conn, only_missing: bool, batch_size: int) -> dict:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT d.id, d.embeddings_r2, m.extra_metadata -> 'embedding' -> 'vector' AS metadata_vector
+            FROM joradp_documents d
+            LEFT JOIN document_ai_metadata m
+              ON m.document_id = d.id AND m.corpus = 'joradp' AND m.language = 'fr'
+            WHERE (d.embeddings_r2 IS NOT NULL OR m.extra_metadata ? 'embedding')
+              {"AND d.embedding IS NULL" if only_missing else ""}
+            ORDER BY d.id
+            """
+        )
+        rows = cur.fetchall()
+    print(f"🧬 JORADP : {len(rows)} documents à traiter")
+
+    # Vecteurs déjà en base (JSON) : écriture directe, sans passer par R2.
+    inline = [(row["id"], row["metadata_vector"]) for row in rows if not row["embeddings_r2"] and row["metadata_vector"]]
+    with conn.cursor() as cur:
+        inline_written = write_vectors(cur, "joradp_documents", inline)
+    conn.commit()
+
+    stats = backfill(
+        conn,
+        "joradp_documents",
+        [row for row in rows if row["embeddings_r2"]],
+        lambda row: row.get("embeddings_r2"),
+        _fetch_embedding_vector,
+        batch_size,
+    )
+    stats["rows"] = len(rows)
+    stats["written"] += inline_written
+    stats["missing"] = len(rows) - stats["written"]
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill de la colonne pgvector embedding")
+    parser.add_argument("--corpus", choices=("all", "cour_supreme", "joradp"), default="all")
+    parser.add_argument("--all", action="store_true", help="réécrire aussi les lignes déjà remplies")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    jobs = {"cour_supreme": backfill_cour_supreme, "joradp": backfill_joradp}
+    selected = jobs if args.corpus == "all" else {args.corpus: jobs[args.corpus]}
+
+    with get_connection() as conn:
+        for name, job in selected.items():
+            stats = job(conn, not args.all, args.batch_size)
+            print(f"✅ {name} : {stats['written']}/{stats['rows']} vecteurs écrits, {stats['missing']} manquants")
+
+
+if __name__ == "__main__":
+    main()
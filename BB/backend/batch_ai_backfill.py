@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Backfills IA en mode OpenAI Batch API (coût réduit, sans limite RPM).
+
+Types de lots :
+- joradp_analysis         : analyse des documents JORADP (document_ai_metadata)
+- coursupreme_translation : traduction AR → FR des décisions
+- coursupreme_analysis    : résumés / titres / entités / mots-clés AR et FR
+
+Étapes (toutes relançables, voir shared/openai_batch.py) :
+    submit   construit les fichiers JSONL des éléments en attente et les soumet
+    collect  interroge les lots ouverts et ingère les résultats terminés
+    status   liste les lots
+    run      submit puis collect jusqu'à ce que les lots soient ingérés
+
+`--local` (ou OPENAI_FAKE=1) remplace l'API par le client fichier local.
+
+Usage :
+    python batch_ai_backfill.py submit --kind joradp_analysis [--limit 5000] [--local]
+    python batch_ai_backfill.py collect [--kind ...] [--local]
+    python batch_ai_backfill.py run --kind coursupreme_analysis --poll 60
+"""
+
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().with_name(".env"))
+
+from shared.openai_batch import batch_client, batch_kinds, collect, list_batches, submit
+
+# Les modules de routes enregistrent leurs types de lots à l'import.
+for _module in ("modules.coursupreme.routes", "modules.joradp.routes"):
+    importlib.import_module(_module)
+
+
+def print_report(entries) -> None:
+    for entry in entries:
+        details = ", ".join(f"{key}={value}" for key, value in entry.items() if key not in ("id", "kind"))
+        print(f"   {entry['kind']:<24} {entry['id']}  {details}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfills IA via l'OpenAI Batch API")
+    parser.add_argument("command", choices=("submit", "collect", "status", "run"))
+    parser.add_argument("--kind", choices=batch_kinds())
+    parser.add_argument("--limit", type=int, help="nombre max d'éléments soumis")
+    parser.add_argument("--local", action="store_true", help="client local (fichiers + FakeOpenAI)")
+    parser.add_argument("--poll", type=float, default=60.0, help="attente (s) entre deux collectes (run)")
+    args = parser.parse_args()
+
+    if args.command in ("submit", "run") and not args.kind:
+        parser.error("--kind est requis pour submit / run")
+
+    if args.command == "status":
+        for batch in list_batches(args.kind):
+            state = "ingéré" if batch["ingested_at"] else batch["status"]
+            print(f"   {batch['kind']:<24} {batch['id']}  {state:<12} {batch['request_count']} requêtes "
+                  f"(✅ {batch['succeeded'] or 0} / ❌ {batch['failed'] or 0})")
+        return
+
+    client = batch_client(local=args.local)
+
+    if args.command in ("submit", "run"):
+        submitted = submit(args.kind, client, limit=args.limit)
+        total = sum(batch["requests"] for batch in submitted)
+        print(f"📤 {len(submitted)} lot(s) soumis, {total} requêtes")
+        print_report(submitted)
+
+    if args.command in ("collect", "run"):
+        while True:
+            report = collect(client, args.kind)
+            print(f"📥 {len(report)} lot(s) ouverts interrogés")
+            print_report(report)
+            pending = [batch for batch in list_batches(args.kind, only_open=True) if batch["provider"] == client.provider]
+            if args.command == "collect" or not pending:
+                break
+            time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,34 @@
 """
 Moissonneur JORADP connecté à MizaneDb (PostgreSQL).
 Collecte les métadonnées (HEAD) et alimente joradp_documents sans toucher aux PDF.
+
+Les requêtes HEAD partent en parallèle par fenêtres de numéros, sur une
+session keep-alive partagée :
+- JORADP_HEAD_RPS : budget global de requêtes par seconde (défaut 10) ;
+- JORADP_HEAD_CONCURRENCY : connexions simultanées vers joradp.dz (défaut 8) ;
+- JORADP_PROBE_WINDOW : numéros sondés d'avance (défaut 8).
+
+Chaque année est une unité de travail indépendante ; `harvest_all` les
+répartit sur JORADP_YEAR_WORKERS workers (défaut 1), le budget req/s restant
+global. L'avancement de chaque année est enregistré dans
+joradp_harvest_checkpoints (migration 20251017_add_joradp_harvest_checkpoints.sql)
+et `harvest_all(resume=True)` reprend chaque année là où elle s'est arrêtée.
+
+Les documents trouvés sont écrits par lots de JORADP_UPSERT_BATCH lignes
+(défaut 200) avec un seul `INSERT … ON CONFLICT (url) DO UPDATE`
+(index unique : migration 20251017_add_joradp_documents_url_unique.sql) ;
+le point de reprise n'avance qu'après l'écriture du lot.
 """
+import os
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import time
 
+from psycopg2.extras import execute_values
+
+from shared.http_client import RateLimiter, build_session
 from shared.postgres import get_connection
 
 R2_PREFIX = "Textes_juridiques_DZ/joradp.dz"
@@ -16,12 +39,29 @@ class JORADPExhaustiveHarvester:
 
     BASE_URL = "https://www.joradp.dz/FTP/JO-FRANCAIS"
 
-    def __init__(self, session_id):
+    MAX_CONSECUTIVE_404 = 5
+
+    FIRST_YEAR = 1962
+    LAST_NUM = 999
+
+    def __init__(self, session_id, max_rps=None, concurrency=None, window=None, year_workers=None, checkpoints=True):
         self.session_id = session_id
+        self.max_rps = float(os.getenv("JORADP_HEAD_RPS", "10")) if max_rps is None else max_rps
+        self.concurrency = max(int(os.getenv("JORADP_HEAD_CONCURRENCY", "8")) if concurrency is None else concurrency, 1)
+        self.window = max(int(os.getenv("JORADP_PROBE_WINDOW", "8")) if window is None else window, 1)
+        self.http = build_session(self.concurrency)
+        self.rate_limiter = RateLimiter(self.max_rps)
+        self.year_workers = max(int(os.getenv("JORADP_YEAR_WORKERS", "1")) if year_workers is None else year_workers, 1)
+        self.checkpoints = checkpoints
+        self.batch_size = max(int(os.getenv("JORADP_UPSERT_BATCH", "200")), 1)
+        self._stats_lock = threading.Lock()
         self.stats = {
             'total_found': 0,
             'total_404': 0,
-            'years_processed': 0
+            'years_processed': 0,
+            'requests': 0,
+            'throughput': {},
+            'failed_years': {}
         }
 
     def build_url(self, year, num):
@@ -30,8 +70,9 @@ class JORADPExhaustiveHarvester:
 
     def get_metadata(self, url):
         """Récupère les métadonnées via requête HEAD"""
+        self.rate_limiter.acquire()
         try:
-            response = requests.head(url, timeout=10, allow_redirects=True)
+            response = self.http.head(url, timeout=10, allow_redirects=True)
 
             if response.status_code == 200:
                 metadata = {
@@ -62,142 +103,283 @@ class JORADPExhaustiveHarvester:
         except Exception as e:
             return {'exists': False, 'error': str(e)}
 
+    def probe_window(self, year, nums, executor):
+        """Sonde un lot de numéros en parallèle ; résultats dans l'ordre des numéros."""
+        return list(executor.map(lambda num: self.get_metadata(self.build_url(year, num)), nums))
+
     def harvest_year(self, year, start_num=1, max_num=999):
         """Moissonne une année complète"""
         print(f"\n📅 Année {year}")
         print(f"   Numéros: {start_num} à {max_num}")
 
         found_count = 0
+        not_found = 0
         consecutive_404 = 0
+        last_num = start_num - 1
+        last_found = 0
+        probed = 0
+        started = time.perf_counter()
+        finished = False
+        pending = []
+        # Avancement déjà écrit en base : (last_num, last_found, found_count).
+        flushed = (last_num, last_found, found_count)
+        self.save_checkpoint(year, *flushed, 'running')
 
-        for num in range(start_num, max_num + 1):
-            url = self.build_url(year, num)
-
-            # Récupérer métadonnées
-            metadata = self.get_metadata(url)
-
-            if metadata.get('exists'):
-                consecutive_404 = 0
-                found_count += 1
-                self.stats['total_found'] += 1
-
-                size_kb = metadata['size_bytes'] / 1024
-                date_str = metadata.get('publication_date', 'inconnue')
-
-                print(f"   ✅ [{num:03d}] {size_kb:.1f} KB - {date_str}")
-
-                # Sauvegarder dans la BD
-                self.save_document(url, year, num, metadata)
-
-            elif metadata.get('404'):
-                consecutive_404 += 1
-                self.stats['total_404'] += 1
-
-                # Arrêt après 5 × 404 consécutifs
-                if consecutive_404 >= 5:
-                    print(f"   ⏹️  5 documents absents consécutifs - fin de {year}")
-                    break
-
-            else:
-                print(f"   ⚠️  [{num:03d}] Erreur: {metadata.get('error')}")
-
-            # Pause pour ne pas surcharger le serveur
-            time.sleep(0.1)
-
-        self.stats['years_processed'] += 1
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                # Sondage par fenêtres : les résultats sont traités dans l'ordre, de
+                # sorte que la règle des 404 consécutifs reste celle du parcours
+                # séquentiel (au plus `window - 1` requêtes en trop par année).
+                for window_start in range(start_num, max_num + 1, self.window):
+                    nums = list(range(window_start, min(window_start + self.window, max_num + 1)))
+                    results = self.probe_window(year, nums, executor)
+                    probed += len(nums)
+
+                    for num, metadata in zip(nums, results):
+                        url = self.build_url(year, num)
+                        last_num = num
+
+                        if metadata.get('exists'):
+                            consecutive_404 = 0
+                            found_count += 1
+                            last_found = num
+
+                            size_kb = metadata['size_bytes'] / 1024
+                            date_str = metadata.get('publication_date', 'inconnue')
+
+                            print(f"   ✅ [{year}/{num:03d}] {size_kb:.1f} KB - {date_str}")
+
+                            # Écrit en base avec le lot suivant
+                            pending.append(self.document_row(url, year, num, metadata))
+
+                        elif metadata.get('404'):
+                            consecutive_404 += 1
+                            not_found += 1
+
+                            # Arrêt après 5 × 404 consécutifs
+                            if consecutive_404 >= self.MAX_CONSECUTIVE_404:
+                                print(f"   ⏹️  {self.MAX_CONSECUTIVE_404} documents absents consécutifs - fin de {year}")
+                                finished = True
+                                break
+
+                        else:
+                            print(f"   ⚠️  [{year}/{num:03d}] Erreur: {metadata.get('error')}")
+
+                    if finished:
+                        break
+                    if len(pending) >= self.batch_size:
+                        self.save_documents(pending)
+                        pending = []
+                        # Point de reprise : tous les numéros jusqu'à last_num sont en base.
+                        flushed = (last_num, last_found, found_count)
+                        self.save_checkpoint(year, *flushed, 'running')
+
+            self.save_documents(pending)
+        except Exception as exc:
+            self.save_checkpoint(year, *flushed, 'error', str(exc))
+            raise
+
+        self.save_checkpoint(year, last_num, last_found, found_count, 'done')
+
+        elapsed = time.perf_counter() - started
+        rate = probed / elapsed if elapsed > 0 else 0.0
+        with self._stats_lock:
+            self.stats['total_found'] += found_count
+            self.stats['total_404'] += not_found
+            self.stats['requests'] += probed
+            self.stats['throughput'][year] = {
+                'requests': probed,
+                'found': found_count,
+                'seconds': round(elapsed, 2),
+                'requests_per_second': round(rate, 1),
+            }
+            self.stats['years_processed'] += 1
         print(f"   📊 {found_count} documents trouvés pour {year}")
+        print(f"   ⚡ {probed} requêtes HEAD en {elapsed:.1f}s ({rate:.1f} req/s)")
 
         return found_count
 
-    def save_document(self, url, year, num, metadata):
-        """Sauvegarde/actualise la ligne dans joradp_documents (Postgres)."""
+    def save_checkpoint(self, year, last_num, last_found, found_count, status, error=None):
+        """Enregistre l'avancement d'une année dans joradp_harvest_checkpoints."""
+        if not self.checkpoints:
+            return
+        try:
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO joradp_harvest_checkpoints (
+                        year, session_id, last_num, last_found_num, found_count, status, error, updated_at
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, timezone('utc', now()))
+                    ON CONFLICT (year) DO UPDATE SET
+                        session_id = EXCLUDED.session_id,
+                        last_num = EXCLUDED.last_num,
+                        last_found_num = GREATEST(joradp_harvest_checkpoints.last_found_num, EXCLUDED.last_found_num),
+                        found_count = EXCLUDED.found_count,
+                        status = EXCLUDED.status,
+                        error = EXCLUDED.error,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    (year, self.session_id, last_num, last_found, found_count, status, error),
+                )
+                conn.commit()
+        except Exception as exc:
+            # Table absente (migration non appliquée) : on continue sans reprise.
+            print(f"   ⚠️  Points de reprise désactivés: {exc}")
+            self.checkpoints = False
+
+    def load_checkpoints(self, years):
+        """Points de reprise des années demandées, indexés par année."""
+        if not self.checkpoints:
+            return {}
+        try:
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT year, last_num, last_found_num, found_count, status
+                    FROM joradp_harvest_checkpoints
+                    WHERE year = ANY(%s)
+                    """,
+                    (list(years),),
+                )
+                return {row['year']: row for row in cur.fetchall()}
+        except Exception as exc:
+            print(f"   ⚠️  Points de reprise indisponibles: {exc}")
+            self.checkpoints = False
+            return {}
+
+    def resume_start(self, year, checkpoint):
+        """Premier numéro à sonder pour `year`, ou None si l'année est close."""
+        if checkpoint is None:
+            return 1
+        if checkpoint['status'] == 'done':
+            # Seule l'année en cours peut encore recevoir de nouveaux numéros.
+            if year < datetime.now().year:
+                return None
+            return checkpoint['last_found_num'] + 1
+        return checkpoint['last_num'] + 1
+
+    def document_row(self, url, year, num, metadata):
+        """Ligne joradp_documents (colonnes de `save_documents`) pour un document trouvé."""
         filename = f"F{year}{str(num).zfill(3)}.pdf"
-        file_path = f"{R2_PREFIX}/{year}/{filename}"
-        publication_date = metadata.get('publication_date')
-        size_bytes = metadata.get('size_bytes')
-
+        return (
+            self.session_id,
+            url,
+            '.pdf',
+            f"{R2_PREFIX}/{year}/{filename}",
+            metadata.get('publication_date'),
+            metadata.get('size_bytes'),
+        )
+
+    def save_documents(self, rows):
+        """Insère/actualise un lot de lignes joradp_documents en une seule requête."""
+        # Une URL ne peut apparaître qu'une fois par INSERT … ON CONFLICT DO UPDATE.
+        rows = list({row[1]: row for row in rows}.values())
+        if not rows:
+            return 0
         with get_connection() as conn, conn.cursor() as cur:
-            # 1) Essayer de mettre à jour si l'URL existe déjà (pas besoin d'index unique)
-            cur.execute(
+            execute_values(
+                cur,
                 """
-                UPDATE joradp_documents
-                SET
-                    session_id = COALESCE(joradp_documents.session_id, %s),
-                    publication_date = COALESCE(%s, joradp_documents.publication_date),
-                    file_size_bytes = COALESCE(%s, joradp_documents.file_size_bytes),
-                    file_extension = COALESCE(joradp_documents.file_extension, %s),
-                    file_path_r2 = COALESCE(%s, joradp_documents.file_path_r2),
+                INSERT INTO joradp_documents (
+                    session_id,
+                    url,
+                    file_extension,
+                    file_path_r2,
+                    publication_date,
+                    file_size_bytes,
+                    metadata_collection_status,
+                    download_status,
+                    text_extraction_status,
+                    ai_analysis_status,
+                    embedding_status,
+                    metadata_collected_at
+                ) VALUES %s
+                ON CONFLICT (url) DO UPDATE SET
+                    session_id = COALESCE(joradp_documents.session_id, EXCLUDED.session_id),
+                    publication_date = COALESCE(EXCLUDED.publication_date, joradp_documents.publication_date),
+                    file_size_bytes = COALESCE(EXCLUDED.file_size_bytes, joradp_documents.file_size_bytes),
+                    file_extension = COALESCE(joradp_documents.file_extension, EXCLUDED.file_extension),
+                    file_path_r2 = COALESCE(EXCLUDED.file_path_r2, joradp_documents.file_path_r2),
                     metadata_collection_status = 'success',
-                    metadata_collected_at = timezone('utc', now()),
+                    metadata_collected_at = EXCLUDED.metadata_collected_at,
                     updated_at = timezone('utc', now())
-                WHERE url = %s
                 """,
-                (
-                    self.session_id,
-                    publication_date,
-                    size_bytes,
-                    '.pdf',
-                    file_path,
-                    url,
-                ),
+                rows,
+                template="(%s, %s, %s, %s, %s::date, %s, 'success', 'pending', 'pending', 'pending', 'pending', timezone('utc', now()))",
+                page_size=self.batch_size,
             )
-            updated = cur.rowcount
-
-            # 2) Si aucune ligne, insérer
-            if updated == 0:
-                cur.execute(
-                    """
-                    INSERT INTO joradp_documents (
-                        session_id,
-                        url,
-                        file_extension,
-                        file_path_r2,
-                        text_path_r2,
-                        publication_date,
-                        file_size_bytes,
-                        metadata_collection_status,
-                        download_status,
-                        text_extraction_status,
-                        ai_analysis_status,
-                        embedding_status,
-                        metadata_collected_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s,
-                        'success', 'pending', 'pending', 'pending', 'pending',
-                        timezone('utc', now())
-                    )
-                    ON CONFLICT DO NOTHING
-                    """,
-                    (
-                        self.session_id,
-                        url,
-                        '.pdf',
-                        file_path,
-                        None,
-                        publication_date,
-                        size_bytes,
-                    ),
-                )
             conn.commit()
+        return len(rows)
 
-    def harvest_all(self, start_year=1962, end_year=None):
-        """Moissonne toutes les années depuis 1962"""
+    def save_document(self, url, year, num, metadata):
+        """Sauvegarde/actualise la ligne dans joradp_documents (Postgres)."""
+        self.save_documents([self.document_row(url, year, num, metadata)])
+
+    def _year_failed(self, year, exc):
+        """Une année en échec n'interrompt pas le moissonnage : son point de contrôle reste en 'error'."""
+        print(f"   ❌ Année {year} interrompue: {exc}")
+        with self._stats_lock:
+            self.stats['failed_years'][year] = str(exc)
+
+    def harvest_all(self, start_year=1962, end_year=None, workers=None, resume=False, on_year=None):
+        """
+        Moissonne toutes les années depuis 1962, en parallèle sur `workers` années.
+
+        `on_year(year, done, total)` est appelé après chaque année ; une
+        exception qu'il lève (annulation) interrompt le moissonnage.
+        """
         if end_year is None:
             end_year = datetime.now().year
+        workers = self.year_workers if workers is None else max(int(workers), 1)
 
         print(f"🚀 Moissonnage exhaustif JORADP")
         print(f"   Période: {start_year} - {end_year}")
         print(f"   Session ID: {self.session_id}")
+        print(f"   Workers: {workers} année(s) en parallèle, {self.max_rps:g} req/s max")
         print("=" * 60)
 
-        for year in range(start_year, end_year + 1):
-            self.harvest_year(year)
+        years = list(range(start_year, end_year + 1))
+        starts = {year: 1 for year in years}
+        if resume:
+            checkpoints = self.load_checkpoints(years)
+            starts = {year: self.resume_start(year, checkpoints.get(year)) for year in years}
+            closed = [year for year, start in starts.items() if start is None]
+            if closed:
+                print(f"   ⏭️  {len(closed)} année(s) déjà terminée(s) ignorée(s)")
+        work = [(year, start) for year, start in starts.items() if start is not None and start <= self.LAST_NUM]
+
+        if workers == 1:
+            for done, (year, start) in enumerate(work, 1):
+                try:
+                    self.harvest_year(year, start_num=start)
+                except Exception as exc:
+                    self._year_failed(year, exc)
+                if on_year:
+                    on_year(year, done, len(work))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(self.harvest_year, year, start): year for year, start in work}
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        self._year_failed(futures[future], exc)
+                    if on_year:
+                        try:
+                            on_year(futures[future], done, len(work))
+                        except Exception:
+                            for pending in futures:
+                                pending.cancel()
+                            raise
 
         print("\n" + "=" * 60)
         print(f"✅ Moissonnage terminé !")
         print(f"   📚 {self.stats['total_found']} documents trouvés")
         print(f"   📅 {self.stats['years_processed']} années traitées")
         print(f"   ⊗ {self.stats['total_404']} erreurs 404")
+        if self.stats['failed_years']:
+            print(f"   ❌ {len(self.stats['failed_years'])} année(s) en erreur, reprises au prochain passage: "
+                  f"{', '.join(map(str, sorted(self.stats['failed_years'])))}")
 
 
 def test_exhaustive():
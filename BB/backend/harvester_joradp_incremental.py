@@ -60,6 +60,17 @@ class JORADPIncrementalHarvester(JORADPExhaustiveHarvester):
             'date': publication_date
         }
 
+        current_year = datetime.now().year
+
+        # Reprise exacte depuis les points de contrôle quand ils existent.
+        checkpoints = self.load_checkpoints(range(self.FIRST_YEAR, current_year + 1))
+        if checkpoints:
+            pending = [year for year, checkpoint in checkpoints.items() if checkpoint['status'] != 'done']
+            start_year = min(pending) if pending else max(checkpoints)
+            print(f"   Reprise depuis les points de contrôle: année {start_year}")
+            self.harvest_all(start_year=start_year, end_year=current_year, resume=True)
+            return
+
         last_url = last_doc['url']
         parts = last_url.split('/')
         filename = parts[-1]  # F2024088.pdf
@@ -69,8 +80,6 @@ class JORADPIncrementalHarvester(JORADPExhaustiveHarvester):
         print(f"   Dernier doc: {filename} ({publication_date})")
         print(f"   Reprise depuis: année {year}, numéro {num + 1}")
 
-        current_year = datetime.now().year
-
         if num < 999:
             self.harvest_year(year, start_num=num + 1)
 
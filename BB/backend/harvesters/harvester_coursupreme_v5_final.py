@@ -2,9 +2,19 @@
 Harvester V5 Final - Cour Suprême d'Algérie
 Stratégie exhaustive avec auto-découverte
 MIGRÉ vers PostgreSQL/Supabase (MizaneDb)
+
+Les chambres sont moissonnées en parallèle (COURSUPREME_CHAMBER_WORKERS,
+défaut 3) sous un budget global de requêtes (COURSUPREME_RPS, défaut 2 req/s).
+Pour chaque page, ETag, Last-Modified et l'empreinte du contenu parsé sont
+conservés dans supreme_court_page_cache : les passages suivants envoient des
+GET conditionnels et ignorent les pages inchangées (304 ou même empreinte).
 """
-import requests
+import argparse
+import hashlib
+import json
+import os
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import time
 import re
@@ -14,16 +24,27 @@ from pathlib import Path
 
 # Import PostgreSQL connection
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent))
+from psycopg2.extras import execute_values
+
+from shared.http_client import RateLimiter, build_session
 from shared.postgres import get_connection_simple
 
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+
 class HarvesterCourSupremeV5:
-    def __init__(self):
+    def __init__(self, max_rps=None, chamber_workers=None, conditional=True):
         """Harvester migré vers PostgreSQL - plus besoin de db_path"""
         self.base_url = 'https://coursupreme.dz'
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.max_rps = float(os.getenv('COURSUPREME_RPS', '2')) if max_rps is None else max_rps
+        self.chamber_workers = max(int(os.getenv('COURSUPREME_CHAMBER_WORKERS', '3')) if chamber_workers is None else chamber_workers, 1)
+        # Politesse : budget de requêtes commun à toutes les chambres.
+        self.rate_limiter = RateLimiter(self.max_rps)
+        self.session = build_session(self.chamber_workers, USER_AGENT)
+        self.conditional = conditional
+        # Devient False si la table supreme_court_page_cache est absente.
+        self.page_cache = True
+        self.chamber_stats = {}
 
     def get_conn(self):
         """Retourne une connexion PostgreSQL"""
@@ -36,6 +57,7 @@ class HarvesterCourSupremeV5:
         print("="*70 + "\n")
 
         try:
+            self.rate_limiter.acquire()
             response = self.session.get(self.base_url, timeout=30)
             soup = BeautifulSoup(response.content, 'html.parser')
 
@@ -104,12 +126,12 @@ class HarvesterCourSupremeV5:
             cursor.close()
             conn.close()
 
-            for section_id, name in active_sections:
-                print(f"  {section_id}. {name}")
+            for section in active_sections:
+                print(f"  {section['id']}. {section['name_ar']}")
 
             print()
 
-            return [s[0] for s in active_sections]
+            return [section['id'] for section in active_sections]
 
         except Exception as e:
             print(f"❌ Erreur découverte: {e}")
@@ -117,8 +139,9 @@ class HarvesterCourSupremeV5:
             traceback.print_exc()
             return []
 
-    def harvest_all_exhaustive(self):
-        """Moissonnage exhaustif de toutes les sections"""
+    def harvest_all_exhaustive(self, workers=None):
+        """Moissonnage exhaustif de toutes les sections, `workers` chambres en parallèle"""
+        workers = self.chamber_workers if workers is None else max(int(workers), 1)
 
         # ÉTAPE 1: Découvrir les sections
         section_ids = self.discover_and_sync_sections()
@@ -130,50 +153,43 @@ class HarvesterCourSupremeV5:
         # ÉTAPE 2: Compter avant
         conn = self.get_conn()
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM supreme_court_decisions")
-        decisions_avant = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) AS total FROM supreme_court_decisions")
+        decisions_avant = cursor.fetchone()['total']
         cursor.close()
         conn.close()
 
         print("="*70)
         print(f"🚀 MOISSONNAGE EXHAUSTIF - {len(section_ids)} SECTIONS")
         print("="*70)
-        print(f"Décisions avant : {decisions_avant}\n")
-
-        # ÉTAPE 3: Moissonner chaque section
-        total_nouvelles = 0
-
-        for section_id in section_ids:
-            conn = self.get_conn()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name_ar FROM supreme_court_chambers WHERE id = %s", (section_id,))
-            section_name = cursor.fetchone()[0]
-            cursor.close()
-            conn.close()
-
-            print(f"\n{'='*70}")
-            print(f"📂 SECTION {section_id}: {section_name}")
-            print(f"{'='*70}\n")
-
-            result = self.harvest_section(chamber_id=section_id)
-            total_nouvelles += result['decisions']
-
-            print(f"\n✅ Section {section_id} : {result['decisions']} nouvelles décisions")
-
-            time.sleep(2)
+        print(f"Décisions avant : {decisions_avant}")
+        print(f"Chambres en parallèle : {workers}, {self.max_rps:g} req/s max, "
+              f"requêtes conditionnelles : {'oui' if self.conditional else 'non'}\n")
+
+        # ÉTAPE 3: Moissonner les sections en parallèle
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.harvest_section, section_id): section_id for section_id in section_ids}
+            for future in as_completed(futures):
+                section_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Section {section_id} interrompue: {e}")
+                    continue
+                print(f"\n✅ Section {section_id} : {result['decisions']} nouvelles décisions "
+                      f"({result['pages']} pages en {result['seconds']:.1f}s)")
 
         # ÉTAPE 4: Stats finales
         conn = self.get_conn()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT COUNT(*) FROM supreme_court_decisions")
-        decisions_apres = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) AS total FROM supreme_court_decisions")
+        decisions_apres = cursor.fetchone()['total']
 
-        cursor.execute("SELECT COUNT(*) FROM supreme_court_decision_classifications")
-        total_classifications = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) AS total FROM supreme_court_decision_classifications")
+        total_classifications = cursor.fetchone()['total']
 
-        cursor.execute("SELECT COUNT(DISTINCT theme_id) FROM supreme_court_decision_classifications")
-        total_themes = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(DISTINCT theme_id) AS total FROM supreme_court_decision_classifications")
+        total_themes = cursor.fetchone()['total']
 
         cursor.close()
         conn.close()
@@ -186,10 +202,169 @@ class HarvesterCourSupremeV5:
         print(f"Nouvelles décisions    : {decisions_apres - decisions_avant}")
         print(f"Classifications totales: {total_classifications}")
         print(f"Thèmes uniques         : {total_themes}")
+        print(f"{'='*70}")
+        print("⏱️  Par chambre (pages / 304 / inchangées / nouvelles décisions / durée) :")
+        for section_id, stats in sorted(self.chamber_stats.items()):
+            print(f"  {section_id}. {stats['pages']} / {stats['not_modified']} / {stats['unchanged']} / "
+                  f"{stats['decisions']} / {stats['seconds']:.1f}s")
         print(f"{'='*70}\n")
 
+    def load_page_cache(self, cursor, chamber_id):
+        """Validateurs connus des pages d'une chambre, indexés par URL ({} en mode complet)."""
+        if not self.page_cache:
+            return {}
+        try:
+            cursor.execute("""
+                SELECT url, etag, last_modified, content_hash
+                FROM supreme_court_page_cache
+                WHERE chamber_id = %s
+            """, (chamber_id,))
+            rows = cursor.fetchall()
+        except Exception as e:
+            # Table absente (migration non appliquée) : moissonnage sans cache.
+            cursor.connection.rollback()
+            print(f"   ⚠️  Cache des pages indisponible: {e}")
+            self.page_cache = False
+            return {}
+        return {row['url']: row for row in rows} if self.conditional else {}
+
+    def save_page_cache(self, cursor, chamber_id, url, response, content_hash):
+        """Enregistre les validateurs d'une page dans la transaction de la page."""
+        if not self.page_cache:
+            return
+        cursor.execute("""
+            INSERT INTO supreme_court_page_cache (url, chamber_id, etag, last_modified, content_hash, fetched_at)
+            VALUES (%s, %s, %s, %s, %s, timezone('utc', now()))
+            ON CONFLICT (url) DO UPDATE SET
+                chamber_id = EXCLUDED.chamber_id,
+                etag = COALESCE(EXCLUDED.etag, supreme_court_page_cache.etag),
+                last_modified = COALESCE(EXCLUDED.last_modified, supreme_court_page_cache.last_modified),
+                content_hash = COALESCE(EXCLUDED.content_hash, supreme_court_page_cache.content_hash),
+                fetched_at = EXCLUDED.fetched_at
+        """, (url, chamber_id, response.headers.get('ETag'), response.headers.get('Last-Modified'), content_hash))
+
+    def fetch_page(self, url, cached):
+        """GET (conditionnel si la page est connue) sous le budget de requêtes."""
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        self.rate_limiter.acquire()
+        return self.session.get(url, timeout=30, headers=headers)
+
+    @staticmethod
+    def page_hash(themes):
+        """Empreinte du contenu parsé (insensible au balisage dynamique de la page)."""
+        return hashlib.sha256(json.dumps(themes, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def parse_page(self, soup):
+        """Thèmes d'une page et leurs décisions : [(theme_name, [(numéro, date, url), ...]), ...]"""
+        themes = []
+
+        for accordion in soup.find_all('div', class_='accordion-header'):
+            h4 = accordion.find('h4')
+            if not h4:
+                continue
+
+            theme_name = h4.get_text(strip=True)
+
+            if not theme_name or len(theme_name) < 3:
+                continue
+
+            decisions = []
+            content_div = accordion.find_next_sibling('div', class_='accordion-content')
+
+            if content_div:
+                links = content_div.find_all('a', href=lambda h: h and '/decision/' in str(h))
+
+                for link in links:
+                    decision_url = urljoin(self.base_url, link.get('href'))
+                    decision_title = link.get_text(strip=True)
+
+                    # Extraire numéro
+                    number_match = re.search(r'(\d{5,7})', decision_title)
+                    decision_number = number_match.group(1) if number_match else f"NUM_{hashlib.sha1(decision_url.encode('utf-8')).hexdigest()[:8]}"
+
+                    # Extraire date
+                    date_match = re.search(r'(\d{2}[-/]\d{2}[-/]\d{4})', decision_title)
+                    decision_date = date_match.group(1) if date_match else None
+
+                    decisions.append((decision_number, decision_date, decision_url))
+
+            themes.append((theme_name, decisions))
+
+        return themes
+
+    def save_page(self, cursor, chamber_id, page_url, themes):
+        """
+        Écrit les thèmes, décisions et classifications d'une page avec trois
+        requêtes ensemblistes. Retourne le nombre de nouvelles classifications.
+        """
+        if not themes:
+            return 0
+
+        # Thèmes : insertion des nouveaux + ids des existants en une requête.
+        theme_names = list(dict.fromkeys(name for name, _ in themes))
+        theme_rows = execute_values(cursor, """
+            WITH input (chamber_id, name_ar, url) AS (VALUES %s),
+            inserted AS (
+                INSERT INTO supreme_court_themes (chamber_id, name_ar, name_fr, url)
+                SELECT chamber_id, name_ar, name_ar, url FROM input
+                ON CONFLICT (chamber_id, name_ar) DO NOTHING
+                RETURNING id, name_ar
+            )
+            SELECT id, name_ar FROM inserted
+            UNION ALL
+            SELECT t.id, t.name_ar FROM supreme_court_themes t
+            JOIN input i ON i.chamber_id = t.chamber_id AND i.name_ar = t.name_ar
+        """, [(chamber_id, name, page_url) for name in theme_names], page_size=len(theme_names), fetch=True)
+        theme_ids = {row['name_ar']: row['id'] for row in theme_rows}
+
+        # Décisions : la première occurrence d'un numéro l'emporte (comme ON CONFLICT DO NOTHING).
+        decisions = {}
+        for _, links in themes:
+            for number, decision_date, decision_url in links:
+                decisions.setdefault(number, (number, decision_date, decision_url))
+        if not decisions:
+            return 0
+
+        decision_rows = execute_values(cursor, """
+            WITH input (decision_number, decision_date, url) AS (VALUES %s),
+            inserted AS (
+                INSERT INTO supreme_court_decisions (decision_number, decision_date, url, download_status)
+                SELECT decision_number, decision_date::date, url, 'pending' FROM input
+                ON CONFLICT (decision_number) DO NOTHING
+                RETURNING id, decision_number
+            )
+            SELECT id, decision_number FROM inserted
+            UNION ALL
+            SELECT d.id, d.decision_number FROM supreme_court_decisions d
+            JOIN input i ON i.decision_number = d.decision_number
+        """, list(decisions.values()), page_size=len(decisions), fetch=True)
+        decision_ids = {row['decision_number']: row['id'] for row in decision_rows}
+
+        classifications = list(dict.fromkeys(
+            (decision_ids[number], chamber_id, theme_ids[name])
+            for name, links in themes
+            if name in theme_ids
+            for number, _, _ in links
+            if number in decision_ids
+        ))
+        if not classifications:
+            return 0
+
+        created = execute_values(cursor, """
+            INSERT INTO supreme_court_decision_classifications (decision_id, chamber_id, theme_id)
+            VALUES %s
+            ON CONFLICT (decision_id, chamber_id, theme_id) DO NOTHING
+            RETURNING id
+        """, classifications, page_size=len(classifications), fetch=True)
+        return len(created)
+
     def harvest_section(self, chamber_id):
-        """Moissonne une section complètement"""
+        """Moissonne une section complètement (une transaction et trois requêtes d'écriture par page)"""
         conn = self.get_conn()
         cursor = conn.cursor()
 
@@ -199,124 +374,68 @@ class HarvesterCourSupremeV5:
         if not result:
             cursor.close()
             conn.close()
-            return {'pages': 0, 'themes': 0, 'decisions': 0}
+            return {'pages': 0, 'themes': 0, 'decisions': 0, 'not_modified': 0, 'unchanged': 0, 'seconds': 0.0}
 
-        base_url = result[0]
+        base_url = result['url']
+        page_cache = self.load_page_cache(cursor, chamber_id)
 
         page_num = 1
         total_decisions = 0
         empty_pages = 0
+        not_modified = 0
+        unchanged = 0
+        started = time.perf_counter()
 
         while True:
             url = base_url if page_num == 1 else f"{base_url}/page/{page_num}/"
 
-            print(f"📄 Page {page_num}")
+            print(f"📄 [{chamber_id}] Page {page_num}")
 
             try:
-                response = self.session.get(url, timeout=30)
+                cached = page_cache.get(url)
+                response = self.fetch_page(url, cached)
 
                 if response.status_code == 404:
                     break
 
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                accordions = soup.find_all('div', class_='accordion-header')
-                page_decisions = 0
-
-                for accordion in accordions:
-                    h4 = accordion.find('h4')
-                    if not h4:
-                        continue
-
-                    theme_name = h4.get_text(strip=True)
-
-                    if not theme_name or len(theme_name) < 3:
-                        continue
-
-                    # Thème (PostgreSQL: INSERT ... ON CONFLICT DO NOTHING)
-                    cursor.execute("""
-                        INSERT INTO supreme_court_themes
-                        (chamber_id, name_ar, name_fr, url)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (chamber_id, name_ar) DO NOTHING
-                    """, (chamber_id, theme_name, theme_name, url))
-
-                    cursor.execute("""
-                        SELECT id FROM supreme_court_themes
-                        WHERE chamber_id = %s AND name_ar = %s
-                    """, (chamber_id, theme_name))
-
-                    result = cursor.fetchone()
-                    theme_id = result[0] if result else None
-
-                    if not theme_id:
-                        continue
-
-                    # Décisions
-                    content_div = accordion.find_next_sibling('div', class_='accordion-content')
-
-                    if content_div:
-                        links = content_div.find_all('a', href=lambda h: h and '/decision/' in str(h))
-
-                        for link in links:
-                            decision_url = urljoin(self.base_url, link.get('href'))
-                            decision_title = link.get_text(strip=True)
-
-                            # Extraire numéro
-                            number_match = re.search(r'(\d{5,7})', decision_title)
-                            decision_number = number_match.group(1) if number_match else f"NUM_{hash(decision_url) % 1000000}"
-
-                            # Extraire date
-                            date_match = re.search(r'(\d{2}[-/]\d{2}[-/]\d{4})', decision_title)
-                            decision_date = date_match.group(1) if date_match else None
-
-                            # Insérer décision (PostgreSQL: ON CONFLICT)
-                            cursor.execute("""
-                                INSERT INTO supreme_court_decisions
-                                (decision_number, decision_date, url, download_status)
-                                VALUES (%s, %s, %s, 'pending')
-                                ON CONFLICT (decision_number) DO NOTHING
-                            """, (decision_number, decision_date, decision_url))
-
-                            # Récupérer ID
-                            cursor.execute("""
-                                SELECT id FROM supreme_court_decisions
-                                WHERE decision_number = %s
-                            """, (decision_number,))
-
-                            decision_id = cursor.fetchone()[0]
+                if response.status_code == 304:
+                    # Page inchangée depuis le dernier passage : rien à parser ni à écrire.
+                    not_modified += 1
+                    page_decisions = 0
+                    print(f"   ⏭️  [{chamber_id}] Page inchangée (304)")
+                else:
+                    response.raise_for_status()
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                    themes = self.parse_page(soup)
+                    content_hash = self.page_hash(themes)
 
-                            # Classification (PostgreSQL: ON CONFLICT)
-                            cursor.execute("""
-                                INSERT INTO supreme_court_decision_classifications
-                                (decision_id, chamber_id, theme_id)
-                                VALUES (%s, %s, %s)
-                                ON CONFLICT (decision_id, chamber_id, theme_id) DO NOTHING
-                            """, (decision_id, chamber_id, theme_id))
+                    if cached and cached.get('content_hash') == content_hash:
+                        unchanged += 1
+                        page_decisions = 0
+                        print(f"   ⏭️  [{chamber_id}] Contenu identique, page ignorée")
+                    else:
+                        page_decisions = self.save_page(cursor, chamber_id, url, themes)
+                        print(f"   ✅ [{chamber_id}] {page_decisions} nouvelles décisions")
 
-                            if cursor.rowcount > 0:
-                                page_decisions += 1
+                    self.save_page_cache(cursor, chamber_id, url, response, content_hash)
 
-                print(f"   ✅ {page_decisions} nouvelles décisions")
+                total_decisions += page_decisions
+                conn.commit()
 
                 # Détection pages vides
                 if page_decisions == 0:
                     empty_pages += 1
-                    print(f"   ⚠️  Page sans nouvelles décisions ({empty_pages}/2)")
+                    print(f"   ⚠️  [{chamber_id}] Page sans nouvelles décisions ({empty_pages}/2)")
                     if empty_pages >= 2:
-                        print(f"   ✓ 2 pages consécutives vides - Arrêt")
+                        print(f"   ✓ [{chamber_id}] 2 pages consécutives vides - Arrêt")
                         break
                 else:
                     empty_pages = 0
 
-                total_decisions += page_decisions
-                conn.commit()
                 page_num += 1
-                time.sleep(1)
 
             except Exception as e:
-                print(f"   ❌ Erreur: {e}")
+                print(f"   ❌ [{chamber_id}] Erreur: {e}")
                 import traceback
                 traceback.print_exc()
                 break
@@ -324,7 +443,15 @@ class HarvesterCourSupremeV5:
         cursor.close()
         conn.close()
 
-        return {'pages': page_num - 1, 'decisions': total_decisions}
+        stats = {
+            'pages': page_num - 1,
+            'decisions': total_decisions,
+            'not_modified': not_modified,
+            'unchanged': unchanged,
+            'seconds': time.perf_counter() - started,
+        }
+        self.chamber_stats[chamber_id] = stats
+        return stats
 
 if __name__ == '__main__':
     print("="*70)
@@ -332,5 +459,11 @@ if __name__ == '__main__':
     print("="*70)
     print()
 
-    harvester = HarvesterCourSupremeV5()
+    parser = argparse.ArgumentParser(description="Moissonnage exhaustif Cour Suprême")
+    parser.add_argument('--workers', type=int, default=None, help="chambres moissonnées en parallèle")
+    parser.add_argument('--rps', type=float, default=None, help="budget global de requêtes par seconde")
+    parser.add_argument('--full', action='store_true', help="retélécharger toutes les pages (le cache est tout de même mis à jour)")
+    args = parser.parse_args()
+
+    harvester = HarvesterCourSupremeV5(max_rps=args.rps, chamber_workers=args.workers, conditional=not args.full)
     harvester.harvest_all_exhaustive()
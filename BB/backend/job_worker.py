@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Pool local de workers pour la file background_jobs (sans broker externe).
+
+Chaque processus charge l'application (pour disposer des vues batch et des
+handlers enregistrés) puis exécute `--threads` boucles de travail. Lancer
+l'API avec JOB_WORKERS=0 pour que seules ces instances traitent la file.
+
+Usage :
+    python job_worker.py [--processes 2] [--threads 1] [--poll 2]
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+
+def run_process(threads: int, poll_interval: float) -> None:
+    # Pas de workers ni de préchargement sémantique au chargement de l'API.
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ.setdefault("SEMANTIC_WARMUP", "0")
+    # L'import de l'API enregistre les vues et les handlers de tâches.
+    importlib.import_module("api")
+    from shared.background_jobs import start_worker_threads, worker_loop
+
+    if threads > 1:
+        start_worker_threads(threads - 1, poll_interval)
+    worker_loop(poll_interval=poll_interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Workers de la file de tâches de fond")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1, help="boucles de travail par processus")
+    parser.add_argument("--poll", type=float, default=2.0, help="attente (s) quand la file est vide")
+    args = parser.parse_args()
+
+    print(f"⚙️  {args.processes} processus × {args.threads} worker(s)")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_process, args=(args.threads, args.poll), name=f"job-worker-{index}")
+        for index in range(max(args.processes, 1))
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
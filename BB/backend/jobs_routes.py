@@ -0,0 +1,137 @@
+"""
+Routes de suivi des tâches de fond (/api/jobs) et exécution différée des
+endpoints batch.
+
+Un endpoint décoré par `queued_batch` reste synchrone par défaut ; avec
+`"async": true` dans le corps JSON, il répond 202 avec un `job_id` et un
+worker rejoue la même vue, par tranches d'identifiants (progression, ETA,
+annulation entre deux tranches, reprise à la tranche en échec).
+
+JOB_WORKERS : threads workers démarrés dans l'API (défaut 1, 0 si les
+tâches sont exécutées par job_worker.py).
+"""
+import os
+import sys
+from functools import wraps
+from pathlib import Path
+
+from flask import jsonify, request
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.background_jobs import (
+    JOB_STATUSES,
+    JobFailed,
+    cancel_job,
+    enqueue,
+    get_job,
+    list_jobs,
+    merge_results,
+    register_handler,
+    retry_job,
+    start_worker_threads,
+)
+
+VIEW_JOB_KIND = 'flask_view'
+DEFAULT_CHUNK_SIZE = 10
+
+
+def queued_batch(ids_key=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Permet d'exécuter un endpoint batch en tâche de fond (`"async": true`)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True) or {}
+            ids = data.get(ids_key) if ids_key else None
+            # Sans identifiants, la vue renvoie elle-même son erreur 400.
+            if not data.get('async') or (ids_key and not ids):
+                return view(*args, **kwargs)
+
+            payload = {key: value for key, value in data.items() if key != 'async'}
+            job = enqueue(
+                VIEW_JOB_KIND,
+                {
+                    'endpoint': request.endpoint,
+                    'path': request.path,
+                    'view_args': kwargs,
+                    'payload': payload,
+                    'ids_key': ids_key,
+                    'chunk_size': chunk_size,
+                },
+                total=len(ids) if ids_key else 1,
+            )
+            return jsonify({
+                'success': True,
+                'job_id': job['id'],
+                'status_url': f"/api/jobs/{job['id']}",
+                'total': job['progress'].get('total'),
+            }), 202
+        return wrapper
+    return decorator
+
+
+def register_job_routes(app):
+
+    def run_view(job, endpoint, path, view_args, payload, ids_key=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Rejoue une vue batch tranche par tranche et cumule les réponses."""
+        view = app.view_functions[endpoint]
+        ids = list(payload.get(ids_key) or []) if ids_key else []
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)] or [None]
+        merged = job.progress.get('partial') or {}
+        start = int(job.progress.get('next_chunk', 0))
+        job.update(total=len(ids) or 1)
+
+        for index in range(start, len(chunks)):
+            job.check_cancelled()
+            chunk = chunks[index]
+            body = payload if chunk is None else {**payload, ids_key: chunk}
+            with app.test_request_context(path, method='POST', json=body):
+                response = app.make_response(view(**view_args))
+            data = response.get_json(silent=True) or {}
+            if response.status_code >= 500:
+                raise RuntimeError(data.get('error') or f"HTTP {response.status_code}")
+            if response.status_code >= 400:
+                raise JobFailed(data.get('error') or f"HTTP {response.status_code}")
+
+            merged = merge_results(merged, data)
+            done = len(ids) if chunk is None else min((index + 1) * chunk_size, len(ids))
+            job.update(force=True, done=done or 1, next_chunk=index + 1, partial=merged)
+
+        return merged
+
+    register_handler(VIEW_JOB_KIND, run_view)
+
+    @app.route('/api/jobs', methods=['GET'])
+    def get_jobs():
+        status = request.args.get('status')
+        if status and status not in JOB_STATUSES:
+            return jsonify({'error': f"Statut inconnu: {status}"}), 400
+        try:
+            limit = min(int(request.args.get('limit', 50)), 500)
+        except ValueError:
+            limit = 50
+        return jsonify({'jobs': list_jobs(request.args.get('kind'), status, limit)})
+
+    @app.route('/api/jobs/<uuid:job_id>', methods=['GET'])
+    def get_job_status(job_id):
+        job = get_job(str(job_id))
+        if job is None:
+            return jsonify({'error': 'Tâche introuvable'}), 404
+        return jsonify(job)
+
+    @app.route('/api/jobs/<uuid:job_id>/cancel', methods=['POST'])
+    def cancel_job_route(job_id):
+        job = cancel_job(str(job_id))
+        if job is None:
+            return jsonify({'error': 'Tâche introuvable ou déjà terminée'}), 404
+        return jsonify(job)
+
+    @app.route('/api/jobs/<uuid:job_id>/retry', methods=['POST'])
+    def retry_job_route(job_id):
+        job = retry_job(str(job_id))
+        if job is None:
+            return jsonify({'error': 'Seules les tâches en échec ou annulées peuvent être relancées'}), 404
+        return jsonify(job)
+
+    workers = int(os.getenv('JOB_WORKERS', '1'))
+    if workers > 0:
+        start_worker_threads(workers)
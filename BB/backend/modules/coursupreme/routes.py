@@ -6,7 +6,6 @@ from pathlib import Path
 # Migration SQLite → PostgreSQL
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent))
 from shared.postgres import get_connection_simple
-import requests
 import unicodedata
 from datetime import datetime
 import numpy as np
@@ -17,8 +16,6 @@ import time
 import json
 from html import unescape
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from sentence_transformers import SentenceTransformer
 
 os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "1")
 os.environ.setdefault("OMP_NUM_THREADS", "1")
@@ -29,15 +26,18 @@ if root_env.exists():
 USE_SEMANTIC_SEARCH = os.getenv("COURSUPREME_ENABLE_SEMANTIC", "0") == "1"
 USE_SEMANTIC_SEARCH = True
 
-from shared.r2_storage import (
-    generate_presigned_url,
-    build_public_url,
-    get_r2_client,
-    get_bucket_name,
-    normalize_key,
-    R2ConfigurationError,
-)
+from shared.r2_storage import delete_object, get_r2_reader
 from shared.postgres import get_connection as get_pg_connection
+from shared.r2_index import get_r2_index
+from shared.embedding_index import EmbeddingIndex, TableIndexCache, get_snapshot_dir, top_k_indices
+from shared.ann_index import AnnCache, resolve_search_mode
+from shared.pgvector_store import count_embedded, nearest, pgvector_enabled, write_vectors
+from shared.query_encoder import QueryEncoder
+from shared.model_registry import DEFAULT_MODEL, get_model
+from shared.llm_cache import cache_key, get_llm_cache
+from shared.openai_batch import batch_request, custom_id, parse_custom_id, register_batch_kind
+from jobs_routes import queued_batch
+from psycopg2.extras import execute_values
 
 NORMALIZED_DECISION_DATE = (
     "CASE WHEN length(decision_date)=10 AND substr(decision_date,3,1)='-' AND substr(decision_date,6,1)='-' "
@@ -98,11 +98,13 @@ def parse_fuzzy_date(value, is_end=False):
     return '9999-12-31' if is_end else '1900-01-01'
 
 
-def normalize_decision_date_value(value: str | None) -> str | None:
-    """Normalise une date trouvée dans le texte vers YYYY-MM-DD si possible."""
+def normalize_decision_date_value(value) -> str | None:
+    """Normalise une date (texte ou colonne DATE) vers YYYY-MM-DD si possible."""
     if not value:
         return None
-    raw = value.strip()
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    raw = str(value).strip()
     candidates = ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%Y/%m/%d']
     for fmt in candidates:
         try:
@@ -154,8 +156,6 @@ FRENCH_INDEX_TABLE = 'french_keyword_index'
 FRENCH_INDEX_FIELDS = ['object_fr', 'summary_fr', 'title_fr']
 TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
 
-EMBEDDING_MODEL = None
-
 
 def extract_french_tokens(value: str) -> list:
     if not value:
@@ -244,30 +244,6 @@ def get_decision_ids_for_classification(
     return {row[0] for row in cursor.fetchall()}
 
 
-def get_embedding_model():
-    global EMBEDDING_MODEL
-    if EMBEDDING_MODEL is not None:
-        return EMBEDDING_MODEL
-    if not USE_SEMANTIC_SEARCH:
-        fallback_results, fallback_count = run_text_fallback(limit)
-        return jsonify({
-            'results': fallback_results,
-            'count': fallback_count,
-            'max_score': None,
-            'min_score': None,
-            'score_threshold': score_threshold,
-            'limit': limit,
-            'error': 'semantic search disabled, fallback applied'
-        })
-
-    try:
-        from sentence_transformers import SentenceTransformer
-    except Exception:
-        return None
-    EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    return EMBEDDING_MODEL
-
-
 def decode_embedding(blob):
     if not blob:
         return None
@@ -277,83 +253,57 @@ def decode_embedding(blob):
 
 
 # Embeddings cour suprême (cache R2 + modèle)
-_CS_EMBED_CACHE = None
-_CS_EMBED_MODEL = None
+CS_INDEX_FIELDS = ("decision_number", "decision_date", "url")
+CS_SNAPSHOT_NAME = "bb_cour_supreme"
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parents[2] / ".cache" / "embeddings"
+_CS_ANN = AnnCache(CS_SNAPSHOT_NAME)
 
 
 def get_embedding_model():
-    global _CS_EMBED_MODEL
-    if _CS_EMBED_MODEL is None:
-        _CS_EMBED_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    return _CS_EMBED_MODEL
+    """Modèle d'embedding partagé par tout le processus (cf. shared.model_registry)."""
+    return get_model()
 
 
-def _build_embedding_url(raw_path: str | None) -> str | None:
-    if not raw_path:
-        return None
-    presigned = generate_presigned_url(raw_path)
-    if presigned:
-        return presigned
-    return build_public_url(raw_path)
+# Vecteurs de requêtes : cache LRU + encodage groupé des requêtes concurrentes.
+_CS_QUERY_ENCODER = QueryEncoder(get_embedding_model, DEFAULT_MODEL)
 
 
-def _download_embedding(url: str) -> bytes | None:
-    try:
-        resp = requests.get(url, timeout=20)
-        if resp.ok:
-            return resp.content
-    except Exception:
-        return None
-    return None
+_R2 = get_r2_reader()
+_R2_INDEX = get_r2_index()
 
 
-def _load_cs_embeddings_cache():
-    global _CS_EMBED_CACHE
-    if _CS_EMBED_CACHE is not None:
-        return _CS_EMBED_CACHE
+def _fetch_cs_vector(raw_path: str):
+    return decode_embedding(_R2.get(raw_path, timeout=20))
 
-    cache = []
-    with get_pg_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, decision_number, decision_date, url,
-                       embeddings_ar_r2, embeddings_fr_r2
-                FROM supreme_court_decisions
-                WHERE embeddings_ar_r2 IS NOT NULL OR embeddings_fr_r2 IS NOT NULL
-                """
-            )
-            rows = cur.fetchall()
 
-    def worker(row):
-        emb_url = _build_embedding_url(row.get("embeddings_fr_r2") or row.get("embeddings_ar_r2"))
-        if not emb_url:
-            return None
-        blob = _download_embedding(emb_url)
-        vec = decode_embedding(blob)
-        if vec is None or vec.size == 0:
-            return None
-        norm = np.linalg.norm(vec)
-        if norm == 0:
-            return None
-        vec = vec / norm
-        return {
-            "id": row["id"],
-            "decision_number": row["decision_number"],
-            "decision_date": row["decision_date"],
-            "url": row["url"],
-            "vector": vec,
-        }
+def _cs_embedding_source(row) -> str | None:
+    return row.get("embeddings_fr_r2") or row.get("embeddings_ar_r2")
+
 
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [executor.submit(worker, row) for row in rows]
-        for fut in as_completed(futures):
-            item = fut.result()
-            if item:
-                cache.append(item)
+def _cs_index_row(row) -> dict:
+    """Ligne prête pour l'index : decision_date (colonne DATE) en ISO, comme après rechargement du snapshot."""
+    value = row.get("decision_date")
+    return {**row, "decision_date": value.isoformat() if hasattr(value, "isoformat") else value}
 
-    _CS_EMBED_CACHE = cache
-    return _CS_EMBED_CACHE
+
+# Index Cour Suprême : snapshot disque + rafraîchissement incrémental (cf. shared.embedding_index).
+_CS_EMBED_INDEX = TableIndexCache(
+    CS_SNAPSHOT_NAME,
+    table="supreme_court_decisions",
+    columns=("id", "decision_number", "decision_date", "url", "embeddings_ar_r2", "embeddings_fr_r2"),
+    fields=CS_INDEX_FIELDS,
+    embedded="embeddings_ar_r2 IS NOT NULL OR embeddings_fr_r2 IS NOT NULL",
+    source_of=_cs_embedding_source,
+    fetch_vector=_fetch_cs_vector,
+    prepare=_cs_index_row,
+    snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+    label="Cour Suprême",
+)
+
+
+def _load_cs_embeddings_cache() -> EmbeddingIndex:
+    """Charge (une fois) la matrice d'embeddings Cour Suprême."""
+    return _CS_EMBED_INDEX.load()
 
 
 def cosine_similarity(query_vec, target_vec):
@@ -372,28 +322,24 @@ if str(HARVESTERS_DIR) not in sys.path:
     sys.path.append(str(HARVESTERS_DIR))
 
 
-def _build_access_url(raw_path: str | None) -> str | None:
-    if not raw_path:
-        return None
-    try:
-        return generate_presigned_url(raw_path) or build_public_url(raw_path)
-    except R2ConfigurationError:
-        # R2 not configured: caller will fall back to any in-DB HTML content
-        return None
+def _fetch_text_from_r2(raw_path: str | None, fallback: str | None = None) -> str | None:
+    text = _R2.get_text(raw_path, timeout=30)
+    return fallback if text is None else text
 
 
-def _fetch_text_from_r2(raw_path: str | None, fallback: str | None = None) -> str | None:
-    url = _build_access_url(raw_path)
-    if not url:
-        return fallback
-    try:
-        resp = requests.get(url, timeout=30)
-        if resp.ok:
-            resp.encoding = 'utf-8'
-            return resp.text
-    except Exception as exc:
-        print(f"⚠️ Impossible de charger {raw_path}: {exc}")
-    return fallback
+def _attach_r2_contents(rows: list, html_fields: dict) -> None:
+    """
+    Remplit `content_ar` / `content_fr` de chaque ligne : fichiers R2 lus en
+    parallèle, HTML en base en repli. `html_fields` : langue -> (colonne R2, HTML).
+    """
+    paths = [row.get(column) for row in rows for column, _ in html_fields.values()]
+    bodies = _R2.get_many(paths)
+    for row in rows:
+        for lang, (column, html_key) in html_fields.items():
+            body = bodies.get(row.get(column)) if row.get(column) else None
+            fallback = _decode_text(row.pop(html_key, None))
+            row[f'content_{lang}'] = body.decode('utf-8', errors='replace') if body is not None else fallback
+            row.pop(column, None)
 
 
 def _decode_text(value):
@@ -432,21 +378,13 @@ def _serialize_entities(raw):
 
 
 def _delete_r2_object(raw_path: str | None) -> bool:
+    # delete_object maintient aussi le cache disque et l'index d'existence R2.
     if not raw_path:
         return False
-    try:
-        client = get_r2_client()
-        key = normalize_key(raw_path)
-        if not key:
-            return False
-        bucket = get_bucket_name()
-        client.delete_object(Bucket=bucket, Key=key)
+    if delete_object(raw_path):
         return True
-    except R2ConfigurationError:
-        return False
-    except Exception as exc:
-        print(f"⚠️ Impossible de supprimer {raw_path} de R2: {exc}")
-        return False
+    print(f"⚠️ Impossible de supprimer {raw_path} de R2")
+    return False
 
 @coursupreme_bp.route('/chambers', methods=['GET'])
 def get_chambers():
@@ -584,16 +522,11 @@ def get_decisions(theme_id):
                     cur.execute(fallback_sql, (theme_id,))
                     rows = cur.fetchall()
 
-        decisions = []
-        for row in rows:
-            row = _decode_row_strings(dict(row))
-            html_ar = _decode_text(row.pop('html_content_ar_r2', None))
-            html_fr = _decode_text(row.pop('html_content_fr_r2', None))
-            row['content_ar'] = _fetch_text_from_r2(row.get('file_path_ar_r2'), html_ar)
-            row['content_fr'] = _fetch_text_from_r2(row.get('file_path_fr_r2'), html_fr)
-            row.pop('file_path_ar_r2', None)
-            row.pop('file_path_fr_r2', None)
-            decisions.append(row)
+        decisions = [_decode_row_strings(dict(row)) for row in rows]
+        _attach_r2_contents(decisions, {
+            'ar': ('file_path_ar_r2', 'html_content_ar_r2'),
+            'fr': ('file_path_fr_r2', 'html_content_fr_r2'),
+        })
 
         return jsonify({'decisions': decisions})
     except Exception as e:
@@ -626,13 +559,10 @@ def get_decision(decision_id):
         if row:
             decision = dict(row)
 
-            html_ar = decision.pop('html_content_ar_r2', None)
-            html_fr = decision.pop('html_content_fr_r2', None)
-            decision['content_ar'] = _fetch_text_from_r2(decision.get('file_path_ar_r2'), html_ar)
-            decision['content_fr'] = _fetch_text_from_r2(decision.get('file_path_fr_r2'), html_fr)
-
-            decision.pop('file_path_ar_r2', None)
-            decision.pop('file_path_fr_r2', None)
+            _attach_r2_contents([decision], {
+                'ar': ('file_path_ar_r2', 'html_content_ar_r2'),
+                'fr': ('file_path_fr_r2', 'html_content_fr_r2'),
+            })
 
             return jsonify(decision)
         return jsonify({'error': 'Not found'}), 404
@@ -682,15 +612,11 @@ def get_metadata(decision_id):
         if row:
             metadata = dict(row)
 
-            # Lire les contenus depuis R2
-            html_ar = metadata.pop('html_content_ar_r2', None)
-            html_fr = metadata.pop('html_content_fr_r2', None)
-            metadata['content_ar'] = _fetch_text_from_r2(metadata.get('file_path_ar_r2'), html_ar)
-            metadata['content_fr'] = _fetch_text_from_r2(metadata.get('file_path_fr_r2'), html_fr)
-
-            # Nettoyer les champs inutiles
-            metadata.pop('file_path_ar_r2', None)
-            metadata.pop('file_path_fr_r2', None)
+            # Lire les contenus depuis R2 (en parallèle), HTML en base en repli
+            _attach_r2_contents([metadata], {
+                'ar': ('file_path_ar_r2', 'html_content_ar_r2'),
+                'fr': ('file_path_fr_r2', 'html_content_fr_r2'),
+            })
 
             return jsonify(metadata)
         return jsonify({'error': 'Not found'}), 404
@@ -1014,12 +940,12 @@ def batch_download():
 
 
 @coursupreme_bp.route('/batch/translate', methods=['POST'])
+@queued_batch('decision_ids')
 def batch_translate():
     """Traduire plusieurs décisions AR -> FR avec OpenAI"""
     from flask import request
     import os
     from openai import OpenAI
-    from bs4 import BeautifulSoup
     
     try:
         data = request.get_json()
@@ -1040,15 +966,15 @@ def batch_translate():
         cursor = conn.cursor()
         
         # Récupérer les décisions
-        placeholders = ','.join('?' * len(decision_ids))
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT id, decision_number, html_content_ar, html_content_fr, download_status,
                    file_path_ar, file_path_fr
             FROM supreme_court_decisions
-            WHERE id IN ({placeholders})
-        """, decision_ids)
+            WHERE id = ANY(%s)
+        """, ([int(dec_id) for dec_id in decision_ids],))
         
         decisions = cursor.fetchall()
+        stored_files = _stored_decision_files(decisions)
         
         # Vérifier les dépendances et statuts
         missing_download = []
@@ -1056,10 +982,12 @@ def batch_translate():
         to_translate = []
         
         for dec in decisions:
-            dec_id, number, html_ar, html_fr, dl_status, file_ar, file_fr = dec
+            dec_id, number = dec['id'], dec['decision_number']
+            html_ar, html_fr = dec['html_content_ar'], dec['html_content_fr']
+            file_ar, dl_status = dec['file_path_ar'], dec['download_status']
 
-            available_ar = bool(html_ar) or (file_ar and file_exists(file_ar))
-            available_fr = bool(html_fr) or (file_fr and file_exists(file_fr))
+            available_ar = bool(html_ar) or stored_files.get(file_ar, False)
+            available_fr = bool(html_fr) or stored_files.get(dec['file_path_fr'], False)
 
             if not available_ar or dl_status not in ('downloaded', 'completed'):
                 missing_download.append(number)
@@ -1107,28 +1035,20 @@ def batch_translate():
                 if not html_content:
                     raise ValueError("Contenu AR introuvable (ni en base, ni sur disque)")
 
-                # Extraire le texte du HTML
-                soup = BeautifulSoup(html_content, 'html.parser')
-                text_ar = soup.get_text(separator='\\n', strip=True)
-                
-                # Limiter à 3000 caractères pour ne pas dépasser les tokens
-                text_to_translate = text_ar[:3000]
+                # Extraire le texte du HTML (limité à 3000 caractères pour ne pas dépasser les tokens)
+                text_to_translate = _decision_text(html_content)
                 
-                # Traduire avec OpenAI
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "Tu es un traducteur juridique professionnel. Traduis le texte arabe en français en conservant la structure et la terminologie juridique."},
-                        {"role": "user", "content": f"Traduis cette décision de justice:\n\n{text_to_translate}"}
-                    ],
-                    max_tokens=2000,
-                    temperature=0.3
+                # Traduire avec OpenAI (réponse reprise du cache LLM si le texte est inchangé)
+                text_fr = get_llm_cache().completion(
+                    'coursupreme_translation',
+                    TRANSLATION_PROMPT_VERSION,
+                    COURSUPREME_LLM_MODEL,
+                    text_to_translate,
+                    lambda: client.chat.completions.create(**_translation_request(text_to_translate)).choices[0].message.content,
                 )
                 
-                text_fr = response.choices[0].message.content.strip()
-                
                 # Recréer le HTML avec le texte traduit
-                html_fr = f"<article>{text_fr}</article>"
+                html_fr = _translated_html(text_fr)
                 
                 # Sauvegarder
                 cursor.execute("""
@@ -1159,15 +1079,104 @@ def batch_translate():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+ANALYSIS_COMMIT_BATCH = int(os.getenv("ANALYSIS_COMMIT_BATCH", "20"))
+ANALYSIS_LANGUAGES = {'ar': 'ARABE', 'fr': 'FRANÇAIS'}
+COURSUPREME_LLM_MODEL = "gpt-4o-mini"
+# Incrémenter à chaque modification d'un prompt : invalide le cache LLM correspondant.
+TRANSLATION_PROMPT_VERSION = 'v1'
+DECISION_ANALYSIS_PROMPT_VERSION = 'v1'
+
+DECISION_ANALYSIS_PROMPT = """Analyse cette décision de justice en {langue} et retourne un JSON avec:
+1. "summary": résumé en 3-4 lignes
+2. "title": titre court et descriptif
+3. "entities": liste d'objets {{"type": "person/institution/location/legal", "name": "..."}}
+4. "keywords": liste de 5-8 mots-clés juridiques importants
+5. "decision_date": date de la décision au format YYYY-MM-DD si elle est clairement identifiable, sinon null
+
+Décision:
+{text}
+
+Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
+
+
+def _decision_text(html: str, limit: int = 3000) -> str:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'html.parser').get_text(separator='\n', strip=True)[:limit]
+
+
+def _translation_request(text_ar: str) -> dict:
+    """Arguments de `chat.completions.create` pour traduire une décision (appel direct ou Batch API)."""
+    return {
+        'model': COURSUPREME_LLM_MODEL,
+        'messages': [
+            {"role": "system", "content": "Tu es un traducteur juridique professionnel. Traduis le texte arabe en français en conservant la structure et la terminologie juridique."},
+            {"role": "user", "content": f"Traduis cette décision de justice:\n\n{text_ar}"}
+        ],
+        'max_tokens': 2000,
+        'temperature': 0.3,
+    }
+
+
+def _translation_cache_key(text_ar: str) -> str:
+    return cache_key('coursupreme_translation', TRANSLATION_PROMPT_VERSION, COURSUPREME_LLM_MODEL, text_ar)
+
+
+def _decision_analysis_cache_key(lang: str, text: str) -> str:
+    return cache_key(f'coursupreme_analysis_{lang}', DECISION_ANALYSIS_PROMPT_VERSION, COURSUPREME_LLM_MODEL, text)
+
+
+def _translated_html(content: str) -> str:
+    return f"<article>{content.strip()}</article>"
+
+
+def _decision_analysis_request(langue: str, text: str) -> dict:
+    """Arguments de `chat.completions.create` pour l'analyse AR ou FR d'une décision."""
+    return {
+        'model': COURSUPREME_LLM_MODEL,
+        'messages': [
+            {"role": "system", "content": "Tu es un analyste juridique. Réponds UNIQUEMENT en JSON valide."},
+            {"role": "user", "content": DECISION_ANALYSIS_PROMPT.format(langue=langue, text=text)},
+        ],
+        'max_tokens': 1000,
+        'temperature': 0.3,
+    }
+
+
+def _parse_decision_analysis(content: str) -> dict:
+    content = content.strip().replace('```json', '').replace('```', '').strip()
+    return json.loads(content)
+
+
+def _analyze_decision(dec, executor):
+    """Appels OpenAI AR puis FR pour une décision (exécuté dans un worker, sans connexion DB)."""
+    print(f"🤖 Analyse IA {dec['number']}...")
+    html_ar = load_html_content(dec.get('html_ar'), dec.get('file_path_ar'))
+    html_fr = load_html_content(dec.get('html_fr'), dec.get('file_path_fr'))
+    if not html_ar or not html_fr:
+        raise ValueError("Contenu AR/FR introuvable pour l'analyse")
+
+    analyses = {}
+    for lang, html in (('ar', html_ar), ('fr', html_fr)):
+        text = _decision_text(html)
+        kwargs = _decision_analysis_request(ANALYSIS_LANGUAGES[lang], text)
+        content = get_llm_cache().completion(
+            f'coursupreme_analysis_{lang}',
+            DECISION_ANALYSIS_PROMPT_VERSION,
+            COURSUPREME_LLM_MODEL,
+            text,
+            lambda: executor.complete(**kwargs).choices[0].message.content,
+        )
+        analyses[lang] = _parse_decision_analysis(content)
+    return analyses['ar'], analyses['fr']
+
+
 @coursupreme_bp.route('/batch/analyze', methods=['POST'])
+@queued_batch('decision_ids')
 def batch_analyze():
     """Analyser plusieurs décisions avec OpenAI + extraction mots-clés"""
-    from flask import request
-    import os
-    import json
-    from openai import OpenAI
-    from bs4 import BeautifulSoup
-    
+    from shared.llm_executor import ChatExecutor, openai_client
+
     try:
         data = request.get_json()
         decision_ids = data.get('decision_ids', [])
@@ -1181,22 +1190,22 @@ def batch_analyze():
         if not api_key:
             return jsonify({'error': 'OPENAI_API_KEY non trouvée dans .env'}), 500
         
-        client = OpenAI(api_key=api_key)
+        executor = ChatExecutor(openai_client(api_key))
         
         conn = get_connection_simple()
         cursor = conn.cursor()
         
         # Récupérer les décisions
-        placeholders = ','.join('?' * len(decision_ids))
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT id, decision_number, decision_date, html_content_ar, html_content_fr, 
                    download_status, summary_ar, summary_fr,
                    file_path_ar, file_path_fr
             FROM supreme_court_decisions
-            WHERE id IN ({placeholders})
-        """, decision_ids)
+            WHERE id = ANY(%s)
+        """, ([int(dec_id) for dec_id in decision_ids],))
         
         decisions = cursor.fetchall()
+        stored_files = _stored_decision_files(decisions)
         
         # Vérifier dépendances
         missing_download = []
@@ -1205,21 +1214,24 @@ def batch_analyze():
         to_analyze = []
         
         for dec in decisions:
-            dec_id, number, dec_date, html_ar, html_fr, dl_status, sum_ar, sum_fr, file_ar, file_fr = dec
+            number = dec['decision_number']
+            html_ar, html_fr = dec['html_content_ar'], dec['html_content_fr']
+            file_ar, file_fr = dec['file_path_ar'], dec['file_path_fr']
 
-            available_ar = bool(html_ar) or (file_ar and file_exists(file_ar))
-            available_fr = bool(html_fr) or (file_fr and file_exists(file_fr))
+            available_ar = bool(html_ar) or stored_files.get(file_ar, False)
+            available_fr = bool(html_fr) or stored_files.get(file_fr, False)
 
-            if not available_ar or dl_status not in ('downloaded', 'completed'):
+            if not available_ar or dec['download_status'] not in ('downloaded', 'completed'):
                 missing_download.append(number)
             elif not available_fr:
                 missing_translation.append(number)
-            elif sum_ar and sum_fr and not force:
+            elif dec['summary_ar'] and dec['summary_fr'] and not force:
                 already_analyzed.append(number)
             else:
                 to_analyze.append({
-                    'id': dec_id,
+                    'id': dec['id'],
                     'number': number,
+                    'decision_date': dec['decision_date'],
                     'html_ar': html_ar,
                     'html_fr': html_fr,
                     'file_path_ar': file_ar,
@@ -1253,81 +1265,22 @@ def batch_analyze():
                 'message': f'{len(already_analyzed)} décisions déjà analysées. Voulez-vous les re-analyser ?'
             })
         
-        # Analyser
+        # Analyser : appels OpenAI en parallèle, écritures validées par lots
         results = {
             'success': [],
             'failed': [],
             'skipped': already_analyzed
         }
+        pending = 0
         
-        for dec in to_analyze:
+        for dec, analyses, error in executor.map(lambda item: _analyze_decision(item, executor), to_analyze):
             try:
-                print(f"🤖 Analyse IA {dec['number']}...")
+                if error is not None:
+                    raise error
+                ar_json, fr_json = analyses
 
-                html_ar = load_html_content(dec.get('html_ar'), dec.get('file_path_ar'))
-                html_fr = load_html_content(dec.get('html_fr'), dec.get('file_path_fr'))
-                if not html_ar or not html_fr:
-                    raise ValueError("Contenu AR/FR introuvable pour l'analyse")
-
-                # Extraire textes
-                soup_ar = BeautifulSoup(html_ar, 'html.parser')
-                text_ar = soup_ar.get_text(separator='\n', strip=True)[:3000]
-
-                soup_fr = BeautifulSoup(html_fr, 'html.parser')
-                text_fr = soup_fr.get_text(separator='\n', strip=True)[:3000]
-                
-                # Analyse AR
-                ar_response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "Tu es un analyste juridique. Réponds UNIQUEMENT en JSON valide."},
-                        {"role": "user", "content": f"""Analyse cette décision de justice en ARABE et retourne un JSON avec:
-1. "summary": résumé en 3-4 lignes
-2. "title": titre court et descriptif
-3. "entities": liste d'objets {{"type": "person/institution/location/legal", "name": "..."}}
-4. "keywords": liste de 5-8 mots-clés juridiques importants
-5. "decision_date": date de la décision au format YYYY-MM-DD si elle est clairement identifiable, sinon null
-
-Décision:
-{text_ar}
-
-Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
-                    ],
-                    max_tokens=1000,
-                    temperature=0.3
-                )
-                
-                ar_content = ar_response.choices[0].message.content.strip()
-                ar_content = ar_content.replace('```json', '').replace('```', '').strip()
-                ar_json = json.loads(ar_content)
-                
-                # Analyse FR
-                fr_response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "Tu es un analyste juridique. Réponds UNIQUEMENT en JSON valide."},
-                        {"role": "user", "content": f"""Analyse cette décision de justice en FRANÇAIS et retourne un JSON avec:
-1. "summary": résumé en 3-4 lignes
-2. "title": titre court et descriptif
-3. "entities": liste d'objets {{"type": "person/institution/location/legal", "name": "..."}}
-4. "keywords": liste de 5-8 mots-clés juridiques importants
-5. "decision_date": date de la décision au format YYYY-MM-DD si elle est clairement identifiable, sinon null
-
-Décision:
-{text_fr}
-
-Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
-                    ],
-                    max_tokens=1000,
-                    temperature=0.3
-                )
-                
-                fr_content = fr_response.choices[0].message.content.strip()
-                fr_content = fr_content.replace('```json', '').replace('```', '').strip()
-                fr_json = json.loads(fr_content)
-                
                 # Déterminer une date à corriger si besoin
-                existing_date = normalize_decision_date_value(dec.get('decision_date') if isinstance(dec, dict) else dec_date)
+                existing_date = normalize_decision_date_value(dec.get('decision_date'))
                 ar_date = normalize_decision_date_value((ar_json or {}).get('decision_date')) if isinstance(ar_json, dict) else None
                 fr_date = normalize_decision_date_value((fr_json or {}).get('decision_date')) if isinstance(fr_json, dict) else None
                 chosen_date = existing_date or fr_date or ar_date
@@ -1336,16 +1289,16 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
                 cursor.execute("""
                     UPDATE supreme_court_decisions
                     SET decision_date = COALESCE(%s, decision_date),
-                        summary_ar = ?,
-                        summary_fr = ?,
-                        title_ar = ?,
-                        title_fr = ?,
-                        entities_ar = ?,
-                        entities_fr = ?,
-                        keywords_ar = ?,
-                        keywords_fr = ?,
+                        summary_ar = %s,
+                        summary_fr = %s,
+                        title_ar = %s,
+                        title_fr = %s,
+                        entities_ar = %s,
+                        entities_fr = %s,
+                        keywords_ar = %s,
+                        keywords_fr = %s,
                         updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
+                    WHERE id = %s
                 """, (
                     chosen_date,
                     ar_json.get('summary'),
@@ -1361,6 +1314,10 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
                 
                 results['success'].append(dec['number'])
                 print(f"   ✅ {dec['number']} analysée")
+                pending += 1
+                if pending >= ANALYSIS_COMMIT_BATCH:
+                    conn.commit()
+                    pending = 0
                 
             except Exception as e:
                 print(f"   ❌ Erreur {dec['number']}: {e}")
@@ -1374,6 +1331,7 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
             'failed_count': len(results['failed']),
             'skipped_count': len(results['skipped']),
             'results': results,
+            'openai_retries': executor.stats['retries'],
             'message': f"✅ {len(results['success'])} analysées, ❌ {len(results['failed'])} échecs"
         })
         
@@ -1381,10 +1339,10 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""}
         return jsonify({'error': str(e)}), 500
 
 @coursupreme_bp.route('/batch/embed', methods=['POST'])
+@queued_batch('decision_ids')
 def batch_embed():
     """Générer embeddings pour plusieurs décisions avec SentenceTransformer"""
     from flask import request
-    from sentence_transformers import SentenceTransformer
     from bs4 import BeautifulSoup
     import numpy as np
     
@@ -1396,24 +1354,24 @@ def batch_embed():
         if not decision_ids:
             return jsonify({'error': 'Aucune décision spécifiée'}), 400
         
-        # Initialiser le modèle d'embedding
-        print("🧬 Chargement du modèle d'embedding...")
-        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        embedding_model = get_embedding_model()
+        if embedding_model is None:
+            return jsonify({'error': "Aucun modèle d'embedding disponible"}), 500
         
         conn = get_connection_simple()
         cursor = conn.cursor()
         
         # Récupérer les décisions
-        placeholders = ','.join('?' * len(decision_ids))
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT id, decision_number, html_content_ar, html_content_fr, 
                    download_status, summary_ar, summary_fr, embedding_ar, embedding_fr,
                    file_path_ar, file_path_fr
             FROM supreme_court_decisions
-            WHERE id IN ({placeholders})
-        """, decision_ids)
+            WHERE id = ANY(%s)
+        """, ([int(dec_id) for dec_id in decision_ids],))
         
         decisions = cursor.fetchall()
+        stored_files = _stored_decision_files(decisions)
         
         # Vérifier dépendances
         missing_download = []
@@ -1422,10 +1380,14 @@ def batch_embed():
         to_embed = []
         
         for dec in decisions:
-            dec_id, number, html_ar, html_fr, dl_status, sum_ar, sum_fr, embedding_ar, embedding_fr, file_ar, file_fr = dec
+            dec_id, number = dec['id'], dec['decision_number']
+            html_ar, html_fr = dec['html_content_ar'], dec['html_content_fr']
+            dl_status, sum_ar, sum_fr = dec['download_status'], dec['summary_ar'], dec['summary_fr']
+            embedding_ar, embedding_fr = dec['embedding_ar'], dec['embedding_fr']
+            file_ar, file_fr = dec['file_path_ar'], dec['file_path_fr']
 
-            available_ar = bool(html_ar) or (file_ar and file_exists(file_ar))
-            available_fr = bool(html_fr) or (file_fr and file_exists(file_fr))
+            available_ar = bool(html_ar) or stored_files.get(file_ar, False)
+            available_fr = bool(html_fr) or stored_files.get(file_fr, False)
 
             if not available_ar or dl_status not in ('downloaded', 'completed'):
                 missing_download.append(number)
@@ -1517,6 +1479,9 @@ def batch_embed():
                         updated_at = CURRENT_TIMESTAMP
                     WHERE id = %s
                 """, (embedding_bytes_fr, embedding_bytes_ar, dec['id']))
+                if pgvector_enabled():
+                    # Même priorité que l'index en mémoire : vecteur FR.
+                    write_vectors(cursor, 'supreme_court_decisions', [(dec['id'], embedding_vector_fr)])
                 
                 results['success'].append(dec['number'])
                 print(f"   ✅ {dec['number']} embeddings générés (FR: {len(embedding_bytes_fr)} bytes, AR: {len(embedding_bytes_ar)} bytes)")
@@ -1687,52 +1652,27 @@ def rebuild_french_index():
         return jsonify({'error': str(e)}), 500
 
 
-@coursupreme_bp.route('/search/advanced', methods=['GET'])
-def advanced_search():
-    """Recherche avancée (PostgreSQL) : mots-clés, dates, décision, chambres/thèmes."""
-    keywords_inc = request.args.get('keywords_inc', '')
-    keywords_or = request.args.get('keywords_or', '')
-    keywords_exc = request.args.get('keywords_exc', '')
-    decision_number = request.args.get('decision_number', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
-    from datetime import date as _date
-    if isinstance(date_from, (datetime, _date)):
-        date_from = date_from.strftime('%Y-%m-%d')
-    if isinstance(date_to, (datetime, _date)):
-        date_to = date_to.strftime('%Y-%m-%d')
-    chambers_inc = [int(x) for x in _parse_id_list(request.args.get('chambers_inc', '')) if str(x).isdigit()]
-    chambers_or = [int(x) for x in _parse_id_list(request.args.get('chambers_or', '')) if str(x).isdigit()]
-    themes_inc = [int(x) for x in _parse_id_list(request.args.get('themes_inc', '')) if str(x).isdigit()]
-    themes_or = [int(x) for x in _parse_id_list(request.args.get('themes_or', '')) if str(x).isdigit()]
-
-    tokens_inc = tokenize_query_param(keywords_inc)
-    tokens_or = tokenize_query_param(keywords_or)
-    tokens_exc = tokenize_query_param(keywords_exc)
-
+def _keyword_filter_clauses(args) -> tuple[list[str], list]:
+    """Filtres texte de /search/advanced (mots-clés, numéro de décision) en clauses SQL."""
     where = []
     params = []
 
+    decision_number = args.get('decision_number', '')
     if decision_number:
         where.append("decision_number ILIKE %s")
         params.append(f"%{decision_number}%")
 
-    if date_from:
-        where.append("decision_date >= %s")
-        params.append(parse_fuzzy_date(date_from))
-    if date_to:
-        where.append("decision_date <= %s")
-        params.append(parse_fuzzy_date(date_to, is_end=True))
-
-    def add_token_clause(token):
+    def add_token_clause(token, negate=False):
         where.append(
-            "(object_ar ILIKE %s OR object_fr ILIKE %s OR title_ar ILIKE %s OR title_fr ILIKE %s)"
+            ("NOT " if negate else "")
+            + "(object_ar ILIKE %s OR object_fr ILIKE %s OR title_ar ILIKE %s OR title_fr ILIKE %s)"
         )
         params.extend([f"%{token}%"] * 4)
 
-    for tok in tokens_inc:
+    for tok in tokenize_query_param(args.get('keywords_inc', '')):
         add_token_clause(tok)
 
+    tokens_or = tokenize_query_param(args.get('keywords_or', ''))
     if tokens_or:
         ors = []
         for tok in tokens_or:
@@ -1742,12 +1682,35 @@ def advanced_search():
             params.extend([f"%{tok}%"] * 4)
         where.append("(" + " OR ".join(ors) + ")")
 
-    if tokens_exc:
-        for tok in tokens_exc:
-            where.append(
-                "NOT (object_ar ILIKE %s OR object_fr ILIKE %s OR title_ar ILIKE %s OR title_fr ILIKE %s)"
-            )
-            params.extend([f"%{tok}%"] * 4)
+    for tok in tokenize_query_param(args.get('keywords_exc', '')):
+        add_token_clause(tok, negate=True)
+
+    return where, params
+
+
+@coursupreme_bp.route('/search/advanced', methods=['GET'])
+def advanced_search():
+    """Recherche avancée (PostgreSQL) : mots-clés, dates, décision, chambres/thèmes."""
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    from datetime import date as _date
+    if isinstance(date_from, (datetime, _date)):
+        date_from = date_from.strftime('%Y-%m-%d')
+    if isinstance(date_to, (datetime, _date)):
+        date_to = date_to.strftime('%Y-%m-%d')
+    chambers_inc = [int(x) for x in _parse_id_list(request.args.get('chambers_inc', '')) if str(x).isdigit()]
+    chambers_or = [int(x) for x in _parse_id_list(request.args.get('chambers_or', '')) if str(x).isdigit()]
+    themes_inc = [int(x) for x in _parse_id_list(request.args.get('themes_inc', '')) if str(x).isdigit()]
+    themes_or = [int(x) for x in _parse_id_list(request.args.get('themes_or', '')) if str(x).isdigit()]
+
+    where, params = _keyword_filter_clauses(request.args)
+
+    if date_from:
+        where.append("decision_date >= %s")
+        params.append(parse_fuzzy_date(date_from))
+    if date_to:
+        where.append("decision_date <= %s")
+        params.append(parse_fuzzy_date(date_to, is_end=True))
 
     if chambers_inc:
         placeholders = ",".join(["%s"] * len(chambers_inc))
@@ -1806,6 +1769,116 @@ def advanced_search():
         return jsonify({'error': str(e)}), 500
 
 
+SEMANTIC_CLASSIFICATION_FILTERS = (
+    ('chamber_id', 'chambers_inc'),
+    ('theme_id', 'themes_inc'),
+    ('chamber_id', 'chambers_or'),
+    ('theme_id', 'themes_or'),
+)
+
+
+def _semantic_filter_clauses(args) -> tuple[list[str], list]:
+    """Filtres de /search/advanced (texte, dates, chambres, thèmes) en clauses SQL."""
+    where, params = _keyword_filter_clauses(args)
+    date_from = args.get('date_from', '')
+    date_to = args.get('date_to', '')
+    if date_from:
+        where.append("decision_date >= %s")
+        params.append(parse_fuzzy_date(date_from))
+    if date_to:
+        where.append("decision_date <= %s")
+        params.append(parse_fuzzy_date(date_to, is_end=True))
+    for column, param in SEMANTIC_CLASSIFICATION_FILTERS:
+        ids = _parse_id_list(args.get(param, ''))
+        if ids:
+            where.append(
+                f"id IN (SELECT decision_id FROM supreme_court_decision_classifications WHERE {column} = ANY(%s))"
+            )
+            params.append(ids)
+    return where, params
+
+
+def _classification_mask(index: EmbeddingIndex, column: str, ids: list[int]) -> np.ndarray:
+    """Décisions classées dans l'une des chambres/thèmes `ids` (un bitmap par valeur, gardé sur l'index)."""
+    def build(value):
+        with get_pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT decision_id FROM supreme_court_decision_classifications WHERE {column} = %s",
+                    (value,),
+                )
+                return index.id_mask(row['decision_id'] for row in cur.fetchall())
+
+    mask = np.zeros(len(index), dtype=bool)
+    for value in ids:
+        mask |= index.cached(('classification', column, value), lambda: build(value))
+    return mask
+
+
+def _semantic_filter_mask(index: EmbeddingIndex, args) -> np.ndarray | None:
+    """
+    Filtres de /search/advanced sous forme de masque booléen sur les lignes
+    de l'index (None si aucun filtre). Dates et chambres/thèmes sont
+    vectorisés et mis en cache ; seuls les filtres texte passent par SQL.
+    """
+    masks = []
+    date_from = args.get('date_from', '')
+    date_to = args.get('date_to', '')
+    if date_from or date_to:
+        masks.append(index.date_mask(
+            'decision_date',
+            parse_fuzzy_date(date_from) if date_from else None,
+            parse_fuzzy_date(date_to, is_end=True) if date_to else None,
+        ))
+    for column, param in SEMANTIC_CLASSIFICATION_FILTERS:
+        ids = _parse_id_list(args.get(param, ''))
+        if ids:
+            masks.append(_classification_mask(index, column, ids))
+    where, params = _keyword_filter_clauses(args)
+    if where:
+        with get_pg_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT id FROM supreme_court_decisions WHERE {' AND '.join(where)}", params)
+                masks.append(index.id_mask(row['id'] for row in cur.fetchall()))
+    if not masks:
+        return None
+    return np.logical_and.reduce(masks)
+
+
+def _semantic_search_pgvector(query_vec, limit: int, score_threshold: float) -> dict:
+    """Classement effectué par PostgreSQL (EMBED_STORAGE=pgvector), filtres inclus."""
+    where, params = _semantic_filter_clauses(request.args)
+    with get_pg_connection() as conn:
+        with conn.cursor() as cur:
+            total = count_embedded(cur, 'supreme_court_decisions')
+            rows = nearest(
+                cur,
+                'supreme_court_decisions',
+                ('id', 'decision_number', 'decision_date', 'url'),
+                query_vec,
+                limit if limit > 0 else max(total, 1),
+                where,
+                params,
+            )
+    if limit <= 0 or limit > total:
+        limit = total
+
+    scored = [{**_cs_index_row(row), 'score': round(float(row['score']), 6)} for row in rows]
+    results = [row for row in scored if row['score'] >= score_threshold]
+    return {
+        "results": results,
+        "count": len(results),
+        "total": total,
+        "total_above_threshold": None,
+        "max_score": scored[0]['score'] if scored else None,
+        "min_score": scored[-1]['score'] if scored else None,
+        "score_threshold": float(score_threshold),
+        "score_at_limit": scored[-1]['score'] if scored else None,
+        "limit": limit,
+        "mode": "pgvector",
+    }
+
+
 @coursupreme_bp.route('/search/semantic', methods=['GET'])
 def semantic_search():
     """Recherche sémantique par embedding (PostgreSQL + R2, scores triés)."""
@@ -1823,56 +1896,71 @@ def semantic_search():
     except ValueError:
         score_threshold = 0.0
 
-    try:
-        cache = _load_cs_embeddings_cache()
-        if not cache:
-            return jsonify({'error': 'Aucun embedding disponible'}), 500
+    mode = resolve_search_mode(request.args.get('mode'))
 
-        model = get_embedding_model()
-        query_vec = model.encode(query, convert_to_numpy=True)
-        qnorm = np.linalg.norm(query_vec)
-        if qnorm == 0:
+    try:
+        query_vec = _CS_QUERY_ENCODER.encode(query)
+        if query_vec is None:
             return jsonify({'error': 'Embedding requête invalide'}), 400
-        query_vec = query_vec / qnorm
-
-        scored = []
-        for item in cache:
-            score = float(np.dot(query_vec, item["vector"]))
-            scored.append({
-                "id": item["id"],
-                "decision_number": item["decision_number"],
-                "decision_date": item["decision_date"],
-                "url": item["url"],
-                "score": round(score, 6),
-            })
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
+        if pgvector_enabled():
+            return jsonify(_semantic_search_pgvector(query_vec, limit, score_threshold))
 
-        if limit <= 0 or limit > len(scored):
-            limit = len(scored)
-
-        score_at_limit = scored[limit - 1]["score"] if scored else None
-        filtered = [s for s in scored if s["score"] >= score_threshold]
-        results = filtered[:limit]
-
-        def to_float(val):
-            try:
-                return float(val)
-            except Exception:
-                return None
+        index = _CS_EMBED_INDEX.get()
+        if not len(index):
+            return jsonify({'error': 'Aucun embedding disponible'}), 500
 
-        for item in results:
-            item["score"] = to_float(item.get("score"))
+        # Filtres appliqués avant le top-k : seules les lignes retenues sont scorées.
+        mask = _semantic_filter_mask(index, request.args)
+        subset = None if mask is None else np.flatnonzero(mask)
+        total = len(index) if subset is None else int(subset.size)
+        if limit <= 0 or limit > total:
+            limit = total
+
+        # Mode ANN : seulement pour un top-k partiel sans filtre, sinon (ou tant
+        # que l'index ANN n'est pas prêt) on reste sur le calcul exact.
+        hits = None
+        if mode == "ann" and subset is None and limit < total:
+            hits = _CS_ANN.search(index, query_vec, limit, get_snapshot_dir(DEFAULT_SNAPSHOT_DIR))
+        if hits is not None:
+            top, top_scores = hits[0], np.round(hits[1], 6)
+            max_score = float(top_scores[0]) if top.size else None
+            min_score = float(top_scores[-1]) if top.size else None
+            total_above_threshold = None
+        else:
+            mode = "exact"
+            # Un seul produit matrice-vecteur pour tout le corpus (ou le sous-ensemble filtré).
+            scores = np.round(index.scores(query_vec, subset), 6)
+            # Sélection partielle : seules les `limit` meilleures lignes sont triées.
+            top = top_k_indices(scores, limit)
+            top_scores = scores[top]
+            if subset is not None:
+                top = subset[top]
+            max_score = float(scores.max()) if scores.size else None
+            min_score = float(scores.min()) if scores.size else None
+            total_above_threshold = int(np.count_nonzero(scores >= score_threshold))
+
+        score_at_limit = float(top_scores[-1]) if top.size else None
+        keep = top_scores >= score_threshold
+        top, top_scores = top[keep], top_scores[keep]
+
+        results = []
+        for pos, score in zip(top.tolist(), top_scores.tolist()):
+            entry = index.row(pos)
+            entry["score"] = score
+            results.append(entry)
 
         return jsonify({
             "results": results,
             "count": len(results),
-            "total": len(scored),
-            "max_score": to_float(scored[0]["score"]) if scored else None,
-            "min_score": to_float(scored[-1]["score"]) if scored else None,
-            "score_threshold": to_float(score_threshold),
-            "score_at_limit": to_float(score_at_limit),
+            "total": total,
+            "total_above_threshold": total_above_threshold,
+            "max_score": max_score,
+            "min_score": min_score,
+            "score_threshold": float(score_threshold),
+            "score_at_limit": score_at_limit,
             "limit": limit,
+            "mode": mode,
         })
     except Exception as exc:
         return jsonify({'error': str(exc)}), 500
@@ -1966,21 +2054,17 @@ def download_single_decision(decision_id):
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-def file_exists(path):
-    url = _build_access_url(path)
-    if not url:
-        return False
-    try:
-        resp = requests.head(url, timeout=10)
-        if resp.status_code == 403:
-            # Certains buckets privés refusent HEAD : on tente un GET léger.
-            resp = requests.get(url, stream=True, timeout=10)
-            exists = resp.status_code == 200
-            resp.close()
-            return exists
-        return resp.status_code == 200
-    except Exception:
-        return False
+
+
+def _stored_decision_files(decisions) -> dict:
+    """Présence R2 des fichiers AR/FR des décisions sans HTML en base, en une vérification groupée."""
+    paths = []
+    for dec in decisions:
+        if not dec['html_content_ar']:
+            paths.append(dec['file_path_ar'])
+        if not dec['html_content_fr']:
+            paths.append(dec['file_path_fr'])
+    return _R2_INDEX.exists_many(paths)
 
 
 def load_html_content(in_memory_html, file_path):
@@ -2052,3 +2136,148 @@ def export_decisions():
         return send_file(buffer, as_attachment=True, download_name=download_name, mimetype='application/zip')
     except TypeError:
         return send_file(buffer, as_attachment=True, attachment_filename=download_name, mimetype='application/zip')
+
+
+# ============================================================================
+# MODE BATCH API (backfills, voir batch_ai_backfill.py)
+# ============================================================================
+
+BATCH_TRANSLATION_KIND = 'coursupreme_translation'
+BATCH_ANALYSIS_KIND = 'coursupreme_analysis'
+
+
+def _select_batch_decisions(condition: str, limit: int | None, open_ids: set) -> list:
+    """Décisions téléchargées répondant à `condition`, hors celles déjà dans un lot ouvert."""
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, decision_date, html_content_ar, html_content_fr, file_path_ar, file_path_fr
+            FROM supreme_court_decisions
+            WHERE download_status IN ('downloaded', 'completed')
+              AND (html_content_ar IS NOT NULL OR file_path_ar IS NOT NULL)
+              AND {condition}
+            ORDER BY id ASC
+            """
+        )
+        rows = [row for row in cur.fetchall() if row['id'] not in open_ids]
+    return rows[:limit] if limit else rows
+
+
+def _build_translation_batch(limit: int | None, exclude: set):
+    """Lignes Batch API pour les décisions sans version française."""
+    open_ids = {int(parse_custom_id(value)[0]) for value in exclude}
+    decisions = _select_batch_decisions(
+        "html_content_fr IS NULL AND file_path_fr IS NULL", limit, open_ids
+    )
+    for dec in decisions:
+        html_ar = load_html_content(dec['html_content_ar'], dec['file_path_ar'])
+        if not html_ar:
+            continue
+        text_ar = _decision_text(html_ar)
+        yield batch_request(
+            custom_id(BATCH_TRANSLATION_KIND, dec['id']),
+            cache_key=_translation_cache_key(text_ar),
+            **_translation_request(text_ar),
+        )
+
+
+def _ingest_translation_batch(results: list) -> dict:
+    translated = [(_translated_html(result.content), int(parse_custom_id(result.custom_id)[0]))
+                  for result in results if result.error is None]
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            UPDATE supreme_court_decisions AS d
+            SET html_content_fr = v.html_fr,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(html_fr, id)
+            WHERE d.id = v.id
+            """,
+            translated,
+            page_size=ANALYSIS_COMMIT_BATCH,
+        )
+        conn.commit()
+    return {'translated': len(translated), 'failed': len(results) - len(translated)}
+
+
+def _build_analysis_batch(limit: int | None, exclude: set):
+    """Deux lignes (AR, FR) par décision traduite et non résumée."""
+    open_ids = {int(parse_custom_id(value)[0]) for value in exclude}
+    decisions = _select_batch_decisions(
+        "(html_content_fr IS NOT NULL OR file_path_fr IS NOT NULL) AND (summary_ar IS NULL OR summary_fr IS NULL)",
+        limit,
+        open_ids,
+    )
+    for dec in decisions:
+        html = {
+            'ar': load_html_content(dec['html_content_ar'], dec['file_path_ar']),
+            'fr': load_html_content(dec['html_content_fr'], dec['file_path_fr']),
+        }
+        if not html['ar'] or not html['fr']:
+            continue
+        for lang, langue in ANALYSIS_LANGUAGES.items():
+            text = _decision_text(html[lang])
+            yield batch_request(
+                custom_id(BATCH_ANALYSIS_KIND, dec['id'], lang),
+                cache_key=_decision_analysis_cache_key(lang, text),
+                **_decision_analysis_request(langue, text),
+            )
+
+
+def _ingest_analysis_batch(results: list) -> dict:
+    """Écrit les colonnes AR/FR reçues ; une langue manquante reste à traiter au lot suivant."""
+    analyses: dict = {}
+    failed = 0
+    for result in results:
+        dec_id, lang = parse_custom_id(result.custom_id)
+        try:
+            if result.error is not None:
+                raise ValueError(result.error)
+            analyses.setdefault(int(dec_id), {})[lang] = _parse_decision_analysis(result.content)
+        except ValueError as exc:
+            print(f"   ❌ Erreur {dec_id} ({lang}): {exc}")
+            failed += 1
+
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, decision_date FROM supreme_court_decisions WHERE id = ANY(%s)",
+            (list(analyses),),
+        )
+        existing_dates = {row['id']: row['decision_date'] for row in cur.fetchall()}
+        for index, (dec_id, by_lang) in enumerate(analyses.items(), 1):
+            ar_json, fr_json = by_lang.get('ar'), by_lang.get('fr')
+            candidates = [existing_dates.get(dec_id)]
+            candidates += [payload.get('decision_date') for payload in (fr_json, ar_json) if isinstance(payload, dict)]
+            chosen_date = next(filter(None, map(normalize_decision_date_value, candidates)), None)
+            values = []
+            for payload in (ar_json, fr_json):
+                payload = payload if isinstance(payload, dict) else None
+                values += [
+                    payload.get('summary') if payload else None,
+                    payload.get('title') if payload else None,
+                    json.dumps(payload.get('entities', []), ensure_ascii=False) if payload else None,
+                    json.dumps(payload.get('keywords', []), ensure_ascii=False) if payload else None,
+                ]
+            cur.execute("""
+                UPDATE supreme_court_decisions
+                SET decision_date = COALESCE(%s, decision_date),
+                    summary_ar = COALESCE(%s, summary_ar),
+                    title_ar = COALESCE(%s, title_ar),
+                    entities_ar = COALESCE(%s, entities_ar),
+                    keywords_ar = COALESCE(%s, keywords_ar),
+                    summary_fr = COALESCE(%s, summary_fr),
+                    title_fr = COALESCE(%s, title_fr),
+                    entities_fr = COALESCE(%s, entities_fr),
+                    keywords_fr = COALESCE(%s, keywords_fr),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (chosen_date, *values, dec_id))
+            if index % ANALYSIS_COMMIT_BATCH == 0:
+                conn.commit()
+        conn.commit()
+    return {'analyzed': len(analyses), 'failed': failed}
+
+
+register_batch_kind(BATCH_TRANSLATION_KIND, _build_translation_batch, _ingest_translation_batch)
+register_batch_kind(BATCH_ANALYSIS_KIND, _build_analysis_batch, _ingest_analysis_batch)
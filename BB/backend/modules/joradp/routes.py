@@ -8,19 +8,32 @@ import time
 import zipfile
 from datetime import datetime, date
 from functools import lru_cache
-from requests.adapters import HTTPAdapter
+from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from shared.r2_storage import (
     generate_presigned_url,
     build_public_url,
+    get_r2_reader,
     upload_bytes,
+    upload_stream,
     delete_object as delete_r2_object,
     normalize_key,
 )
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 from shared.postgres import get_connection as get_pg_connection
+from shared.r2_index import get_r2_index
+from shared.background_jobs import Job, enqueue, register_handler
+from shared.http_client import build_session
+from shared.llm_executor import ChatExecutor, openai_available, openai_client
+from shared.llm_cache import cache_key, get_llm_cache
+from shared.openai_batch import BatchResult, batch_request, custom_id, parse_custom_id, register_batch_kind
+from shared.embedding_index import EmbeddingIndex, TableIndexCache, get_snapshot_dir, top_k_indices
+from shared.ann_index import AnnCache, resolve_search_mode
+from shared.pgvector_store import count_embedded, nearest, pgvector_enabled, write_vectors
+from shared.query_encoder import QueryEncoder
+from shared.model_registry import DEFAULT_MODEL, get_model
+from jobs_routes import queued_batch
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 joradp_bp = Blueprint('joradp', __name__)
 
@@ -28,18 +41,13 @@ joradp_bp = Blueprint('joradp', __name__)
 JORADP_R2_PREFIX = "Textes_juridiques_DZ/joradp.dz"
 
 
-def _build_r2_session():
-    session = requests.Session()
-    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, pool_block=True)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    session.headers.setdefault("User-Agent", "DocHarvester/1.0")
-    return session
+_R2 = get_r2_reader()
+_R2_INDEX = get_r2_index()
 
-
-_R2_SESSION = _build_r2_session()
-_EMBEDDING_MODEL = None
-_EMBED_CACHE = None
+JORADP_INDEX_FIELDS = ("url", "publication_date", "file_path_r2", "text_path_r2")
+JORADP_SNAPSHOT_NAME = "bb_joradp"
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parents[2] / ".cache" / "embeddings"
+_EMBED_ANN = AnnCache(JORADP_SNAPSHOT_NAME)
 
 
 def _serialize_date(value):
@@ -51,10 +59,12 @@ def _serialize_date(value):
 
 
 def get_embedding_model():
-    global _EMBEDDING_MODEL
-    if _EMBEDDING_MODEL is None:
-        _EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    return _EMBEDDING_MODEL
+    """Modèle d'embedding partagé par tout le processus (cf. shared.model_registry)."""
+    return get_model()
+
+
+# Vecteurs de requêtes : cache LRU + encodage groupé des requêtes concurrentes.
+_QUERY_ENCODER = QueryEncoder(get_embedding_model, DEFAULT_MODEL)
 
 
 def decode_embedding(blob: bytes | memoryview | None) -> np.ndarray | None:
@@ -66,73 +76,30 @@ def decode_embedding(blob: bytes | memoryview | None) -> np.ndarray | None:
     return arr if arr.size else None
 
 
-def _download_embedding(url: str) -> bytes | None:
-    try:
-        resp = _R2_SESSION.get(url, timeout=20)
-        if resp.ok:
-            return resp.content
-    except Exception:
-        return None
-    return None
-
-
-def _build_embedding_url(raw_path: str | None) -> str | None:
-    if not raw_path:
-        return None
-    presigned = generate_presigned_url(raw_path)
-    if presigned:
-        return presigned
-    return build_public_url(raw_path)
-
-
-def _load_embeddings_cache():
-    global _EMBED_CACHE
-    if _EMBED_CACHE is not None:
-        return _EMBED_CACHE
-
-    cache = []
-    with get_pg_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, url, publication_date, file_path_r2, text_path_r2, embeddings_r2
-                FROM joradp_documents
-                WHERE embeddings_r2 IS NOT NULL
-                """
-            )
-            rows = cur.fetchall()
-
-    def worker(row):
-        emb_url = _build_embedding_url(row["embeddings_r2"])
-        if not emb_url:
-            return None
-        blob = _download_embedding(emb_url)
-        vec = decode_embedding(blob)
-        if vec is None or vec.size == 0:
-            return None
-        norm = np.linalg.norm(vec)
-        if norm == 0:
-            return None
-        vec = vec / norm  # pré-normalisation pour accélérer le scoring
-        return {
-            "id": row["id"],
-            "url": row["url"],
-            "publication_date": _serialize_date(row["publication_date"]),
-            "file_path_r2": row["file_path_r2"],
-            "text_path_r2": row["text_path_r2"],
-            "vector": vec,
-        }
+def _fetch_embedding_vector(raw_path: str) -> np.ndarray | None:
+    return decode_embedding(_R2.get(raw_path, timeout=20))
+
+
+# Index JORADP : snapshot disque + rafraîchissement incrémental (cf. shared.embedding_index).
+_EMBED_INDEX = TableIndexCache(
+    JORADP_SNAPSHOT_NAME,
+    table="joradp_documents",
+    columns=("id", "url", "publication_date", "file_path_r2", "text_path_r2", "embeddings_r2"),
+    fields=JORADP_INDEX_FIELDS,
+    embedded="embeddings_r2 IS NOT NULL",
+    changed_at="GREATEST(updated_at, embedded_at)",
+    source_of=lambda row: row.get("embeddings_r2"),
+    fetch_vector=_fetch_embedding_vector,
+    prepare=lambda row: {**row, "publication_date": _serialize_date(row["publication_date"])},
+    snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+    label="JORADP",
+    max_workers=12,
+)
 
-    # Téléchargement parallèle pour éviter une attente interminable sur la première requête.
-    with ThreadPoolExecutor(max_workers=12) as executor:
-        futures = [executor.submit(worker, row) for row in rows]
-        for fut in as_completed(futures):
-            item = fut.result()
-            if item:
-                cache.append(item)
 
-    _EMBED_CACHE = cache
-    return _EMBED_CACHE
+def _load_embeddings_cache() -> EmbeddingIndex:
+    """Charge (une fois) la matrice d'embeddings JORADP."""
+    return _EMBED_INDEX.load()
 
 
 def _extract_year_from_filename(filename: str) -> str:
@@ -304,56 +271,16 @@ def _ensure_public_url(raw_path: str | None) -> str | None:
 
 
 def _fetch_r2_text(raw_path: str | None) -> str | None:
-    if not raw_path:
-        return None
-    url = generate_presigned_url(raw_path) or build_public_url(raw_path)
-    if not url:
-        return None
-    try:
-        with _R2_SESSION.get(url, timeout=60) as resp:
-            if resp.ok:
-                resp.encoding = 'utf-8'
-                return resp.text
-    except Exception:
-        return None
-    return None
+    return _R2.get_text(raw_path)
 
 
 def _fetch_r2_bytes(raw_path: str | None) -> bytes | None:
-    if not raw_path:
-        return None
-    url = generate_presigned_url(raw_path) or build_public_url(raw_path)
-    if not url:
-        return None
-    try:
-        with _R2_SESSION.get(url, timeout=60) as resp:
-            if resp.ok:
-                return resp.content
-    except Exception:
-        return None
-    return None
+    return _R2.get(raw_path)
 
 
 @lru_cache(maxsize=2048)
 def _r2_exists(raw_path: str | None) -> bool:
-    if not raw_path:
-        return False
-    url = generate_presigned_url(raw_path) or build_public_url(raw_path)
-    if not url:
-        return False
-    try:
-        resp = _R2_SESSION.head(url, timeout=10)
-        if resp.status_code == 403:
-            probe = _R2_SESSION.get(url, stream=True, timeout=10)
-            exists = probe.status_code == 200
-            probe.close()
-            resp.close()
-            return exists
-        exists = resp.status_code == 200
-        resp.close()
-        return exists
-    except Exception:
-        return False
+    return _R2_INDEX.exists(raw_path)
 
 
 @joradp_bp.before_app_request
@@ -379,6 +306,25 @@ def _derive_pdf_key(file_path: str | None, url: str) -> str:
     return _build_pdf_key(filename)
 
 
+TEXT_PREVIEW_LENGTH = 1500
+
+
+def _store_text_stats(cur, doc_id: int, text: str, page_count: int | None = None) -> str:
+    """Enregistre l'aperçu, le nombre de caractères et de pages du texte extrait ; retourne l'aperçu."""
+    preview = text[:TEXT_PREVIEW_LENGTH]
+    cur.execute(
+        """
+        UPDATE joradp_documents
+        SET text_preview = %s,
+            text_char_count = %s,
+            text_page_count = COALESCE(%s, text_page_count)
+        WHERE id = %s
+        """,
+        (preview, len(text), page_count, doc_id),
+    )
+    return preview
+
+
 def _ensure_text_content(doc_id: int, file_path: str | None, text_path: str | None, url: str):
     """
     Retourne le texte associé à un document, en le générant si nécessaire.
@@ -389,7 +335,7 @@ def _ensure_text_content(doc_id: int, file_path: str | None, text_path: str | No
 
     pdf_bytes = _fetch_r2_bytes(file_path)
     if not pdf_bytes:
-        with _R2_SESSION.get(url, timeout=60) as response:
+        with _PDF_SESSION.get(url, timeout=60) as response:
             response.raise_for_status()
             pdf_bytes = response.content
 
@@ -416,6 +362,7 @@ def _ensure_text_content(doc_id: int, file_path: str | None, text_path: str | No
             """,
             (uploaded_text_url, doc_id),
         )
+        _store_text_stats(cur, doc_id, extracted_text, page_count=len(reader.pages))
         conn.commit()
 
     return extracted_text, uploaded_text_url
@@ -487,6 +434,9 @@ def get_document_metadata(doc_id):
                         d.file_size_bytes,
                         d.file_path_r2,
                         d.text_path_r2,
+                        d.text_preview,
+                        d.text_char_count,
+                        d.text_page_count,
                         d.metadata_collection_status,
                         d.download_status,
                         d.text_extraction_status,
@@ -620,7 +570,7 @@ def get_document_metadata(doc_id):
             'title_origin': title_origin,
             'document_language': row.get('metadata_language') or analysis_metadata.get('language') or row.get('ai_language'),
             'language': row.get('metadata_language') or analysis_metadata.get('language') or row.get('ai_language'),
-            'document_page_count': row.get('metadata_page_count'),
+            'document_page_count': row.get('metadata_page_count') or row.get('text_page_count'),
             'metadata_description': row.get('metadata_description'),
             'summary': summary,
             'keywords': ', '.join(keywords_list),
@@ -634,11 +584,20 @@ def get_document_metadata(doc_id):
             'error_log': row.get('error_log'),
         }
 
-        text_content = _fetch_r2_text(doc.get('text_path'))
-        if text_content:
-            preview = text_content[:1500]
+        preview = row.get('text_preview')
+        text_char_count = row.get('text_char_count')
+        if preview is None and text_exists:
+            # Documents extraits avant l'enregistrement de l'aperçu : calculé une seule fois.
+            text_content = _fetch_r2_text(doc.get('text_path'))
+            if text_content:
+                with get_pg_connection() as conn, conn.cursor() as cur:
+                    preview = _store_text_stats(cur, doc_id, text_content)
+                    conn.commit()
+                text_char_count = len(text_content)
+        if preview:
             doc['text_preview'] = preview
             doc['text_preview_length'] = len(preview)
+            doc['text_char_count'] = text_char_count
 
         doc['extra_metadata'] = {
             'source': 'mizane_db',
@@ -1093,35 +1052,182 @@ def delete_sessions():
         return jsonify({'error': str(e)}), 500
 
 
+JORADP_DOWNLOAD_WORKERS = int(os.getenv("JORADP_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_STATUS_BATCH = 50
+_PDF_SESSION = build_session(JORADP_DOWNLOAD_WORKERS)
+
+
+class _CountingReader:
+    """Flux HTTP brut transmis à R2 en comptant les octets lus."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.size = 0
+
+    def read(self, amt=-1):
+        chunk = self.raw.read() if amt is None or amt < 0 else self.raw.read(amt)
+        self.size += len(chunk)
+        return chunk
+
+
+def _stream_pdf_to_r2(url: str) -> tuple[str, int]:
+    """Télécharge un PDF en flux directement vers R2 ; retourne (URL R2, taille)."""
+    with _PDF_SESSION.get(url, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        body = _CountingReader(response.raw)
+        uploaded_url = upload_stream(_build_pdf_key(url.split('/')[-1]), body, content_type='application/pdf')
+    return uploaded_url, body.size
+
+
+def _flush_download_statuses(succeeded: list, failed: list) -> None:
+    """Écrit un lot de statuts de téléchargement (deux UPDATE ... FROM (VALUES) au plus)."""
+    if not succeeded and not failed:
+        return
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        if succeeded:
+            execute_values(
+                cur,
+                """
+                UPDATE joradp_documents AS d
+                SET download_status = 'success',
+                    downloaded_at = timezone('utc', now()),
+                    file_path_r2 = v.file_path_r2,
+                    file_size_bytes = v.size
+                FROM (VALUES %s) AS v(id, file_path_r2, size)
+                WHERE d.id = v.id
+                """,
+                succeeded,
+            )
+        if failed:
+            execute_values(
+                cur,
+                """
+                UPDATE joradp_documents AS d
+                SET download_status = 'failed',
+                    error_log = v.error
+                FROM (VALUES %s) AS v(id, error)
+                WHERE d.id = v.id
+                """,
+                failed,
+            )
+        conn.commit()
+
+
+def _select_download_documents(session_id: int, document_ids: list | None = None) -> list:
+    """Documents de la session à (re)télécharger, éventuellement restreints à `document_ids`."""
+    where_clauses = ["d.session_id = %s", "(d.download_status = 'pending' OR d.download_status = 'failed')"]
+    params = [session_id]
+
+    if document_ids is not None:
+        where_clauses.append("d.id = ANY(%s)")
+        params.append(document_ids)
+
+    where_sql = " AND ".join(where_clauses)
+
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT d.id, d.url
+            FROM joradp_documents d
+            WHERE {where_sql}
+            """,
+            tuple(params),
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
+def _download_documents(job: Job, documents: list, workers: int) -> dict:
+    """Étape de téléchargement : `workers` PDF en parallèle, statuts écrits par lots."""
+    job.update(total=len(documents), done=0, downloaded=0, failed=0)
+    succeeded, failed = [], []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_stream_pdf_to_r2, doc['url']): doc['id'] for doc in documents}
+        for future in as_completed(futures):
+            doc_id = futures[future]
+            try:
+                uploaded_url, size = future.result()
+                succeeded.append((doc_id, uploaded_url, size))
+                job.increment(done=1, downloaded=1)
+            except Exception as e:
+                failed.append((doc_id, str(e)))
+                job.increment(done=1, failed=1)
+
+            if len(succeeded) + len(failed) >= DOWNLOAD_STATUS_BATCH:
+                _flush_download_statuses(succeeded, failed)
+                succeeded, failed = [], []
+                # Annulation prise en compte entre deux lots de statuts.
+                if job.cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    job.check_cancelled()
+
+    _flush_download_statuses(succeeded, failed)
+    return {
+        'downloaded': job.progress['downloaded'],
+        'failed': job.progress['failed'],
+        'total': len(documents),
+    }
+
+
+def _download_session_job(job: Job, session_id: int, document_ids: list | None = None, workers: int = JORADP_DOWNLOAD_WORKERS) -> dict:
+    """Handler de la file background_jobs : la sélection est refaite au moment de l'exécution."""
+    return _download_documents(job, _select_download_documents(session_id, document_ids), workers)
+
+
+register_handler('joradp_download', _download_session_job)
+
+
+def _harvest_exhaustive_job(job: Job, session_id: int, start_year: int, end_year: int | None = None, resume: bool = True, workers: int | None = None) -> dict:
+    """Handler de la file background_jobs : moissonnage exhaustif, une étape de progression par année."""
+    from harvester_joradp_incremental import JORADPIncrementalHarvester
+
+    harvester = JORADPIncrementalHarvester(session_id, year_workers=workers)
+
+    def on_year(year, done, total):
+        job.update(force=True, done=done, total=total, year=year, found=harvester.stats['total_found'])
+        job.check_cancelled()
+
+    # Une nouvelle tentative repart des points de contrôle de la précédente.
+    harvester.harvest_all(
+        start_year=start_year,
+        end_year=end_year,
+        resume=resume or bool(job.progress.get('done')),
+        on_year=on_year,
+    )
+    return {
+        'mode': 'exhaustif',
+        'found': harvester.stats['total_found'],
+        'years_processed': harvester.stats['years_processed'],
+        'failed_years': harvester.stats['failed_years'],
+        'workers': harvester.year_workers,
+    }
+
+
+register_handler('joradp_harvest_exhaustive', _harvest_exhaustive_job)
+
+
 @joradp_bp.route('/sessions/<int:session_id>/download', methods=['POST'])
 def download_documents_batch(session_id):
-    """Télécharger les PDFs en batch"""
+    """
+    Télécharger les PDFs en batch.
+
+    Par défaut le téléchargement passe par la file de tâches de fond : la
+    réponse (202) contient `job_id`, à suivre via GET /api/jobs/<job_id>.
+    `wait: true` conserve l'ancien comportement synchrone.
+    """
     try:
         data = request.json or {}
         mode = data.get('mode', 'all')
 
-        where_clauses = ["d.session_id = %s", "(d.download_status = 'pending' OR d.download_status = 'failed')"]
-        params = [session_id]
-
+        document_ids = None
         if mode == 'selected':
-            doc_ids = data.get('document_ids', [])
-            if not doc_ids:
+            document_ids = data.get('document_ids', [])
+            if not document_ids:
                 return jsonify({'error': 'Aucun document sélectionné'}), 400
-            where_clauses.append("d.id = ANY(%s)")
-            params.append(doc_ids)
-
-        where_sql = " AND ".join(where_clauses)
 
-        with get_pg_connection() as conn, conn.cursor() as cur:
-            cur.execute(
-                f"""
-                SELECT d.id, d.url
-                FROM joradp_documents d
-                WHERE {where_sql}
-                """,
-                tuple(params),
-            )
-            documents = cur.fetchall()
+        documents = _select_download_documents(session_id, document_ids)
 
         if not documents:
             return jsonify({
@@ -1130,55 +1236,23 @@ def download_documents_batch(session_id):
                 'downloaded': 0
             })
 
-        success_count = 0
-        failed_count = 0
-
-        for doc in documents:
-            doc_id = doc['id']
-            url = doc['url']
-
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                filename = url.split('/')[-1]
-                pdf_key = _build_pdf_key(filename)
-                uploaded_url = upload_bytes(pdf_key, response.content, content_type='application/pdf')
-
-                with get_pg_connection() as conn, conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        UPDATE joradp_documents
-                        SET download_status = 'success',
-                            downloaded_at = timezone('utc', now()),
-                            file_path_r2 = %s,
-                            file_size_bytes = %s
-                        WHERE id = %s
-                        """,
-                        (uploaded_url, len(response.content), doc_id),
-                    )
-                    conn.commit()
-                success_count += 1
+        workers = max(int(data.get('workers') or JORADP_DOWNLOAD_WORKERS), 1)
 
-            except Exception as e:
-                with get_pg_connection() as conn, conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        UPDATE joradp_documents
-                        SET download_status = 'failed',
-                            error_log = %s
-                        WHERE id = %s
-                        """,
-                        (str(e), doc_id),
-                    )
-                    conn.commit()
-                failed_count += 1
+        if data.get('wait'):
+            result = _download_documents(Job('joradp_download'), documents, workers)
+            return jsonify({'success': True, **result})
 
+        job = enqueue(
+            'joradp_download',
+            {'session_id': session_id, 'document_ids': document_ids, 'workers': workers},
+            total=len(documents),
+        )
         return jsonify({
             'success': True,
-            'downloaded': success_count,
-            'failed': failed_count,
-            'total': len(documents)
-        })
+            'job_id': job['id'],
+            'status_url': f"/api/jobs/{job['id']}",
+            'total': len(documents),
+        }), 202
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1223,23 +1297,20 @@ def export_selected_documents():
 
         buffer = io.BytesIO()
         added = 0
+        # Téléchargements R2 en parallèle (bornés par R2_READ_CONCURRENCY)
+        bodies = _R2.get_many(row['file_path_r2'] for row in docs)
         with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
             for row in docs:
                 raw_url = row['file_path_r2']
                 if not raw_url:
                     continue
-                signed = generate_presigned_url(raw_url, expires_in=600) or build_public_url(raw_url)
-                if not signed:
-                    continue
-                try:
-                    resp = _R2_SESSION.get(signed, timeout=30)
-                    resp.raise_for_status()
-                    filename = raw_url.split('/')[-1] or f'doc-{row["id"]}.pdf'
-                    archive.writestr(filename, resp.content)
-                    added += 1
-                except Exception as exc:
-                    print(f"⚠️  Export ZIP: échec doc {row['id']} - {exc}")
+                content = bodies.get(raw_url)
+                if content is None:
+                    print(f"⚠️  Export ZIP: échec doc {row['id']}")
                     continue
+                filename = raw_url.split('/')[-1] or f'doc-{row["id"]}.pdf'
+                archive.writestr(filename, content)
+                added += 1
 
         if added == 0:
             return jsonify({'error': 'Aucun fichier exporté (accès R2 ou URLs invalides)'}), 400
@@ -1256,14 +1327,12 @@ def export_selected_documents():
 
 
 @joradp_bp.route('/sessions/<int:session_id>/analyze', methods=['POST'])
+@queued_batch()
 def analyze_documents_batch(session_id):
     """Analyser les documents d'une session avec OpenAI IA (MizaneDb)."""
     try:
-        try:
-            from openai import OpenAI
-        except ImportError:
+        if not openai_available():
             return jsonify({'error': "Le module 'openai' est manquant. Installez-le dans le venv backend (pip install openai>=1.0.0)."}), 500
-        from analysis import get_embedding_model
 
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
@@ -1295,7 +1364,7 @@ def analyze_documents_batch(session_id):
 
         result = _run_ai_analysis(
             documents,
-            client=OpenAI(api_key=api_key),
+            client=openai_client(api_key),
             embedding_model=get_embedding_model(),
             force=True,
             generate_embeddings=True,
@@ -1312,7 +1381,13 @@ def analyze_documents_batch(session_id):
 
 @joradp_bp.route('/harvest/incremental', methods=['POST'])
 def incremental_harvest():
-    """Moissonnage incrémental JORADP"""
+    """
+    Moissonnage incrémental JORADP.
+
+    Le mode `exhaustif` passe par la file de tâches de fond : la réponse
+    (202) contient `job_id`, à suivre via GET /api/jobs/<job_id>.
+    `wait: true` conserve l'ancien comportement synchrone.
+    """
     try:
         data = request.json or {}
         session_id = data.get('session_id')
@@ -1321,8 +1396,37 @@ def incremental_harvest():
         if not session_id:
             return jsonify({'error': 'session_id requis'}), 400
 
+        # workers : nombre d'années moissonnées en parallèle (défaut JORADP_YEAR_WORKERS)
+        try:
+            workers = int(data['workers']) if data.get('workers') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'workers doit être un entier'}), 400
+
         from harvester_joradp_incremental import JORADPIncrementalHarvester
-        harvester = JORADPIncrementalHarvester(session_id)
+
+        if mode == 'exhaustif':
+            # Années réparties sur les workers, reprise depuis les points de contrôle.
+            params = {
+                'session_id': session_id,
+                'start_year': int(data.get('start_year') or JORADPIncrementalHarvester.FIRST_YEAR),
+                'end_year': int(data['end_year']) if data.get('end_year') else None,
+                'resume': bool(data.get('resume', True)),
+                'workers': workers,
+            }
+            if data.get('wait'):
+                return jsonify({'success': True, **_harvest_exhaustive_job(Job('joradp_harvest_exhaustive'), **params)})
+
+            total = (params['end_year'] or datetime.now().year) - params['start_year'] + 1
+            job = enqueue('joradp_harvest_exhaustive', params, total=max(total, 1))
+            return jsonify({
+                'success': True,
+                'mode': mode,
+                'job_id': job['id'],
+                'status_url': f"/api/jobs/{job['id']}",
+                'total': job['progress'].get('total'),
+            }), 202
+
+        harvester = JORADPIncrementalHarvester(session_id, year_workers=workers)
 
         if mode == 'depuis_dernier':
             harvester.harvest_depuis_dernier()
@@ -1348,7 +1452,10 @@ def incremental_harvest():
         result = {
             'success': True,
             'mode': mode,
-            'found': harvester.stats['total_found']
+            'found': harvester.stats['total_found'],
+            'years_processed': harvester.stats['years_processed'],
+            'failed_years': harvester.stats['failed_years'],
+            'workers': harvester.year_workers
         }
 
         # Ajouter infos du dernier document si disponible
@@ -1441,6 +1548,67 @@ def get_global_stats():
 # RECHERCHE SÉMANTIQUE (embeddings R2 → scoring en mémoire)
 # ============================================================================
 
+def _semantic_filter_clauses(args) -> tuple[list[str], list]:
+    """Filtres de date (date_from/date_to) en clauses SQL pour le mode pgvector."""
+    where = []
+    params = []
+    date_from = _parse_date_string(args.get('date_from'))
+    date_to = _parse_date_string(args.get('date_to'))
+    if date_from:
+        where.append("publication_date >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("publication_date <= %s")
+        params.append(date_to)
+    return where, params
+
+
+def _semantic_filter_mask(index: EmbeddingIndex, args) -> np.ndarray | None:
+    """Mêmes filtres de date, en masque booléen sur les lignes de l'index (None si aucun)."""
+    date_from = _parse_date_string(args.get('date_from'))
+    date_to = _parse_date_string(args.get('date_to'))
+    if not date_from and not date_to:
+        return None
+    return index.date_mask(
+        'publication_date',
+        date_from.isoformat() if date_from else None,
+        date_to.isoformat() if date_to else None,
+    )
+
+
+def _semantic_result(item: dict, score: float) -> dict:
+    """Hydrate un résultat : l'année vient de publication_date, sinon du nom de fichier de l'URL."""
+    year_str = None
+    pub_date = item.get("publication_date")
+    if pub_date:
+        try:
+            # Si c'est une date, extraire l'année
+            if hasattr(pub_date, 'year'):
+                year_str = str(pub_date.year)
+            # Si c'est une string YYYY-MM-DD
+            elif isinstance(pub_date, str) and len(pub_date) >= 4:
+                year_str = pub_date[:4]
+        except (AttributeError, ValueError):
+            pass
+
+    # Fallback sur l'année dans l'URL si pas de publication_date
+    if not year_str:
+        url = item["url"] or ""
+        filename = url.split('/')[-1]
+        if len(filename) >= 8 and filename.startswith('F') and filename[1:5].isdigit():
+            year_str = filename[1:5]
+
+    return {
+        "id": item["id"],
+        "url": item["url"],
+        "date": year_str,
+        "publication_date": _serialize_date(item["publication_date"]),
+        "file_path_r2": item["file_path_r2"],
+        "text_path_r2": item["text_path_r2"],
+        "score": score,
+    }
+
+
 @joradp_bp.route('/search/semantic', methods=['GET'])
 def semantic_search():
     query = (request.args.get('q') or '').strip()
@@ -1453,82 +1621,77 @@ def semantic_search():
         limit = 0
     # Par défaut, inclure tous les scores (même négatifs)
     score_threshold = float(request.args.get('score_threshold', -1.0) or -1.0)
+    mode = resolve_search_mode(request.args.get('mode'))
 
-    cache = _load_embeddings_cache()
-    if not cache:
-        return jsonify({'error': 'Aucun embedding disponible'}), 500
-
-    model = get_embedding_model()
-    query_vec = model.encode(query, convert_to_numpy=True)
-
-    scored = []
-    for item in cache:
-        score = float(np.dot(query_vec, item["vector"])) / (
-            np.linalg.norm(query_vec) * np.linalg.norm(item["vector"])
-        )
-
-        # Extraire l'année depuis publication_date (prioritaire) ou depuis l'URL en fallback
-        year_str = None
-        pub_date = item.get("publication_date")
-        if pub_date:
-            try:
-                # Si c'est une date, extraire l'année
-                if hasattr(pub_date, 'year'):
-                    year_str = str(pub_date.year)
-                # Si c'est une string YYYY-MM-DD
-                elif isinstance(pub_date, str) and len(pub_date) >= 4:
-                    year_str = pub_date[:4]
-            except (AttributeError, ValueError):
-                pass
-
-        # Fallback sur l'année dans l'URL si pas de publication_date
-        if not year_str:
-            url = item["url"] or ""
-            filename = url.split('/')[-1]
-            if len(filename) >= 8 and filename.startswith('F') and filename[1:5].isdigit():
-                year_str = filename[1:5]
-
-        scored.append(
-            {
-                "id": item["id"],
-                "url": item["url"],
-                "date": year_str,
-                "publication_date": _serialize_date(item["publication_date"]),
-                "file_path_r2": item["file_path_r2"],
-                "text_path_r2": item["text_path_r2"],
-                "score": round(score, 6),
-            }
-        )
-
-    scored.sort(key=lambda x: x["score"], reverse=True)
-
-    def to_float(val):
-        try:
-            return float(val)
-        except Exception:
-            return None
-
-    for item in scored:
-        item["score"] = to_float(item.get("score"))
-
-    if limit <= 0 or limit > len(scored):
-        limit = len(scored)
+    query_vec = _QUERY_ENCODER.encode(query)
+    if query_vec is None:
+        return jsonify({'error': 'Embedding requête invalide'}), 400
 
-    score_at_limit = scored[limit - 1]["score"] if scored else None
-
-    filtered = [s for s in scored if s["score"] >= score_threshold]
-    results = filtered[:limit]
+    # `scores` : un score par candidat ; `row_of(i)` hydrate le i-ème candidat.
+    if pgvector_enabled():
+        # Classement et filtres exécutés par PostgreSQL, aucun index en mémoire.
+        mode = "pgvector"
+        where, params = _semantic_filter_clauses(request.args)
+        with get_pg_connection() as conn, conn.cursor() as cur:
+            total = count_embedded(cur, 'joradp_documents')
+            rows = nearest(
+                cur,
+                'joradp_documents',
+                ('id',) + JORADP_INDEX_FIELDS,
+                query_vec,
+                limit if limit > 0 else max(total, 1),
+                where,
+                params,
+            )
+        scores = np.array([float(row['score']) for row in rows], dtype=np.float32)
+        row_of = rows.__getitem__
+    else:
+        index = _EMBED_INDEX.get()
+        if not len(index):
+            return jsonify({'error': 'Aucun embedding disponible'}), 500
+        # Filtre de dates appliqué avant le scoring.
+        mask = _semantic_filter_mask(index, request.args)
+        subset = None if mask is None else np.flatnonzero(mask)
+        total = len(index) if subset is None else int(subset.size)
+
+        # Mode ANN : seuls les `limit` voisins approchés sont hydratés ; repli
+        # sur le calcul exact si pas de limite, si un filtre est actif ou si
+        # l'index ANN n'est pas prêt.
+        hits = None
+        if mode == "ann" and subset is None and 0 < limit < total:
+            hits = _EMBED_ANN.search(index, query_vec, limit, get_snapshot_dir(DEFAULT_SNAPSHOT_DIR))
+        if hits is not None:
+            positions, scores = hits
+        else:
+            mode = "exact"
+            scores = index.scores(query_vec, subset)
+            positions = subset
+
+        def row_of(i):
+            return index.row(i if positions is None else positions[i])
+
+    # Sélection partielle et statistiques vectorisées : seules les lignes
+    # retournées sont hydratées.
+    scores = np.round(scores, 6)
+    if limit <= 0 or limit > scores.size:
+        limit = int(scores.size)
+    top = top_k_indices(scores, limit)
+    score_at_limit = float(scores[top[-1]]) if top.size else None
+    top = top[scores[top] >= score_threshold]
+    results = [_semantic_result(row_of(i), float(scores[i])) for i in top.tolist()]
 
     return jsonify(
         {
             "results": results,
             "count": len(results),
-            "total": len(scored),
-            "max_score": to_float(scored[0]["score"]) if scored else None,
-            "min_score": to_float(scored[-1]["score"]) if scored else None,
-            "score_threshold": to_float(score_threshold),
-            "score_at_limit": to_float(score_at_limit),
+            "total": total,
+            "total_above_threshold": int(np.count_nonzero(scores >= score_threshold)) if mode == "exact" else None,
+            "max_score": float(scores.max()) if scores.size else None,
+            "min_score": float(scores.min()) if scores.size else None,
+            "score_threshold": float(score_threshold),
+            "score_at_limit": score_at_limit,
             "limit": limit,
+            "mode": mode,
         }
     )
 
@@ -1538,6 +1701,7 @@ def semantic_search():
 # ============================================================================
 
 @joradp_bp.route('/batch/extract', methods=['POST'])
+@queued_batch('document_ids')
 def batch_extract_documents():
     """Extraire le texte (R2 → MizaneDb) pour plusieurs documents."""
     try:
@@ -1611,14 +1775,12 @@ def batch_extract_documents():
 
 
 @joradp_bp.route('/batch/analyze', methods=['POST'])
+@queued_batch('document_ids')
 def batch_analyze_documents():
     """Analyser plusieurs documents sélectionnés avec IA + embeddings (MizaneDb)."""
     try:
-        try:
-            from openai import OpenAI
-        except ImportError:
+        if not openai_available():
             return jsonify({'error': "Le module 'openai' est manquant. Installez-le dans le venv backend (pip install openai>=1.0.0)."}), 500
-        from analysis import get_embedding_model
 
         data = request.json or {}
         document_ids = data.get('document_ids') or []
@@ -1684,7 +1846,7 @@ def batch_analyze_documents():
 
         result = _run_ai_analysis(
             docs_to_process,
-            client=OpenAI(api_key=api_key),
+            client=openai_client(api_key),
             embedding_model=get_embedding_model() if generate_embeddings else None,
             force=True,
             generate_embeddings=generate_embeddings,
@@ -1697,10 +1859,10 @@ def batch_analyze_documents():
 
 
 @joradp_bp.route('/batch/embeddings', methods=['POST'])
+@queued_batch('document_ids')
 def batch_generate_embeddings():
     """Générer uniquement les embeddings pour plusieurs documents sélectionnés."""
     try:
-        from analysis import get_embedding_model
 
         data = request.json or {}
         document_ids = data.get('document_ids') or []
@@ -1796,7 +1958,7 @@ def batch_generate_embeddings():
                         vector = vector.tolist()
 
                     embedding_data = {
-                        'model': 'all-MiniLM-L6-v2',
+                        'model': DEFAULT_MODEL,
                         'dimension': len(vector),
                         'vector': [float(v) for v in vector],
                     }
@@ -1816,6 +1978,9 @@ def batch_generate_embeddings():
                         },
                     )
 
+                    if pgvector_enabled():
+                        write_vectors(cur, 'joradp_documents', [(doc_id, vector)])
+
                     cur.execute(
                         """
                         UPDATE joradp_documents
@@ -1854,6 +2019,179 @@ def batch_generate_embeddings():
         return jsonify({'error': str(e)}), 500
 
 
+ANALYSIS_COMMIT_BATCH = int(os.getenv("ANALYSIS_COMMIT_BATCH", "20"))
+
+
+# Incrémenter à chaque modification du prompt : invalide le cache LLM correspondant.
+ANALYSIS_PROMPT_VERSION = 'v1'
+ANALYSIS_MODEL = "gpt-4o"
+
+
+def _analysis_request(text_sample: str) -> dict:
+    """Arguments de `chat.completions.create` pour l'analyse d'un document (appel direct ou Batch API)."""
+    return {
+        'model': ANALYSIS_MODEL,
+        'max_tokens': 1024,
+        'messages': [{
+            "role": "user",
+            "content": f"""Analyse ce document officiel algérien et renvoie un JSON avec :
+{{
+  "title": "...",
+  "summary": "...",
+  "keywords": ["mot1","mot2"],
+  "entities": ["TYPE - Valeur"],
+  "draft_date": "YYYY-MM-DD ou null",
+  "language": "fr|ar|..."
+}}
+Document :
+{text_sample}"""
+        }],
+        'response_format': {"type": "json_object"},
+    }
+
+
+def _analysis_cache_key(text_sample: str) -> str:
+    return cache_key('joradp_analysis', ANALYSIS_PROMPT_VERSION, ANALYSIS_MODEL, text_sample)
+
+
+def _parse_analysis(analysis_raw) -> dict:
+    if isinstance(analysis_raw, str):
+        try:
+            return json.loads(analysis_raw)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+def _document_text(doc) -> tuple[str | None, str | None]:
+    """Texte R2 d'un document (extrait du PDF si absent) et son nouveau chemin éventuel."""
+    text_content = _fetch_r2_text(doc.get('text_path_r2'))
+    if text_content:
+        return text_content, None
+    return _ensure_text_content(
+        doc['id'],
+        doc.get('file_path_r2'),
+        doc.get('text_path_r2'),
+        doc.get('url'),
+    )
+
+
+def _analyze_document(doc, *, executor: ChatExecutor, embedding_model=None, generate_embeddings=True) -> dict | None:
+    """Texte, embedding et appel OpenAI pour un document (exécuté dans un worker, sans connexion DB)."""
+    doc_id = doc['id']
+    text_content, new_text_path = _document_text(doc)
+    if not text_content:
+        return None
+
+    embedding_data = None
+    embedding_status_value = None
+    if embedding_model and generate_embeddings:
+        embedding_status_value = 'failed'
+        try:
+            vector = embedding_model.encode(
+                text_content[:5000],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+            if hasattr(vector, 'tolist'):
+                vector = vector.tolist()
+            embedding_data = {
+                'model': DEFAULT_MODEL,
+                'dimension': len(vector),
+                'vector': [float(v) for v in vector],
+            }
+            embedding_status_value = 'success'
+        except Exception as exc:
+            print(f"⚠️  Embedding non généré pour doc {doc_id}: {exc}")
+
+    text_sample = text_content[:10000]
+    analysis_raw = get_llm_cache().completion(
+        'joradp_analysis',
+        ANALYSIS_PROMPT_VERSION,
+        ANALYSIS_MODEL,
+        text_sample,
+        lambda: executor.complete(**_analysis_request(text_sample)).choices[0].message.content,
+    )
+    analysis_json = _parse_analysis(analysis_raw)
+
+    return {
+        'analysis': analysis_json,
+        'embedding': embedding_data,
+        'embedding_status': embedding_status_value,
+        'text_path': new_text_path,
+    }
+
+
+def _store_ai_analysis(cur, doc, outcome: dict) -> None:
+    """Écrit les métadonnées IA et les statuts d'un document analysé."""
+    doc_id = doc['id']
+    analysis_json = outcome['analysis']
+    embedding_data = outcome['embedding']
+    embedding_status_value = outcome['embedding_status']
+
+    language = (analysis_json.get('language') or 'fr').split('-')[0]
+    keywords = _normalize_keywords(analysis_json.get('keywords'))
+    entities = analysis_json.get('entities')
+
+    # Extraire la date depuis les entités nommées (prioritaire)
+    extracted_date = _extract_date_from_entities(entities, doc.get('url'))
+    if extracted_date:
+        publication_date = extracted_date
+    else:
+        # Fallback sur draft_date ou date existante
+        publication_date = doc.get('publication_date') or _parse_date_string(
+            analysis_json.get('draft_date'),
+        )
+    extra_metadata = {'analysis': analysis_json}
+    if embedding_data:
+        extra_metadata['embedding'] = embedding_data
+
+    _upsert_ai_metadata(
+        cur,
+        doc_id,
+        {
+            'language': language,
+            'title': analysis_json.get('title'),
+            'publication_date': publication_date,
+            'summary': analysis_json.get('summary'),
+            'keywords': keywords,
+            'entities': entities,
+            'dates_extracted': analysis_json.get('dates_extracted') or analysis_json.get('dates'),
+            'extra_metadata': extra_metadata,
+        },
+    )
+
+    cur.execute(
+        """
+        UPDATE joradp_documents
+        SET ai_analysis_status = 'success',
+            analyzed_at = timezone('utc', now()),
+            publication_date = COALESCE(%s, publication_date),
+            embedding_status = CASE
+                WHEN %s IS NOT NULL THEN %s
+                ELSE embedding_status
+            END,
+            embedded_at = CASE
+                WHEN %s = 'success' THEN timezone('utc', now())
+                WHEN %s = 'failed' THEN NULL
+                ELSE embedded_at
+            END,
+            text_path_r2 = COALESCE(%s, text_path_r2),
+            error_log = NULL
+        WHERE id = %s
+        """,
+        (
+            publication_date,
+            embedding_status_value,
+            embedding_status_value,
+            embedding_status_value,
+            embedding_status_value,
+            outcome['text_path'],
+            doc_id,
+        ),
+    )
+
+
 def _run_ai_analysis(
     documents,
     *,
@@ -1862,140 +2200,39 @@ def _run_ai_analysis(
     force=False,
     generate_embeddings=True,
     already_analyzed: int = 0,
+    concurrency: int | None = None,
 ):
-    """Routine partagée pour analyser et stocker les métadonnées IA."""
+    """
+    Routine partagée pour analyser et stocker les métadonnées IA.
+
+    Les appels OpenAI partent en parallèle (ChatExecutor : OPENAI_CONCURRENCY,
+    seaux RPM/TPM, reprise sur 429) ; les écritures restent sur une seule
+    connexion et sont validées toutes les ANALYSIS_COMMIT_BATCH réponses.
+    """
     success_count = 0
     failed_count = 0
     missing_text = 0
+    pending = 0
+    executor = ChatExecutor(client, concurrency=concurrency)
+
+    def analyze(doc):
+        return _analyze_document(
+            doc,
+            executor=executor,
+            embedding_model=embedding_model,
+            generate_embeddings=generate_embeddings,
+        )
 
     with get_pg_connection() as conn, conn.cursor() as cur:
-        for doc in documents:
+        for doc, outcome, error in executor.map(analyze, documents):
             doc_id = doc['id']
+            if error is None and outcome is None:
+                missing_text += 1
+                continue
             try:
-                text_content = _fetch_r2_text(doc.get('text_path_r2'))
-                new_text_path = None
-                if not text_content:
-                    text_content, new_text_path = _ensure_text_content(
-                        doc_id,
-                        doc.get('file_path_r2'),
-                        doc.get('text_path_r2'),
-                        doc.get('url'),
-                    )
-                if not text_content:
-                    missing_text += 1
-                    continue
-
-                embedding_data = None
-                embedding_status_value = None
-                if embedding_model and generate_embeddings:
-                    embedding_status_value = 'failed'
-                    try:
-                        vector = embedding_model.encode(
-                            text_content[:5000],
-                            convert_to_numpy=True,
-                            normalize_embeddings=True,
-                        )
-                        if hasattr(vector, 'tolist'):
-                            vector = vector.tolist()
-                        embedding_data = {
-                            'model': 'all-MiniLM-L6-v2',
-                            'dimension': len(vector),
-                            'vector': [float(v) for v in vector],
-                        }
-                        embedding_status_value = 'success'
-                    except Exception as exc:
-                        print(f"⚠️  Embedding non généré pour doc {doc_id}: {exc}")
-
-                text_sample = text_content[:10000]
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    max_tokens=1024,
-                    messages=[{
-                        "role": "user",
-                        "content": f"""Analyse ce document officiel algérien et renvoie un JSON avec :
-{{
-  "title": "...",
-  "summary": "...",
-  "keywords": ["mot1","mot2"],
-  "entities": ["TYPE - Valeur"],
-  "draft_date": "YYYY-MM-DD ou null",
-  "language": "fr|ar|..."
-}}
-Document :
-{text_sample}"""
-                    }],
-                    response_format={"type": "json_object"},
-                )
-
-                analysis_raw = response.choices[0].message.content
-                analysis_json = {}
-                if isinstance(analysis_raw, str):
-                    try:
-                        analysis_json = json.loads(analysis_raw)
-                    except json.JSONDecodeError:
-                        analysis_json = {}
-
-                language = (analysis_json.get('language') or 'fr').split('-')[0]
-                keywords = _normalize_keywords(analysis_json.get('keywords'))
-                entities = analysis_json.get('entities')
-
-                # Extraire la date depuis les entités nommées (prioritaire)
-                extracted_date = _extract_date_from_entities(entities, doc.get('url'))
-                if extracted_date:
-                    publication_date = extracted_date
-                else:
-                    # Fallback sur draft_date ou date existante
-                    publication_date = doc.get('publication_date') or _parse_date_string(
-                        analysis_json.get('draft_date'),
-                    )
-                extra_metadata = {'analysis': analysis_json}
-                if embedding_data:
-                    extra_metadata['embedding'] = embedding_data
-
-                _upsert_ai_metadata(
-                    cur,
-                    doc_id,
-                    {
-                        'language': language,
-                        'title': analysis_json.get('title'),
-                        'publication_date': publication_date,
-                        'summary': analysis_json.get('summary'),
-                        'keywords': keywords,
-                        'entities': entities,
-                        'dates_extracted': analysis_json.get('dates_extracted') or analysis_json.get('dates'),
-                        'extra_metadata': extra_metadata,
-                    },
-                )
-
-                cur.execute(
-                    """
-                    UPDATE joradp_documents
-                    SET ai_analysis_status = 'success',
-                        analyzed_at = timezone('utc', now()),
-                        publication_date = COALESCE(%s, publication_date),
-                        embedding_status = CASE
-                            WHEN %s IS NOT NULL THEN %s
-                            ELSE embedding_status
-                        END,
-                        embedded_at = CASE
-                            WHEN %s = 'success' THEN timezone('utc', now())
-                            WHEN %s = 'failed' THEN NULL
-                            ELSE embedded_at
-                        END,
-                        text_path_r2 = COALESCE(%s, text_path_r2),
-                        error_log = NULL
-                    WHERE id = %s
-                    """,
-                    (
-                        publication_date,
-                        embedding_status_value,
-                        embedding_status_value,
-                        embedding_status_value,
-                        embedding_status_value,
-                        new_text_path,
-                        doc_id,
-                    ),
-                )
+                if error is not None:
+                    raise error
+                _store_ai_analysis(cur, doc, outcome)
                 success_count += 1
             except Exception as exc:
                 failed_count += 1
@@ -2009,6 +2246,10 @@ Document :
                     """,
                     (str(exc), doc_id),
                 )
+            pending += 1
+            if pending >= ANALYSIS_COMMIT_BATCH:
+                conn.commit()
+                pending = 0
         conn.commit()
 
     return {
@@ -2018,4 +2259,98 @@ Document :
         'failed': failed_count,
         'already_analyzed': already_analyzed,
         'missing_text': missing_text,
+        'openai': {
+            'retries': executor.stats['retries'],
+            'throttled_seconds': round(executor.stats['throttled_seconds'], 2),
+        },
     }
+
+
+# ============================================================================
+# MODE BATCH API (backfills, voir batch_ai_backfill.py)
+# ============================================================================
+
+BATCH_ANALYSIS_KIND = 'joradp_analysis'
+
+
+def _build_analysis_batch(limit: int | None, exclude: set):
+    """Lignes Batch API pour les documents téléchargés et non analysés."""
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, url, file_path_r2, text_path_r2
+            FROM joradp_documents
+            WHERE download_status = 'success'
+              AND ai_analysis_status IN ('pending', 'failed')
+            ORDER BY id ASC
+            {"LIMIT %s" if limit else ""}
+            """,
+            (limit + len(exclude),) if limit else None,
+        )
+        documents = [
+            doc for doc in cur.fetchall()
+            if custom_id(BATCH_ANALYSIS_KIND, doc['id']) not in exclude
+        ][:limit]
+
+    missing = 0
+    with ThreadPoolExecutor(max_workers=JORADP_DOWNLOAD_WORKERS) as pool:
+        for doc, (text_content, _) in zip(documents, pool.map(_safe_document_text, documents)):
+            if not text_content:
+                missing += 1
+                continue
+            text_sample = text_content[:10000]
+            yield batch_request(
+                custom_id(BATCH_ANALYSIS_KIND, doc['id']),
+                cache_key=_analysis_cache_key(text_sample),
+                **_analysis_request(text_sample),
+            )
+    if missing:
+        print(f"⚠️  {missing} documents sans texte exploitable ignorés")
+
+
+def _safe_document_text(doc):
+    try:
+        return _document_text(doc)
+    except Exception as exc:
+        print(f"⚠️  Texte indisponible pour doc {doc['id']}: {exc}")
+        return None, None
+
+
+def _ingest_analysis_batch(results: list[BatchResult]) -> dict:
+    """Enregistre les analyses d'un lot terminé (réexécutable : mêmes valeurs réécrites)."""
+    by_id = {int(parse_custom_id(result.custom_id)[0]): result for result in results}
+    analyzed = failed = 0
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, url, publication_date FROM joradp_documents WHERE id = ANY(%s)",
+            (list(by_id),),
+        )
+        for index, doc in enumerate(cur.fetchall(), 1):
+            result = by_id[doc['id']]
+            if result.error is None:
+                _store_ai_analysis(cur, doc, {
+                    'analysis': _parse_analysis(result.content),
+                    'embedding': None,
+                    'embedding_status': None,
+                    'text_path': None,
+                })
+                analyzed += 1
+            else:
+                cur.execute(
+                    """
+                    UPDATE joradp_documents
+                    SET ai_analysis_status = 'failed',
+                        analyzed_at = NULL,
+                        error_log = %s
+                    WHERE id = %s
+                    """,
+                    (result.error, doc['id']),
+                )
+                failed += 1
+            if index % ANALYSIS_COMMIT_BATCH == 0:
+                conn.commit()
+        conn.commit()
+    return {'analyzed': analyzed, 'failed': failed}
+
+
+register_batch_kind(BATCH_ANALYSIS_KIND, _build_analysis_batch, _ingest_analysis_batch)
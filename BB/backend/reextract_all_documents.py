@@ -15,13 +15,14 @@ import sqlite3
 # Import des modules d'extraction et d'analyse
 from shared.intelligent_text_extractor import IntelligentTextExtractor
 from openai import OpenAI
-from sentence_transformers import SentenceTransformer
+from shared.model_registry import DEFAULT_MODEL, get_model
 import numpy as np
 import pdfplumber
 
 # Configuration
 DB_PATH = 'harvester.db'
-EMBEDDING_MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+# Même modèle que la recherche sémantique (vecteurs comparables, chargé une seule fois).
+EMBEDDING_MODEL_NAME = DEFAULT_MODEL
 BATCH_SIZE = 10  # Nombre de documents à traiter avant de commit
 
 class DocumentProcessor:
@@ -33,7 +34,7 @@ class DocumentProcessor:
 
         # Charger le modèle d'embedding
         print(f"🔁 Chargement du modèle d'embedding {EMBEDDING_MODEL_NAME}...")
-        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        self.embedding_model = get_model(EMBEDDING_MODEL_NAME)
 
         # Initialiser OpenAI API
         api_key = os.getenv('OPENAI_API_KEY')
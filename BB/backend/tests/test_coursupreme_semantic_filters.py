@@ -0,0 +1,42 @@
+"""Filtres de la recherche sémantique Cour Suprême sur un index construit depuis la base."""
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND.parent.parent))
+sys.path.insert(0, str(BACKEND))
+
+pytest.importorskip("flask")
+
+from shared.embedding_index import EmbeddingIndex  # noqa: E402
+from modules.coursupreme import routes  # noqa: E402
+
+
+def _fresh_index():
+    # Index non issu d'un snapshot : decision_date vient de la colonne DATE.
+    vectors = np.eye(4, dtype=np.float32)
+    columns = {
+        'decision_number': ['1', '2', '3', '4'],
+        'decision_date': [date(2019, 12, 31), date(2020, 6, 15), date(2021, 1, 1), None],
+        'url': ['u1', 'u2', 'u3', 'u4'],
+    }
+    return EmbeddingIndex(vectors, [1, 2, 3, 4], columns)
+
+
+def test_date_filter_on_fresh_index():
+    mask = routes._semantic_filter_mask(_fresh_index(), {'date_from': '2020', 'date_to': '2020-12-31'})
+    assert mask.tolist() == [False, True, False, False]
+
+
+def test_date_filter_open_ended():
+    mask = routes._semantic_filter_mask(_fresh_index(), {'date_from': '01/01/2020'})
+    assert mask.tolist() == [False, True, True, False]
+
+
+def test_normalize_decision_date_value_accepts_dates():
+    assert routes.normalize_decision_date_value(date(2021, 4, 2)) == '2021-04-02'
+    assert routes.normalize_decision_date_value('02/04/2021') == '2021-04-02'
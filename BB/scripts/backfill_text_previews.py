@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Renseigne text_preview / text_char_count des documents JORADP déjà extraits (MizaneDb)."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT.parent))
+
+from backend.modules.joradp import routes as joradp_routes
+from backend.shared.postgres import get_connection as get_pg_connection
+
+
+def backfill_previews(limit: int | None = None, chunk_size: int = 200) -> tuple[int, int]:
+    """Télécharge les textes sans aperçu par lots parallèles (lecteur R2 partagé) et enregistre leurs statistiques."""
+    processed = 0
+    updated = 0
+
+    with get_pg_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, text_path_r2
+            FROM joradp_documents
+            WHERE text_path_r2 IS NOT NULL
+              AND text_preview IS NULL
+            ORDER BY id ASC
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        rows = cur.fetchall()
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            bodies = joradp_routes._R2.get_many(row['text_path_r2'] for row in chunk)
+            for row in chunk:
+                processed += 1
+                body = bodies.get(row['text_path_r2'])
+                if body is None:
+                    continue
+                joradp_routes._store_text_stats(cur, row['id'], body.decode('utf-8', errors='replace'))
+                updated += 1
+            conn.commit()
+            print(f"   {processed}/{len(rows)} documents, {updated} aperçus enregistrés")
+
+    return processed, updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximum de documents à traiter")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Textes téléchargés par lot")
+    args = parser.parse_args()
+
+    processed, updated = backfill_previews(limit=args.limit, chunk_size=args.chunk_size)
+    print(f"✅ {processed} documents parcourus, {updated} aperçus enregistrés")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,11 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT.parent))
 
 from backend.modules.joradp import routes as joradp_routes
 from backend.shared.postgres import get_connection as get_pg_connection
+from shared.r2_index import R2ExistenceIndex, sync_prefix
 
 
 def _normalize_status(status: str | None) -> str:
@@ -71,16 +73,28 @@ def repair_statuses(limit: int | None = None, apply: bool = False, verbose: bool
             """
         )
         rows = cur.fetchall()
+        if limit is not None:
+            rows = rows[:limit]
+
+        # Index R2 resynchronisé avec le bucket, puis une seule vérification groupée
+        # (shared/r2_index.py) au lieu d'un HEAD par fichier.
+        try:
+            listed = sync_prefix(joradp_routes.JORADP_R2_PREFIX)
+            print(f"🔄 Index R2 synchronisé: {listed} clés sous {joradp_routes.JORADP_R2_PREFIX}")
+            r2_index = R2ExistenceIndex(mode="index", confirm_misses=False)
+        except Exception as exc:
+            print(f"⚠️  Synchronisation de l'index R2 impossible, vérification par HEAD: {exc}")
+            r2_index = R2ExistenceIndex(mode="head")
+        present = r2_index.exists_many(
+            path for row in rows for path in (row['file_path_r2'], row['text_path_r2'])
+        )
 
         for row in rows:
-            if limit is not None and processed >= limit:
-                break
             processed += 1
 
             document_id = row['id']
-            joradp_routes._r2_exists.cache_clear()
-            file_exists = bool(row['file_path_r2']) and joradp_routes._r2_exists(row['file_path_r2'])
-            text_exists = bool(row['text_path_r2']) and joradp_routes._r2_exists(row['text_path_r2'])
+            file_exists = present.get(row['file_path_r2'], False)
+            text_exists = present.get(row['text_path_r2'], False)
             embedding_exists = _has_embedding(cur, document_id)
 
             updates = []
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Synchronise l'index des clés R2 (table r2_objects) avec le bucket, préfixe par préfixe."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv(ROOT / "backend" / ".env")
+
+from shared.r2_index import sync_prefix
+
+DEFAULT_PREFIXES = (
+    "Textes_juridiques_DZ/joradp.dz/",
+    "Textes_juridiques_DZ/Cour_supreme/",
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "prefixes",
+        nargs="*",
+        default=list(DEFAULT_PREFIXES),
+        help="Préfixes à lister (défaut : JORADP et Cour suprême).",
+    )
+    args = parser.parse_args()
+
+    for prefix in args.prefixes:
+        started = time.perf_counter()
+        listed = sync_prefix(prefix)
+        print(f"✅ {prefix}: {listed} clés indexées en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
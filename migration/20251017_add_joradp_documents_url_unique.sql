@@ -0,0 +1,148 @@
+-- Migration : unicité de joradp_documents.url
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Nécessaire aux écritures groupées du moissonneur (INSERT … ON CONFLICT (url)).
+--
+-- Les sessions précédentes ont pu enregistrer la même URL plusieurs fois
+-- (unicité limitée à (session_id, url)). Avant de créer l'index, chaque URL
+-- en double est ramenée à un seul document : le plus avancé dans la chaîne
+-- de traitement (puis le plus ancien). Les chemins R2 / dates manquants y
+-- sont complétés depuis les doublons (analyse IA et embeddings avec leur
+-- statut), et les lignes dépendantes
+-- (joradp_metadata, joradp_keyword_index, document_ai_metadata) sont
+-- rattachées au document conservé quand il n'a pas déjà la sienne.
+--
+-- Doublons restant à traiter :
+--   SELECT url, COUNT(*) FROM public.joradp_documents GROUP BY url HAVING COUNT(*) > 1;
+
+BEGIN;
+
+CREATE TEMP TABLE joradp_url_duplicates ON COMMIT DROP AS
+WITH ranked AS (
+    SELECT
+        id,
+        first_value(id) OVER (
+            PARTITION BY url
+            ORDER BY
+                (metadata_collection_status = 'success')::int
+                + (download_status = 'success')::int
+                + (text_extraction_status = 'success')::int
+                + (ai_analysis_status = 'success')::int
+                + (embedding_status = 'success')::int DESC,
+                id
+        ) AS keep_id
+    FROM public.joradp_documents
+)
+SELECT id AS dup_id, keep_id
+FROM ranked
+WHERE id <> keep_id;
+
+-- Compléter le document conservé.
+UPDATE public.joradp_documents AS k
+SET file_path_r2 = COALESCE(k.file_path_r2, d.file_path_r2),
+    text_path_r2 = COALESCE(k.text_path_r2, d.text_path_r2),
+    publication_date = COALESCE(k.publication_date, d.publication_date),
+    file_size_bytes = COALESCE(k.file_size_bytes, d.file_size_bytes)
+FROM (
+    SELECT
+        dup.keep_id,
+        max(doc.file_path_r2) AS file_path_r2,
+        max(doc.text_path_r2) AS text_path_r2,
+        max(doc.publication_date) AS publication_date,
+        max(doc.file_size_bytes) AS file_size_bytes
+    FROM joradp_url_duplicates dup
+    JOIN public.joradp_documents doc ON doc.id = dup.dup_id
+    GROUP BY dup.keep_id
+) AS d
+WHERE k.id = d.keep_id;
+
+-- Analyse IA et embeddings : repris avec leur statut depuis le doublon le plus récent.
+UPDATE public.joradp_documents AS k
+SET ai_analysis_r2 = d.ai_analysis_r2,
+    ai_analysis_status = d.ai_analysis_status,
+    analyzed_at = d.analyzed_at
+FROM (
+    SELECT DISTINCT ON (dup.keep_id) dup.keep_id, doc.ai_analysis_r2, doc.ai_analysis_status, doc.analyzed_at
+    FROM joradp_url_duplicates dup
+    JOIN public.joradp_documents doc ON doc.id = dup.dup_id
+    WHERE doc.ai_analysis_r2 IS NOT NULL
+    ORDER BY dup.keep_id, doc.analyzed_at DESC NULLS LAST, doc.id
+) AS d
+WHERE k.id = d.keep_id
+  AND k.ai_analysis_r2 IS NULL;
+
+UPDATE public.joradp_documents AS k
+SET embeddings_r2 = d.embeddings_r2,
+    embedding_status = d.embedding_status,
+    embedded_at = d.embedded_at
+FROM (
+    SELECT DISTINCT ON (dup.keep_id) dup.keep_id, doc.embeddings_r2, doc.embedding_status, doc.embedded_at
+    FROM joradp_url_duplicates dup
+    JOIN public.joradp_documents doc ON doc.id = dup.dup_id
+    WHERE doc.embeddings_r2 IS NOT NULL
+    ORDER BY dup.keep_id, doc.embedded_at DESC NULLS LAST, doc.id
+) AS d
+WHERE k.id = d.keep_id
+  AND k.embeddings_r2 IS NULL;
+
+-- joradp_metadata : une ligne par document, la plus récente des doublons.
+UPDATE public.joradp_metadata AS m
+SET document_id = s.keep_id
+FROM (
+    SELECT DISTINCT ON (dup.keep_id) m2.id, dup.keep_id
+    FROM public.joradp_metadata m2
+    JOIN joradp_url_duplicates dup ON m2.document_id = dup.dup_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM public.joradp_metadata k WHERE k.document_id = dup.keep_id
+    )
+    ORDER BY dup.keep_id, m2.updated_at DESC
+) AS s
+WHERE m.id = s.id;
+
+-- joradp_keyword_index : tous les jetons, sans doublon (token, document).
+UPDATE public.joradp_keyword_index AS ki
+SET document_id = dup.keep_id
+FROM joradp_url_duplicates dup
+WHERE ki.document_id = dup.dup_id;
+
+DELETE FROM public.joradp_keyword_index AS a
+USING public.joradp_keyword_index AS b
+WHERE a.document_id = b.document_id
+  AND a.token = b.token
+  AND a.id > b.id
+  AND a.document_id IN (SELECT keep_id FROM joradp_url_duplicates);
+
+-- document_ai_metadata (pas de clé étrangère) : une analyse par langue.
+UPDATE public.document_ai_metadata AS a
+SET document_id = s.keep_id
+FROM (
+    SELECT DISTINCT ON (dup.keep_id, a2.language) a2.id, dup.keep_id
+    FROM public.document_ai_metadata a2
+    JOIN joradp_url_duplicates dup ON a2.document_id = dup.dup_id
+    WHERE a2.corpus = 'joradp'
+      AND NOT EXISTS (
+          SELECT 1 FROM public.document_ai_metadata k
+          WHERE k.document_id = dup.keep_id
+            AND k.corpus = 'joradp'
+            AND k.language = a2.language
+      )
+    ORDER BY dup.keep_id, a2.language, a2.updated_at DESC
+) AS s
+WHERE a.id = s.id;
+
+DELETE FROM public.document_ai_metadata AS a
+USING joradp_url_duplicates dup
+WHERE a.corpus = 'joradp'
+  AND a.document_id = dup.dup_id;
+
+-- Les lignes dépendantes restantes des doublons partent en cascade.
+DELETE FROM public.joradp_documents AS d
+USING joradp_url_duplicates dup
+WHERE d.id = dup.dup_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS joradp_documents_url_key
+    ON public.joradp_documents (url);
+
+-- L'index unique remplace l'index simple sur url.
+DROP INDEX IF EXISTS public.idx_joradp_docs_url;
+
+COMMIT;
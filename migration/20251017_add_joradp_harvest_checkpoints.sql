@@ -0,0 +1,15 @@
+-- Migration : points de reprise du moissonnage JORADP par année
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Une ligne par année : dernier numéro sondé, dernier numéro trouvé et statut
+-- (running = interrompu ou en cours, done = fin d'année atteinte, error).
+
+CREATE TABLE IF NOT EXISTS public.joradp_harvest_checkpoints (
+    year integer PRIMARY KEY,
+    session_id integer,
+    last_num integer NOT NULL DEFAULT 0,
+    last_found_num integer NOT NULL DEFAULT 0,
+    found_count integer NOT NULL DEFAULT 0,
+    status text NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done', 'error')),
+    error text,
+    updated_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
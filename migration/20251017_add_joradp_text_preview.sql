@@ -0,0 +1,11 @@
+-- Migration : aperçu du texte extrait stocké avec le document JORADP
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Renseignés à l'extraction (voir _store_text_stats dans
+-- BB/backend/modules/joradp/routes.py) : la vue métadonnées ne télécharge
+-- plus le texte complet depuis R2. Les documents déjà extraits sont
+-- complétés par BB/scripts/backfill_text_previews.py.
+
+ALTER TABLE public.joradp_documents
+    ADD COLUMN IF NOT EXISTS text_preview text,
+    ADD COLUMN IF NOT EXISTS text_char_count integer,
+    ADD COLUMN IF NOT EXISTS text_page_count integer;
@@ -0,0 +1,18 @@
+-- Migration : colonnes pgvector pour la recherche sémantique (EMBED_STORAGE=pgvector)
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Remplissage : python BB/backend/backfill_pgvector.py
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE public.supreme_court_decisions
+    ADD COLUMN IF NOT EXISTS embedding vector(384);
+
+ALTER TABLE public.joradp_documents
+    ADD COLUMN IF NOT EXISTS embedding vector(384);
+
+-- Index HNSW en distance cosinus (opérateur <=>).
+CREATE INDEX IF NOT EXISTS supreme_court_decisions_embedding_hnsw_idx
+    ON public.supreme_court_decisions USING hnsw (embedding vector_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS joradp_documents_embedding_hnsw_idx
+    ON public.joradp_documents USING hnsw (embedding vector_cosine_ops);
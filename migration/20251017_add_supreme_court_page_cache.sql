@@ -0,0 +1,16 @@
+-- Migration : validateurs HTTP des pages de sections Cour Suprême
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Utilisée par HarvesterCourSupremeV5 pour les requêtes conditionnelles
+-- (If-None-Match / If-Modified-Since) et l'empreinte du contenu parsé.
+
+CREATE TABLE IF NOT EXISTS public.supreme_court_page_cache (
+    url text PRIMARY KEY,
+    chamber_id integer NOT NULL REFERENCES public.supreme_court_chambers(id) ON DELETE CASCADE,
+    etag text,
+    last_modified text,
+    content_hash text,
+    fetched_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE INDEX IF NOT EXISTS supreme_court_page_cache_chamber_idx
+    ON public.supreme_court_page_cache (chamber_id);
@@ -0,0 +1,34 @@
+-- Migration : file de tâches de fond (endpoints batch, téléchargements)
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Les workers (threads de l'API ou BB/backend/job_worker.py) réservent les
+-- tâches avec FOR UPDATE SKIP LOCKED : aucun broker externe n'est nécessaire.
+
+CREATE EXTENSION IF NOT EXISTS "pgcrypto";
+
+CREATE TABLE IF NOT EXISTS public.background_jobs (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind text NOT NULL,
+    params jsonb NOT NULL DEFAULT '{}'::jsonb,
+    status text NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'success', 'failed', 'cancelled')),
+    progress jsonb NOT NULL DEFAULT '{}'::jsonb,
+    result jsonb,
+    error text,
+    attempts integer NOT NULL DEFAULT 0,
+    max_attempts integer NOT NULL DEFAULT 3,
+    cancel_requested boolean NOT NULL DEFAULT false,
+    run_after timestamptz NOT NULL DEFAULT timezone('utc', now()),
+    worker text,
+    heartbeat_at timestamptz,
+    created_at timestamptz NOT NULL DEFAULT timezone('utc', now()),
+    started_at timestamptz,
+    finished_at timestamptz
+);
+
+-- Réservation des tâches prêtes (et reprise des tâches dont le worker a disparu).
+CREATE INDEX IF NOT EXISTS background_jobs_pending_idx
+    ON public.background_jobs (status, run_after, created_at)
+    WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS background_jobs_created_idx
+    ON public.background_jobs (created_at DESC);
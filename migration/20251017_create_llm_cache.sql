@@ -0,0 +1,11 @@
+-- Migration : cache adressé par contenu des réponses LLM (analyses, traductions)
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- key = sha256(type de tâche, version du prompt, modèle, sha256 du texte
+-- d'entrée), voir shared/llm_cache.py.
+
+CREATE TABLE IF NOT EXISTS public.llm_cache (
+    key text PRIMARY KEY,
+    content text NOT NULL,
+    model text,
+    created_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
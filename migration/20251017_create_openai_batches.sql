@@ -0,0 +1,34 @@
+-- Migration : suivi des lots OpenAI Batch API (analyses / traductions en masse)
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Un lot reste « ouvert » tant que ses résultats n'ont pas été ingérés : ses
+-- custom_ids sont alors exclus des lots suivants, ce qui rend la reprise
+-- (submit / collect relancés) idempotente.
+
+CREATE TABLE IF NOT EXISTS public.openai_batches (
+    id text PRIMARY KEY,
+    kind text NOT NULL,
+    provider text NOT NULL DEFAULT 'openai',
+    status text NOT NULL DEFAULT 'validating',
+    input_file_id text,
+    output_file_id text,
+    error_file_id text,
+    custom_ids text[] NOT NULL DEFAULT '{}',
+    -- Clés de cache LLM des requêtes (custom_id -> key), pour alimenter
+    -- llm_cache à l'ingestion (voir shared/llm_cache.py).
+    cache_keys jsonb NOT NULL DEFAULT '{}'::jsonb,
+    request_count integer NOT NULL DEFAULT 0,
+    succeeded integer,
+    failed integer,
+    error text,
+    created_at timestamptz NOT NULL DEFAULT timezone('utc', now()),
+    completed_at timestamptz,
+    ingested_at timestamptz
+);
+
+-- Bases où la table existait déjà sans cette colonne.
+ALTER TABLE public.openai_batches
+    ADD COLUMN IF NOT EXISTS cache_keys jsonb NOT NULL DEFAULT '{}'::jsonb;
+
+CREATE INDEX IF NOT EXISTS openai_batches_open_idx
+    ON public.openai_batches (kind, created_at)
+    WHERE ingested_at IS NULL;
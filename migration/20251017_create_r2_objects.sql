@@ -0,0 +1,20 @@
+-- Migration : index des clés du bucket R2 (vérifications d'existence par lot)
+-- Ce script s’exécute sur MizaneDb (Supabase).
+-- Alimenté par BB/scripts/sync_r2_index.py (list_objects_v2 paginé, un
+-- préfixe à la fois) ; lu par shared/r2_index.py : une requête ANY(%s) au
+-- lieu d'un HEAD par fichier.
+
+CREATE TABLE IF NOT EXISTS public.r2_objects (
+    key text PRIMARY KEY,
+    size bigint,
+    etag text,
+    last_modified timestamptz,
+    synced_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+-- Dernière synchronisation complète de chaque préfixe.
+CREATE TABLE IF NOT EXISTS public.r2_index_syncs (
+    prefix text PRIMARY KEY,
+    object_count integer NOT NULL DEFAULT 0,
+    synced_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
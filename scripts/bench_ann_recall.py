@@ -0,0 +1,117 @@
+"""
+Benchmark: recall@k and latency of the ANN backends against exact search.
+
+Builds a synthetic clustered corpus (unit vectors drawn around random topic
+centres, closer to real sentence embeddings than uniform noise), then for
+each backend reports build time, recall@k against the exact top-k and
+p50/p95 query latency. The IVF `nprobe` calibrated at build time must reach
+`--target-recall` on the benchmark queries, otherwise the script exits with
+status 1. When `AnnCache` would fall back to exact search for this corpus
+(`ANN_MIN_ROWS`, `ANN_MAX_PROBE_RATIO`), the script says so and the recall
+check is skipped.
+
+Usage:
+    python scripts/bench_ann_recall.py [--rows 100000] [--k 20] [--nprobe 8 16 32] [--target-recall 0.95]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from shared.ann_index import HNSWIndex, IVFIndex, hnswlib, min_rows, target_recall
+from shared.embedding_index import EmbeddingIndex, top_k_indices
+
+
+def synthetic_corpus(rows: int, queries: int, dim: int, topics: int, noise: float, seed: int = 42):
+    """Corpus and queries drawn from the same topic mixture."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim), dtype=np.float32)
+
+    def draw(count: int) -> np.ndarray:
+        vectors = centres[rng.integers(0, topics, size=count)]
+        vectors = vectors + noise * rng.standard_normal((count, dim), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return EmbeddingIndex(draw(rows), np.arange(1, rows + 1)), draw(queries)
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def run(label: str, search, queries: np.ndarray, truth, k: int) -> float:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        positions, _ = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(positions.tolist()) & expected)
+    p50, p95 = _percentiles(latencies)
+    recall = hits / (len(queries) * k)
+    print(f"{label:<22} recall@{k}={recall:.3f}  p50={p50:.2f}ms  p95={p95:.2f}ms")
+    return recall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.8, help="dispersion autour de chaque thème")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--target-recall", type=float, default=None, help="rappel minimal (défaut: ANN_TARGET_RECALL ou 0.95)")
+    args = parser.parse_args()
+
+    print(f"Corpus synthétique: {args.rows} vecteurs ({args.dim} dims, {args.topics} thèmes)")
+    index, queries = synthetic_corpus(args.rows, args.queries, args.dim, args.topics, args.noise)
+
+    def exact(query):
+        scores = index.scores(query)
+        top = top_k_indices(scores, args.k)
+        return top, scores[top]
+
+    truth = [set(exact(q)[0].tolist()) for q in queries]
+    run("exact", exact, queries, truth, args.k)
+
+    target = args.target_recall if args.target_recall is not None else target_recall()
+    start = time.perf_counter()
+    ivf = IVFIndex.build(index.vectors)
+    print(f"IVF construit en {time.perf_counter() - start:.1f}s ({ivf.centroids.shape[0]} listes, nprobe calibré={ivf.nprobe})")
+    calibrated = ivf.nprobe
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        run(f"ivf nprobe={nprobe}", lambda q: ivf.search(index.vectors, q, args.k), queries, truth, args.k)
+    ivf.nprobe = calibrated
+    recall = run(f"ivf calibré ({calibrated})", lambda q: ivf.search(index.vectors, q, args.k), queries, truth, args.k)
+    used = ivf.worthwhile and len(index) >= min_rows()
+    failed = used and recall < target
+    if not used:
+        print(f"ℹ️ mode=ann resterait en recherche exacte ({len(index)} lignes, nprobe {calibrated}/{ivf.centroids.shape[0]})")
+    elif failed:
+        print(f"⚠️ Rappel IVF {recall:.3f} sous la cible {target:.2f}")
+
+    if hnswlib is None:
+        print("hnswlib non installé : backend hnsw ignoré")
+        sys.exit(1 if failed else 0)
+    start = time.perf_counter()
+    hnsw = HNSWIndex.build(index.vectors)
+    print(f"HNSW construit en {time.perf_counter() - start:.1f}s")
+    for ef in (32, 64, 128):
+        hnsw.graph.set_ef(max(ef, args.k))
+        run(f"hnsw ef={ef}", lambda q: hnsw.search(index.vectors, q, args.k), queries, truth, args.k)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
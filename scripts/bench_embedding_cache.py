@@ -0,0 +1,132 @@
+"""
+Benchmark: legacy JSON embedding cache vs binary memory-mapped snapshot.
+
+Builds a synthetic corpus shaped like the AA Cour Suprême cache, writes it
+in both formats, then loads each one in a fresh interpreter and reports the
+load time and the peak RSS of that process.
+
+Usage:
+    python scripts/bench_embedding_cache.py [--rows 50000] [--dim 384]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from shared.embedding_index import EmbeddingIndex, load_snapshot, save_snapshot
+
+FIELDS = ("decision_number", "publication_date", "url", "file_path_fr", "file_path_ar")
+
+
+def _synthetic_rows(rows: int, dim: int):
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((rows, dim), dtype=np.float32)
+    for i in range(rows):
+        yield {
+            "id": i + 1,
+            "decision_number": f"{100000 + i}",
+            "publication_date": "2015-06-30",
+            "url": f"https://coursupreme.dz/decision/{i}",
+            "file_path_fr": f"Textes_juridiques_DZ/Cour_supreme/fr/{i}.html",
+            "file_path_ar": f"Textes_juridiques_DZ/Cour_supreme/ar/{i}.html",
+            "vector": vectors[i],
+        }
+
+
+def write_fixtures(directory: Path, rows: int, dim: int) -> None:
+    items = list(_synthetic_rows(rows, dim))
+    # Ancien format : {"items": [{..., "vector": [floats]}]}
+    legacy = [{**{k: v for k, v in item.items() if k != "vector"}, "vector": item["vector"].tolist()} for item in items]
+    with (directory / "cour_supreme_embed_cache_v1.json").open("w", encoding="utf-8") as f:
+        json.dump({"items": legacy, "created_at": "bench"}, f)
+    index = EmbeddingIndex.from_items(items, FIELDS, dim)
+    save_snapshot(index, directory, "cour_supreme")
+
+
+def load_legacy(directory: Path) -> int:
+    """Reproduit l'ancien `_load_cache_from_disk` (JSON + re-normalisation)."""
+    with (directory / "cour_supreme_embed_cache_v1.json").open("r", encoding="utf-8") as f:
+        payload = json.load(f)
+    items = []
+    for raw in payload.get("items", []):
+        arr = np.array(raw["vector"], dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        if norm == 0:
+            continue
+        raw["vector"] = arr / norm
+        items.append(raw)
+    return len(items)
+
+
+def load_binary(directory: Path) -> int:
+    index = load_snapshot(directory, "cour_supreme")
+    # Un scoring complet touche toutes les pages du mmap, comme une vraie requête.
+    index.scores(np.ones(index.dim, dtype=np.float32) / np.sqrt(index.dim))
+    return len(index)
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM est remis à zéro par execve, contrairement à ru_maxrss sous Linux.
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    # ru_maxrss est en octets sous macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+def _child(mode: str, directory: Path) -> None:
+    start = time.perf_counter()
+    count = load_legacy(directory) if mode == "json" else load_binary(directory)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"mode": mode, "rows": count, "seconds": elapsed, "peak_rss_mb": _peak_rss_mb()}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--child", choices=("json", "binary"))
+    parser.add_argument("--dir")
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, Path(args.dir))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        print(f"Génération de {args.rows} vecteurs ({args.dim} dims)...")
+        write_fixtures(directory, args.rows, args.dim)
+        json_size = (directory / "cour_supreme_embed_cache_v1.json").stat().st_size
+        bin_size = sum(p.stat().st_size for p in directory.glob("cour_supreme_v1.*"))
+        print(f"Taille JSON: {json_size / 1e6:.1f} Mo | binaire (.npy + .json): {bin_size / 1e6:.1f} Mo")
+        for mode in ("json", "binary"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--dir", tmp],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(
+                f"{mode:>6}: {result['rows']} lignes en {result['seconds']:.3f}s, "
+                f"RSS max {result['peak_rss_mb']:.0f} Mo"
+            )
+
+
+if __name__ == "__main__":
+    main()
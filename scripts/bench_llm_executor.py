@@ -0,0 +1,96 @@
+"""
+Benchmark: documents/minute of the AI analysis loop, serial vs ChatExecutor.
+
+Runs the same prompt workload against the local FakeOpenAI client (simulated
+latency and optional 429s) once with the historical one-call-at-a-time loop
+and once per concurrency level through `ChatExecutor`, under the configured
+RPM/TPM budgets. No network or API key is needed.
+
+Usage:
+    python scripts/bench_llm_executor.py [--docs 60] [--latency 0.4] [--concurrency 4 8 16]
+                                         [--rpm 500] [--tpm 200000] [--rate-limit-ratio 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared.fake_openai import FakeOpenAI
+from shared.llm_executor import ChatExecutor
+
+
+def make_request(index: int, chars: int) -> dict:
+    text = (f"Décret exécutif n° {index} portant organisation de l'administration. " * (chars // 60 + 1))[:chars]
+    return {
+        "model": "gpt-4o",
+        "max_tokens": 1024,
+        "messages": [{"role": "user", "content": f"Analyse ce document et renvoie un JSON.\nDocument :\n{text}"}],
+        "response_format": {"type": "json_object"},
+    }
+
+
+def run_serial(client: FakeOpenAI, requests: list) -> tuple[float, int]:
+    """Boucle historique : un appel à la fois, un 429 fait échouer le document."""
+    started = time.perf_counter()
+    failed = 0
+    for kwargs in requests:
+        try:
+            client.chat.completions.create(**kwargs)
+        except Exception:
+            failed += 1
+    return time.perf_counter() - started, failed
+
+
+def run_executor(executor: ChatExecutor, requests: list) -> tuple[float, int]:
+    started = time.perf_counter()
+    failed = sum(1 for _, _, error in executor.map(lambda kwargs: executor.complete(**kwargs), requests) if error)
+    return time.perf_counter() - started, failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=60)
+    parser.add_argument("--chars", type=int, default=10000, help="taille du texte envoyé par document")
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--rpm", type=float, default=500)
+    parser.add_argument("--tpm", type=float, default=200000)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    requests = [make_request(index, args.chars) for index in range(args.docs)]
+
+    def client() -> FakeOpenAI:
+        return FakeOpenAI(latency=args.latency, jitter=args.latency / 2, rate_limit_ratio=args.rate_limit_ratio, seed=7)
+
+    print(f"{args.docs} documents, latence simulée {args.latency}s, {args.rpm:.0f} RPM / {args.tpm:.0f} TPM")
+    print(f"{'mode':<16}{'durée (s)':>11}{'docs/min':>11}{'429':>6}{'échecs':>8}{'attente (s)':>13}")
+
+    fake = client()
+    elapsed, failed = run_serial(fake, requests)
+    print(f"{'séquentiel':<16}{elapsed:>11.2f}{args.docs / elapsed * 60:>11.1f}{fake.rate_limited:>6}{failed:>8}{0.0:>13.2f}")
+
+    for concurrency in args.concurrency:
+        fake = client()
+        executor = ChatExecutor(
+            fake,
+            concurrency=concurrency,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            backoff_base=0.1,
+        )
+        elapsed, failed = run_executor(executor, requests)
+        print(
+            f"{f'concurrent x{concurrency}':<16}{elapsed:>11.2f}{args.docs / elapsed * 60:>11.1f}"
+            f"{fake.rate_limited:>6}{failed:>8}{executor.stats['throttled_seconds']:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Approximate nearest-neighbour search over an `EmbeddingIndex`.
+
+Two backends are available:
+
+- `hnsw`: an hnswlib graph (optional dependency, `pip install hnswlib`);
+- `ivf`: a pure-NumPy inverted file. Rows are clustered with spherical
+  k-means; a query is compared to the centroids, only the rows of the
+  `nprobe` closest lists are scored, and those candidates are re-ranked
+  exactly. `nprobe` starts at nlist/8 (at least 16) and is raised at build
+  time until held-out rows (each one removed from its own results) reach
+  `ANN_TARGET_RECALL` (default 0.95) against exact search; `ANN_NPROBE`
+  forces a fixed value instead.
+
+`ANN_BACKEND` selects the backend (`auto`, `hnsw` or `ivf`; `auto` uses
+hnswlib when it is installed). ANN structures are persisted next to the
+embedding snapshot and tagged with the snapshot version, so they are
+rebuilt only when the index itself changes. Until an up-to-date structure
+is ready, `AnnCache.search` returns None and callers stay on the exact path.
+It also returns None when ANN would not beat the exact scan: corpora below
+`ANN_MIN_ROWS` rows (default 50000) are not indexed, and an IVF index whose
+calibrated `nprobe` exceeds `ANN_MAX_PROBE_RATIO` of its lists (default
+0.25) is not used.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from shared.embedding_index import EmbeddingIndex, top_k_indices
+
+try:
+    import hnswlib
+except ImportError:  # backend optionnel
+    hnswlib = None
+
+ANN_FORMAT = 2
+SEARCH_MODES = ("exact", "ann")
+# Calibration de nprobe : requêtes tirées du corpus et profondeur du rappel mesuré.
+CALIBRATION_QUERIES = 64
+CALIBRATION_K = 20
+
+
+def min_rows() -> int:
+    return int(os.getenv("ANN_MIN_ROWS") or "50000")
+
+
+def max_probe_ratio() -> float:
+    return float(os.getenv("ANN_MAX_PROBE_RATIO") or "0.25")
+
+
+def resolve_search_mode(raw: Optional[str]) -> str:
+    """Normalize a `mode` parameter; defaults to `SEMANTIC_SEARCH_MODE` (exact)."""
+    mode = (raw or os.getenv("SEMANTIC_SEARCH_MODE") or "exact").strip().lower()
+    return mode if mode in SEARCH_MODES else "exact"
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+    labels = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], batch):
+        block = np.asarray(vectors[start:start + batch], dtype=np.float32)
+        labels[start:start + batch] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def default_nprobe(nlist: int) -> int:
+    """Starting point of the calibration: nlist/8 lists, at least 16."""
+    return max(1, min(nlist, max(16, nlist // 8)))
+
+
+def target_recall() -> float:
+    return float(os.getenv("ANN_TARGET_RECALL") or "0.95")
+
+
+class IVFIndex:
+    """Inverted file: `order[offsets[c]:offsets[c + 1]]` are the rows of list `c`."""
+
+    backend = "ivf"
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: Optional[int] = None):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        forced = os.getenv("ANN_NPROBE")
+        if forced:
+            nprobe = int(forced)
+        self.nprobe = nprobe or default_nprobe(self.centroids.shape[0])
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        n = vectors.shape[0]
+        if nlist is None:
+            nlist = int(np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+        # k-means sur un échantillon, puis affectation de toutes les lignes.
+        sample_idx = np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False))
+        sample = np.asarray(vectors[sample_idx], dtype=np.float32)
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = _assign(sample, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            filled = counts > 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            sums[filled] = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts, axis=0)
+            empty = ~filled
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+        ivf = cls(centroids, order, offsets)
+        if not os.getenv("ANN_NPROBE"):
+            ivf.calibrate(vectors, target_recall(), seed=seed)
+        return ivf
+
+    def recall(self, vectors: np.ndarray, positions: np.ndarray, k: int = CALIBRATION_K) -> float:
+        """
+        Mean recall@k of the current `nprobe` against exact search, for the
+        rows at `positions` used as held-out queries: each row is removed from
+        both result lists, so it does not count as its own nearest neighbour.
+        """
+        hits = 0
+        for pos in positions.tolist():
+            query = np.asarray(vectors[pos], dtype=np.float32)
+            exact = vectors @ query
+            exact[pos] = -np.inf
+            expected = top_k_indices(exact, k)
+            found, _ = self.search(vectors, query, k + 1)
+            hits += len(np.intersect1d(expected, found[found != pos][:k]))
+        return hits / (len(positions) * k)
+
+    def calibrate(self, vectors: np.ndarray, target: float, seed: int = 0) -> float:
+        """Double `nprobe` from its default until `target` recall@k is reached; returns the recall."""
+        n, nlist = vectors.shape[0], self.centroids.shape[0]
+        if n < 2:
+            return 1.0
+        rng = np.random.default_rng(seed + 1)
+        positions = np.sort(rng.choice(n, size=min(n, CALIBRATION_QUERIES), replace=False))
+        k = min(CALIBRATION_K, n - 1)
+        self.nprobe = default_nprobe(nlist)
+        recall = self.recall(vectors, positions, k)
+        while recall < target and self.nprobe < nlist:
+            self.nprobe = min(nlist, self.nprobe * 2)
+            recall = self.recall(vectors, positions, k)
+        return recall
+
+    @property
+    def worthwhile(self) -> bool:
+        """False when the calibrated `nprobe` scans so many lists that the exact path is faster."""
+        return self.nprobe <= max_probe_ratio() * self.centroids.shape[0]
+
+    def search(self, vectors: np.ndarray, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probes = top_k_indices(self.centroids @ query_vec, self.nprobe)
+        candidates = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        candidates.sort()  # lecture séquentielle du mmap
+        cand_scores = np.asarray(vectors[candidates], dtype=np.float32) @ query_vec
+        top = top_k_indices(cand_scores, k)
+        return candidates[top], cand_scores[top]
+
+    def save(self, base: Path, meta: Dict[str, Any]) -> None:
+        tmp = base.with_name(base.name + ".ivf.tmp.npz")
+        np.savez(
+            tmp,
+            centroids=self.centroids,
+            order=self.order,
+            offsets=self.offsets,
+            nprobe=np.array(self.nprobe),
+            meta=np.array(json.dumps(meta)),
+        )
+        tmp.replace(base.with_suffix(".npz"))
+
+    @classmethod
+    def load(cls, base: Path) -> Tuple[Optional["IVFIndex"], Dict[str, Any]]:
+        path = base.with_suffix(".npz")
+        if not path.exists():
+            return None, {}
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            nprobe = int(data["nprobe"]) if "nprobe" in data.files else None
+            return cls(data["centroids"], data["order"], data["offsets"], nprobe), meta
+
+
+class HNSWIndex:
+    """hnswlib graph over the matrix rows (labels are row positions)."""
+
+    backend = "hnsw"
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.graph.set_ef(int(os.getenv("ANN_EF_SEARCH", "64")))
+
+    worthwhile = True
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, m: int = 16, ef_construction: int = 200) -> "HNSWIndex":
+        n, dim = vectors.shape
+        graph = hnswlib.Index(space="ip", dim=dim)
+        graph.init_index(max_elements=n, ef_construction=ef_construction, M=m)
+        for start in range(0, n, 8192):
+            block = np.asarray(vectors[start:start + 8192], dtype=np.float32)
+            graph.add_items(block, np.arange(start, start + block.shape[0]))
+        return cls(graph)
+
+    def search(self, vectors: np.ndarray, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.graph.get_current_count())
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.graph.ef < k:
+            self.graph.set_ef(k)
+        labels, _ = self.graph.knn_query(query_vec, k=k)
+        positions = labels[0].astype(np.int64)
+        # Score exact (la distance hnswlib vaut 1 - produit scalaire).
+        pos_scores = np.asarray(vectors[positions], dtype=np.float32) @ query_vec
+        top = np.argsort(-pos_scores, kind="stable")
+        return positions[top], pos_scores[top]
+
+    def save(self, base: Path, meta: Dict[str, Any]) -> None:
+        tmp = base.with_name(base.name + ".hnsw.tmp")
+        self.graph.save_index(str(tmp))
+        tmp.replace(base.with_suffix(".bin"))
+        base.with_suffix(".json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, base: Path, dim: int) -> Tuple[Optional["HNSWIndex"], Dict[str, Any]]:
+        graph_path, meta_path = base.with_suffix(".bin"), base.with_suffix(".json")
+        if hnswlib is None or not graph_path.exists() or not meta_path.exists():
+            return None, {}
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        graph = hnswlib.Index(space="ip", dim=dim)
+        graph.load_index(str(graph_path), max_elements=int(meta.get("rows") or 0))
+        return cls(graph), meta
+
+
+def ann_backend() -> str:
+    choice = (os.getenv("ANN_BACKEND") or "auto").strip().lower()
+    if choice == "hnsw" and hnswlib is None:
+        print("⚠️ ANN_BACKEND=hnsw mais hnswlib n'est pas installé, repli sur ivf")
+        return "ivf"
+    if choice in ("hnsw", "ivf"):
+        return choice
+    return "hnsw" if hnswlib is not None else "ivf"
+
+
+def build_ann(index: EmbeddingIndex, backend: Optional[str] = None):
+    backend = backend or ann_backend()
+    if backend == "hnsw":
+        return HNSWIndex.build(index.vectors)
+    return IVFIndex.build(index.vectors)
+
+
+class AnnCache:
+    """
+    ANN structure of one corpus, kept in sync with its `EmbeddingIndex`.
+
+    The structure is tied to the index object it was built for; when the
+    index is replaced (refresh, reload) a rebuild starts in the background
+    and `search` returns None in the meantime.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._index: Optional[EmbeddingIndex] = None
+        self._ann = None
+        self._building = False
+        self._lock = threading.Lock()
+
+    def _base(self, directory: Path, backend: str) -> Path:
+        return Path(directory) / f"{self.name}_{backend}_v{ANN_FORMAT}"
+
+    def _meta(self, index: EmbeddingIndex, backend: str) -> Dict[str, Any]:
+        return {"format": ANN_FORMAT, "backend": backend, "rows": len(index), "version": index.version}
+
+    def _load(self, index: EmbeddingIndex, directory: Optional[Path], backend: str):
+        if directory is None or index.version is None:
+            return None
+        base = self._base(directory, backend)
+        try:
+            if backend == "hnsw":
+                ann, meta = HNSWIndex.load(base, index.dim)
+            else:
+                ann, meta = IVFIndex.load(base)
+        except Exception as exc:
+            print(f"⚠️ Index ANN {self.name} illisible: {exc}")
+            return None
+        return ann if ann is not None and meta == self._meta(index, backend) else None
+
+    def _build(self, index: EmbeddingIndex, directory: Optional[Path], backend: str) -> None:
+        try:
+            ann = build_ann(index, backend)
+            with self._lock:
+                self._index, self._ann = index, ann
+            print(f"✅ Index ANN {self.name} ({backend}) construit: {len(index)} vecteurs")
+            if not ann.worthwhile:
+                print(
+                    f"⚠️ Index ANN {self.name}: nprobe {ann.nprobe}/{ann.centroids.shape[0]} listes, "
+                    "recherche exacte conservée"
+                )
+            if directory is not None and index.version is not None:
+                try:
+                    ann.save(self._base(directory, backend), self._meta(index, backend))
+                except Exception as exc:
+                    print(f"⚠️ Index ANN {self.name} non écrit: {exc}")
+        except Exception as exc:
+            print(f"⚠️ Construction index ANN {self.name} échouée: {exc}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def get(self, index: EmbeddingIndex, directory: Optional[Path] = None):
+        """ANN structure for `index`, or None while it is being (re)built."""
+        with self._lock:
+            if self._index is index:
+                return self._ann
+            if self._building:
+                return None
+            self._building = True
+        backend = ann_backend()
+        ann = self._load(index, directory, backend)
+        if ann is not None:
+            with self._lock:
+                self._index, self._ann, self._building = index, ann, False
+            return ann
+        threading.Thread(
+            target=self._build,
+            args=(index, directory, backend),
+            name=f"ann-build-{self.name}",
+            daemon=True,
+        ).start()
+        return None
+
+    def search(
+        self,
+        index: EmbeddingIndex,
+        query_vec: np.ndarray,
+        k: int,
+        directory: Optional[Path] = None,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-`k` as `(positions, scores)`, best first, with exact
+        scores for the returned rows. None when no structure is ready yet or
+        when ANN is not worth it for this corpus (see module docstring).
+        """
+        if len(index) < min_rows():
+            return None
+        ann = self.get(index, directory)
+        if ann is None or not ann.worthwhile:
+            return None
+        return ann.search(index.vectors, np.asarray(query_vec, dtype=np.float32), k)
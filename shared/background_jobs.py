@@ -0,0 +1,445 @@
+"""
+Postgres-backed background jobs for long-running batch endpoints.
+
+Jobs live in the `background_jobs` table (migration
+20251017_create_background_jobs.sql); workers are plain threads, started
+inside the API (`start_worker_threads`) or in dedicated processes
+(BB/backend/job_worker.py), that claim queued jobs with
+`FOR UPDATE SKIP LOCKED`, so no external broker is needed.
+
+- `enqueue(kind, params)` stores a job and returns it; `register_handler`
+  maps a kind to `handler(job, **params)`.
+- The handler reports progress through `job.update()` / `job.increment()`
+  (`done` / `total` drive the ETA) and calls `job.check_cancelled()`
+  between units of work.
+- A failing job is re-queued with exponential backoff until
+  `max_attempts` (`JOB_MAX_ATTEMPTS`, default 3); `JobFailed` marks a
+  failure that must not be retried. A running job whose heartbeat is older
+  than `JOB_STALE_SECONDS` (default 600) is reclaimed by another worker.
+  The heartbeat is refreshed by a timer thread every
+  `JOB_HEARTBEAT_SECONDS` (default: a quarter of the stale delay) while the
+  handler runs, whether or not it reports progress, so only jobs whose
+  worker died are reclaimed. A stale job without attempts left is marked
+  failed instead, and a run only records its outcome while its worker still
+  owns the job.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from psycopg2.extras import Json
+
+from shared.postgres import get_connection
+
+JOB_STATUSES = ("queued", "running", "success", "failed", "cancelled")
+
+_HANDLERS: Dict[str, Callable[..., Any]] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job has been cancelled."""
+
+
+class JobFailed(Exception):
+    """Failure that must not be retried (invalid input, rejected batch...)."""
+
+
+def register_handler(kind: str, handler: Callable[..., Any]) -> None:
+    _HANDLERS[kind] = handler
+
+
+def _max_attempts() -> int:
+    return max(int(os.getenv("JOB_MAX_ATTEMPTS", "3")), 1)
+
+
+def _serialize(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = {key: (value.isoformat() if isinstance(value, datetime) else value) for key, value in dict(row).items()}
+    job["id"] = str(job["id"])
+    progress = job.get("progress") or {}
+    job["progress"] = {key: value for key, value in progress.items() if key != "partial"}
+    job["eta_seconds"] = _eta(row)
+    return job
+
+
+def _eta(row: Dict[str, Any]) -> Optional[float]:
+    progress = row.get("progress") or {}
+    done, total = progress.get("done") or 0, progress.get("total") or 0
+    started = row.get("started_at")
+    if row.get("status") != "running" or not started or not done or not total:
+        return None
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    return round(elapsed / done * max(total - done, 0), 1)
+
+
+class Job:
+    """
+    Handle given to a handler. Progress is merged in memory and written to
+    `background_jobs.progress` at most once per `flush_interval` seconds
+    (together with the heartbeat). Without `job_id` (synchronous calls)
+    nothing is persisted.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        progress: Optional[Dict[str, Any]] = None,
+        flush_interval: float = 1.0,
+    ):
+        self.id = job_id
+        self.kind = kind
+        self.params = params or {}
+        self.progress: Dict[str, Any] = dict(progress or {})
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._cancel_checked_at = 0.0
+        self._cancelled = False
+
+    def update(self, force: bool = False, **progress: Any) -> None:
+        with self._lock:
+            self.progress.update(progress)
+        self._flush(force)
+
+    def increment(self, **counters: int) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                self.progress[name] = self.progress.get(name, 0) + value
+        self._flush()
+
+    def cancelled(self) -> bool:
+        if self.id is None or self._cancelled:
+            return self._cancelled
+        now = time.monotonic()
+        if now - self._cancel_checked_at >= self.flush_interval:
+            self._cancel_checked_at = now
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT cancel_requested FROM background_jobs WHERE id = %s", (self.id,))
+                row = cur.fetchone()
+            self._cancelled = bool(row and row["cancel_requested"])
+        return self._cancelled
+
+    def check_cancelled(self) -> None:
+        if self.cancelled():
+            raise JobCancelled(f"Tâche {self.id} annulée")
+
+    def _flush(self, force: bool = False) -> None:
+        if self.id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_interval:
+            return
+        self._flushed_at = now
+        with self._lock:
+            progress = dict(self.progress)
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE background_jobs
+                SET progress = %s, heartbeat_at = timezone('utc', now())
+                WHERE id = %s
+                """,
+                (Json(progress), self.id),
+            )
+            conn.commit()
+
+
+def enqueue(kind: str, params: Dict[str, Any], total: Optional[int] = None, max_attempts: Optional[int] = None) -> Dict[str, Any]:
+    """Store a queued job and return it (serialized)."""
+    progress = {"done": 0, "total": total} if total is not None else {}
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO background_jobs (kind, params, progress, max_attempts)
+            VALUES (%s, %s, %s, %s)
+            RETURNING *
+            """,
+            (kind, Json(params), Json(progress), max_attempts or _max_attempts()),
+        )
+        row = cur.fetchone()
+        conn.commit()
+    return _serialize(row)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT * FROM background_jobs WHERE id = %s", (job_id,))
+        return _serialize(cur.fetchone())
+
+
+def list_jobs(kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    where, params = [], []
+    if kind:
+        where.append("kind = %s")
+        params.append(kind)
+    if status:
+        where.append("status = %s")
+        params.append(status)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT * FROM background_jobs
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY created_at DESC
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        return [_serialize(row) for row in cur.fetchall()]
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Cancel a queued job at once; a running job stops at its next `check_cancelled()`."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET cancel_requested = true,
+                status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                finished_at = CASE WHEN status = 'queued' THEN timezone('utc', now()) ELSE finished_at END
+            WHERE id = %s AND status IN ('queued', 'running')
+            RETURNING *
+            """,
+            (job_id,),
+        )
+        row = cur.fetchone()
+        conn.commit()
+    return _serialize(row)
+
+
+def retry_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Re-queue a failed or cancelled job; its saved progress lets the handler resume."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET status = 'queued',
+                attempts = 0,
+                error = NULL,
+                cancel_requested = false,
+                run_after = timezone('utc', now()),
+                finished_at = NULL
+            WHERE id = %s AND status IN ('failed', 'cancelled')
+            RETURNING *
+            """,
+            (job_id,),
+        )
+        row = cur.fetchone()
+        conn.commit()
+    return _serialize(row)
+
+
+def _stale_seconds() -> int:
+    return int(os.getenv("JOB_STALE_SECONDS", "600"))
+
+
+def _heartbeat_interval() -> float:
+    raw = os.getenv("JOB_HEARTBEAT_SECONDS")
+    return float(raw) if raw else max(_stale_seconds() / 4, 1.0)
+
+
+def _beat(job_id: str, worker: str) -> bool:
+    """Refresh the heartbeat of a job this worker still owns; False once it was reclaimed or finished."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET heartbeat_at = timezone('utc', now())
+            WHERE id = %s AND worker = %s AND status = 'running'
+            """,
+            (job_id, worker),
+        )
+        owned = cur.rowcount > 0
+        conn.commit()
+    return owned
+
+
+def _keep_alive(job_id: str, worker: str, done: threading.Event) -> None:
+    """Heartbeat timer run beside the handler until `done` is set."""
+    interval = _heartbeat_interval()
+    while not done.wait(interval):
+        try:
+            if not _beat(job_id, worker):
+                print(f"⚠️  Tâche {job_id} n'appartient plus à {worker} (reprise ou terminée)")
+                return
+        except Exception as exc:
+            print(f"⚠️  Heartbeat de la tâche {job_id} non écrit: {exc}")
+
+
+def _claim(worker: str) -> Optional[Dict[str, Any]]:
+    stale_seconds = _stale_seconds()
+    with get_connection() as conn, conn.cursor() as cur:
+        # Tâches dont le worker a disparu sans essai restant (ou annulées) : on les clôt.
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'failed' END,
+                error = CASE WHEN cancel_requested THEN error
+                             ELSE 'Worker perdu au dernier essai (' || attempts || '/' || max_attempts || ')' END,
+                finished_at = timezone('utc', now())
+            WHERE status = 'running'
+              AND heartbeat_at < timezone('utc', now()) - make_interval(secs => %s)
+              AND (attempts >= max_attempts OR cancel_requested)
+            """,
+            (stale_seconds,),
+        )
+        conn.commit()
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET status = 'running',
+                attempts = attempts + 1,
+                worker = %s,
+                started_at = COALESCE(started_at, timezone('utc', now())),
+                heartbeat_at = timezone('utc', now())
+            WHERE id = (
+                SELECT id FROM background_jobs
+                WHERE kind = ANY(%s)
+                  AND NOT cancel_requested
+                  AND ((status = 'queued' AND run_after <= timezone('utc', now()))
+                       OR (status = 'running'
+                           AND attempts < max_attempts
+                           AND heartbeat_at < timezone('utc', now()) - make_interval(secs => %s)))
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, kind, params, progress, attempts, max_attempts
+            """,
+            (worker, list(_HANDLERS), stale_seconds),
+        )
+        row = cur.fetchone()
+        conn.commit()
+    return dict(row) if row else None
+
+
+def _finish(
+    job_id: str,
+    worker: str,
+    status: str,
+    result: Any = None,
+    error: Optional[str] = None,
+    progress: Optional[Dict[str, Any]] = None,
+    retry_in: Optional[float] = None,
+) -> bool:
+    """Record the outcome of a run; False when `worker` no longer owns the job (it was reclaimed)."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE background_jobs
+            SET status = %s,
+                result = COALESCE(%s, result),
+                error = %s,
+                progress = COALESCE(%s, progress),
+                run_after = timezone('utc', now()) + make_interval(secs => %s),
+                finished_at = CASE WHEN %s IN ('success', 'failed', 'cancelled') THEN timezone('utc', now()) END
+            WHERE id = %s AND worker = %s AND status = 'running'
+            """,
+            (
+                status,
+                Json(result) if result is not None else None,
+                error,
+                Json(progress) if progress is not None else None,
+                retry_in or 0,
+                status,
+                job_id,
+                worker,
+            ),
+        )
+        owned = cur.rowcount > 0
+        conn.commit()
+    if not owned:
+        print(f"⚠️  Tâche {job_id} reprise par un autre worker : résultat de {worker} ignoré")
+    return owned
+
+
+def run_next(worker: str) -> bool:
+    """Claim and run one job; returns False when nothing was ready."""
+    row = _claim(worker)
+    if row is None:
+        return False
+    job_id = str(row["id"])
+    job = Job(row["kind"], row["params"], job_id=job_id, progress=row["progress"])
+    print(f"⚙️  Tâche {row['kind']} {job_id} (essai {row['attempts']}/{row['max_attempts']}) sur {worker}")
+    handler_done = threading.Event()
+    threading.Thread(
+        target=_keep_alive,
+        args=(job_id, worker, handler_done),
+        name=f"job-heartbeat-{job_id}",
+        daemon=True,
+    ).start()
+    try:
+        try:
+            result = _HANDLERS[row["kind"]](job, **(row["params"] or {}))
+        finally:
+            handler_done.set()
+    except JobCancelled:
+        _finish(job_id, worker, "cancelled", progress=job.progress)
+        print(f"⏹️  Tâche {job_id} annulée")
+    except Exception as exc:
+        traceback.print_exc()
+        retry = not isinstance(exc, JobFailed) and row["attempts"] < row["max_attempts"]
+        delay = 2 ** row["attempts"] * float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+        _finish(job_id, worker, "queued" if retry else "failed", error=str(exc), progress=job.progress, retry_in=delay if retry else None)
+        print(f"❌ Tâche {job_id}: {exc}" + (f" (nouvel essai dans {delay:.0f}s)" if retry else ""))
+    else:
+        if _finish(job_id, worker, "success", result=result, progress=job.progress):
+            print(f"✅ Tâche {job_id} terminée")
+    return True
+
+
+def worker_loop(name: Optional[str] = None, poll_interval: float = 2.0, stop: Optional[threading.Event] = None) -> None:
+    """Run jobs until `stop` is set, sleeping `poll_interval` seconds when the queue is empty."""
+    name = name or f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            busy = run_next(name)
+        except Exception as exc:
+            # Table absente ou base indisponible : on réessaie plus tard.
+            print(f"⚠️ File de tâches indisponible ({name}): {exc}")
+            busy = False
+            stop.wait(poll_interval * 15)
+        if not busy:
+            stop.wait(poll_interval)
+
+
+def start_worker_threads(count: int, poll_interval: float = 2.0) -> threading.Event:
+    """Start `count` daemon worker threads; set the returned event to stop them."""
+    stop = threading.Event()
+    for index in range(count):
+        threading.Thread(
+            target=worker_loop,
+            kwargs={"poll_interval": poll_interval, "stop": stop},
+            name=f"job-worker-{index}",
+            daemon=True,
+        ).start()
+    return stop
+
+
+def merge_results(total: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two batch responses: numbers are summed, lists concatenated, dicts merged."""
+    merged = dict(total)
+    for key, value in part.items():
+        current = merged.get(key)
+        if current is None or isinstance(value, bool) or isinstance(current, bool):
+            merged[key] = value
+        elif isinstance(value, (int, float)) and isinstance(current, (int, float)):
+            merged[key] = current + value
+        elif isinstance(value, list) and isinstance(current, list):
+            merged[key] = current + value
+        elif isinstance(value, dict) and isinstance(current, dict):
+            merged[key] = merge_results(current, value)
+        else:
+            merged[key] = value
+    return merged
@@ -0,0 +1,612 @@
+"""
+In-memory embedding index shared by the semantic search endpoints.
+
+Every corpus (Cour Suprême, JORADP) keeps its embeddings as a single
+contiguous `(N, dim)` float32 matrix of L2-normalized vectors, plus
+parallel per-row columns (ids, numbers, dates, paths...). A query is
+scored with one matrix-vector product and the best rows are selected
+with `argpartition`, so no Python-level loop runs over the corpus.
+
+An index can be persisted as a versioned snapshot (`<name>_v2.npy` for
+the matrix, `<name>_v2.json` for ids/columns/sources) and reopened with
+`np.load(mmap_mode="r")`, so a restart does not download every vector
+from R2 again. Snapshot names are namespaced per service (`bb_joradp`,
+`aa_joradp`, ...) since services index different columns. Rows embedded
+after the index was built are merged in with `EmbeddingIndex.upsert`,
+driven by a `RefreshThrottle`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+SNAPSHOT_FORMAT = 2
+
+
+def normalize_vector(vec: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Return `vec` as a float32 unit vector, or None when it is empty/null."""
+    if vec is None:
+        return None
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    if arr.size == 0:
+        return None
+    norm = float(np.linalg.norm(arr))
+    if norm == 0 or not np.isfinite(norm):
+        return None
+    return arr / norm
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the `k` highest scores, best first.
+    Uses a partial selection so only the `k` winners are fully sorted.
+    """
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+class EmbeddingIndex:
+    """
+    Contiguous matrix of normalized embeddings with parallel metadata columns.
+
+    `ids` is an int64 array aligned with the matrix rows; `columns` maps a
+    field name to a list holding one value per row.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: Sequence[int],
+        columns: Optional[Dict[str, List[Any]]] = None,
+        sources: Optional[Sequence[Optional[str]]] = None,
+        version: Optional[Dict[str, Any]] = None,
+    ):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.columns: Dict[str, List[Any]] = {name: list(values) for name, values in (columns or {}).items()}
+        # R2 path each vector was read from, used to detect changed rows.
+        self.sources: List[Optional[str]] = list(sources) if sources is not None else [None] * len(self.ids)
+        self.version = version
+        if self.vectors.ndim != 2 or self.vectors.shape[0] != self.ids.shape[0]:
+            raise ValueError("vectors and ids must describe the same number of rows")
+        for name, values in self.columns.items():
+            if len(values) != self.ids.shape[0]:
+                raise ValueError(f"column {name} does not match the number of rows")
+        if len(self.sources) != self.ids.shape[0]:
+            raise ValueError("sources does not match the number of rows")
+        # Tableaux dérivés (masques de filtres, dates) calculés une fois par index.
+        self._derived: Dict[Any, np.ndarray] = {}
+
+    @classmethod
+    def empty(cls, fields: Iterable[str] = (), dim: int = EMBEDDING_DIM) -> "EmbeddingIndex":
+        return cls(np.empty((0, dim), dtype=np.float32), [], {name: [] for name in fields})
+
+    @classmethod
+    def from_items(
+        cls,
+        items: Iterable[Dict[str, Any]],
+        fields: Sequence[str],
+        dim: int = EMBEDDING_DIM,
+    ) -> "EmbeddingIndex":
+        """
+        Build an index from dicts carrying an `id`, a `vector` and the
+        requested metadata `fields`. Vectors are normalized here; rows whose
+        vector is empty or does not have `dim` components are skipped.
+        """
+        ids: List[int] = []
+        vectors: List[np.ndarray] = []
+        sources: List[Optional[str]] = []
+        columns: Dict[str, List[Any]] = {name: [] for name in fields}
+        for item in items:
+            vec = normalize_vector(item.get("vector"))
+            if vec is None or vec.shape[0] != dim:
+                continue
+            ids.append(item["id"])
+            vectors.append(vec)
+            sources.append(item.get("source"))
+            for name in fields:
+                columns[name].append(item.get(name))
+        if not vectors:
+            return cls.empty(fields, dim)
+        return cls(np.vstack(vectors), ids, columns, sources)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def scores(self, query_vec: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of a normalized query against every row, or only
+        against the rows at `positions` (a pre-filtered subset).
+        """
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        if positions is None:
+            return self.vectors @ query_vec
+        return self.vectors[positions] @ query_vec
+
+    def cached(self, key: Any, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the array stored under `key`, building it on first use."""
+        value = self._derived.get(key)
+        if value is None:
+            value = build()
+            self._derived[key] = value
+        return value
+
+    def id_mask(self, ids: Iterable[int]) -> np.ndarray:
+        """Boolean mask of the rows whose id is in `ids`."""
+        wanted = np.fromiter((int(doc_id) for doc_id in ids), dtype=np.int64)
+        return np.isin(self.ids, wanted)
+
+    def date_mask(
+        self,
+        field: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        parse: Optional[Callable[[Any], Optional[str]]] = None,
+    ) -> np.ndarray:
+        """
+        Boolean mask of the rows whose `field` falls within `[start, end]`
+        (ISO `YYYY-MM-DD` bounds, either may be None). Values are turned into
+        sortable `YYYYMMDD` integers once per index, with `parse` converting
+        raw values to ISO strings when needed; rows without a date never match.
+        """
+        keys = self.cached(("date", field), lambda: _date_keys(self.columns[field], parse))
+        mask = keys > 0
+        if start:
+            mask &= keys >= _date_key(start)
+        if end:
+            mask &= keys <= _date_key(end)
+        return mask
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """Hydrate the metadata of a single matrix row."""
+        entry: Dict[str, Any] = {"id": int(self.ids[position])}
+        for name, values in self.columns.items():
+            entry[name] = values[position]
+        return entry
+
+    def positions_by_id(self) -> Dict[int, int]:
+        return {int(doc_id): pos for pos, doc_id in enumerate(self.ids.tolist())}
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """`MAX(updated_at)` of the rows the index was built from."""
+        return (self.version or {}).get("updated_at")
+
+    def upsert(self, items: Iterable[Dict[str, Any]], drop_ids: Iterable[int] = ()) -> "EmbeddingIndex":
+        """
+        Return a new index where rows of `items` replace the rows with the
+        same id (or are appended) and `drop_ids` are removed. The current
+        index is left untouched so concurrent readers keep a consistent view.
+        """
+        fresh = EmbeddingIndex.from_items(items, tuple(self.columns), self.dim)
+        removed = set(fresh.ids.tolist()) | {int(doc_id) for doc_id in drop_ids}
+        if not len(fresh) and not removed:
+            return self
+        keep = ~np.isin(self.ids, np.fromiter(removed, dtype=np.int64, count=len(removed)))
+        kept_positions = np.flatnonzero(keep).tolist()
+        columns = {
+            name: [values[pos] for pos in kept_positions] + fresh.columns[name]
+            for name, values in self.columns.items()
+        }
+        return EmbeddingIndex(
+            np.vstack([self.vectors[keep], fresh.vectors]),
+            np.concatenate([self.ids[keep], fresh.ids]),
+            columns,
+            [self.sources[pos] for pos in kept_positions] + fresh.sources,
+            self.version,
+        )
+
+
+def _date_key(value: Any) -> int:
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    text = str(value or "")[:10]
+    if len(text) != 10 or not (text[:4] + text[5:7] + text[8:10]).isdigit():
+        return 0
+    return int(text[:4] + text[5:7] + text[8:10])
+
+
+def _date_keys(values: Sequence[Any], parse: Optional[Callable[[Any], Optional[str]]] = None) -> np.ndarray:
+    if parse is not None:
+        values = [parse(value) if value else None for value in values]
+    return np.fromiter((_date_key(value) for value in values), dtype=np.int64, count=len(values))
+
+
+def snapshot_version(row_count: Any, updated_at: Any) -> Dict[str, Any]:
+    """
+    Build the version key of a corpus snapshot from `COUNT(*)` and
+    `MAX(updated_at)` of its embedded rows.
+    """
+    if hasattr(updated_at, "isoformat"):
+        updated_at = updated_at.isoformat()
+    return {"rows": int(row_count or 0), "updated_at": updated_at}
+
+
+def get_snapshot_dir(default: Optional[Path] = None) -> Optional[Path]:
+    """
+    Directory holding embedding snapshots (`EMBED_SNAPSHOT_DIR`, or
+    `default` when the variable is not set).
+    """
+    raw = os.getenv("EMBED_SNAPSHOT_DIR")
+    path = Path(raw).expanduser() if raw else default
+    if path is None:
+        return None
+    try:
+        path = path.resolve()
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    except OSError:
+        return None
+
+
+def _snapshot_paths(directory: Path, name: str) -> Tuple[Path, Path]:
+    base = Path(directory) / f"{name}_v{SNAPSHOT_FORMAT}"
+    return base.with_suffix(".npy"), base.with_suffix(".json")
+
+
+def _matrix_checksum(vectors: np.ndarray, block: int = 16384) -> str:
+    """sha256 of the float32 matrix bytes, read in row blocks (works on a memmap)."""
+    digest = hashlib.sha256()
+    for start in range(0, vectors.shape[0], block):
+        digest.update(np.ascontiguousarray(vectors[start:start + block], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def save_snapshot(index: EmbeddingIndex, directory: Optional[Path], name: str) -> bool:
+    """
+    Persist `index` as `<name>_v2.npy` + `<name>_v2.json`. Both files are
+    written to temporary paths of this process/thread first and swapped in
+    atomically; the manifest records the row count and checksum of the
+    matrix it was written with, so a reader never pairs it with another one.
+    """
+    if directory is None:
+        return False
+    matrix_path, manifest_path = _snapshot_paths(directory, name)
+    vectors = np.ascontiguousarray(index.vectors, dtype=np.float32)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "dim": index.dim,
+        "rows": int(vectors.shape[0]),
+        "checksum": _matrix_checksum(vectors),
+        "version": index.version,
+        "created_at": datetime.utcnow().isoformat(),
+        "ids": index.ids.tolist(),
+        "sources": index.sources,
+        "columns": index.columns,
+    }
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_matrix = matrix_path.with_name(matrix_path.name + suffix)
+    tmp_manifest = manifest_path.with_name(manifest_path.name + suffix)
+    try:
+        with tmp_matrix.open("wb") as f:
+            np.save(f, vectors)
+        with tmp_manifest.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, default=str)
+        tmp_matrix.replace(matrix_path)
+        tmp_manifest.replace(manifest_path)
+        return True
+    except Exception as exc:
+        print(f"⚠️ Snapshot embeddings {name} non écrit: {exc}")
+        for tmp in (tmp_matrix, tmp_manifest):
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+        return False
+
+
+def load_snapshot(
+    directory: Optional[Path],
+    name: str,
+    fields: Optional[Sequence[str]] = None,
+    attempts: int = 3,
+) -> Optional[EmbeddingIndex]:
+    """
+    Reopen a snapshot written by `save_snapshot`. The matrix is memory-mapped
+    read-only, so pages are only read from disk when they are scored.
+    Returns None when the snapshot is missing or inconsistent, or when its
+    metadata columns are not exactly `fields` (a snapshot written by another
+    service or an older column set). A matrix that does not match the
+    manifest (another process swapping the files in) is re-read up to
+    `attempts` times.
+    """
+    if directory is None:
+        return None
+    matrix_path, manifest_path = _snapshot_paths(directory, name)
+    for attempt in range(attempts):
+        if not matrix_path.exists() or not manifest_path.exists():
+            return None
+        try:
+            with manifest_path.open("r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                return None
+            if fields is not None and set(manifest.get("columns") or {}) != set(fields):
+                return None
+            vectors = np.load(matrix_path, mmap_mode="r")
+            ids = manifest.get("ids") or []
+            if (
+                vectors.shape[0] != manifest.get("rows", len(ids))
+                or len(ids) != vectors.shape[0]
+                or manifest.get("checksum") != _matrix_checksum(vectors)
+            ):
+                if attempt + 1 < attempts:
+                    time.sleep(0.2)
+                    continue
+                print(f"⚠️ Snapshot embeddings {name}: matrice et manifeste incohérents")
+                return None
+            return EmbeddingIndex(
+                vectors,
+                ids,
+                manifest.get("columns") or {},
+                manifest.get("sources"),
+                manifest.get("version"),
+            )
+        except Exception as exc:
+            print(f"⚠️ Snapshot embeddings {name} illisible: {exc}")
+            return None
+    return None
+
+
+def collect_items(
+    rows: Iterable[Dict[str, Any]],
+    fields: Sequence[str],
+    source_of: Callable[[Dict[str, Any]], Optional[str]],
+    fetch_vector: Callable[[str], Optional[np.ndarray]],
+    previous: Optional[EmbeddingIndex] = None,
+    max_workers: int = 8,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Turn database rows into index items. Vectors whose R2 source is unchanged
+    since `previous` are reused; only new or changed rows go through
+    `fetch_vector`. Returns the items and the number of vectors fetched.
+    """
+    reuse = previous.positions_by_id() if previous is not None else {}
+    items: List[Dict[str, Any]] = []
+    to_fetch: List[Dict[str, Any]] = []
+    for row in rows:
+        source = source_of(row)
+        if not source:
+            continue
+        item = {"id": row["id"], "source": source}
+        for name in fields:
+            item[name] = row.get(name)
+        pos = reuse.get(int(row["id"]))
+        if pos is not None and previous.sources[pos] == source:
+            item["vector"] = previous.vectors[pos]
+            items.append(item)
+        else:
+            to_fetch.append(item)
+
+    def worker(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        vec = fetch_vector(item["source"])
+        if vec is None:
+            return None
+        item["vector"] = vec
+        return item
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(worker, item) for item in to_fetch]
+            for fut in as_completed(futures):
+                item = fut.result()
+                if item:
+                    items.append(item)
+    return items, len(to_fetch)
+
+
+def build_index(
+    rows: Iterable[Dict[str, Any]],
+    fields: Sequence[str],
+    source_of: Callable[[Dict[str, Any]], Optional[str]],
+    fetch_vector: Callable[[str], Optional[np.ndarray]],
+    previous: Optional[EmbeddingIndex] = None,
+    max_workers: int = 8,
+    dim: int = EMBEDDING_DIM,
+) -> Tuple[EmbeddingIndex, int]:
+    """
+    Build a full index from database rows (see `collect_items`).
+    Returns the index and the number of vectors fetched.
+    """
+    items, fetched = collect_items(rows, fields, source_of, fetch_vector, previous, max_workers)
+    # Tri par id pour un ordre de lignes stable d'un chargement à l'autre.
+    items.sort(key=lambda item: item["id"])
+    return EmbeddingIndex.from_items(items, fields, dim), fetched
+
+
+class RefreshThrottle:
+    """
+    Run a refresh callable in a background thread, at most once every
+    `interval` seconds and never twice at the same time. An interval of 0
+    disables refreshing.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        if interval is None:
+            interval = float(os.getenv("EMBED_REFRESH_INTERVAL", "60"))
+        self.interval = interval
+        self._last = 0.0
+        self._running = False
+        self._lock = threading.Lock()
+
+    def trigger(self, fn: Callable[[], Any]) -> bool:
+        if self.interval <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._running or now - self._last < self.interval:
+                return False
+            self._running = True
+            self._last = now
+
+        def run():
+            try:
+                fn()
+            except Exception as exc:
+                print(f"⚠️ Rafraîchissement embeddings échoué: {exc}")
+            finally:
+                with self._lock:
+                    self._running = False
+
+        threading.Thread(target=run, name="embeddings-refresh", daemon=True).start()
+        return True
+
+
+class TableIndexCache:
+    """
+    `EmbeddingIndex` of the embedded rows of one table, loaded once per
+    process and kept up to date incrementally.
+
+    `table`, `columns` (the SELECT list, `id` first) and `embedded` (the SQL
+    predicate of rows that have a vector) describe the corpus; `changed_at`
+    is the SQL expression the version and the refresh watermark are taken
+    from. `load` reuses the disk snapshot `name` as-is when the version
+    (`COUNT(*)`, `MAX(changed_at)`) has not moved, otherwise only the vectors
+    whose source path changed are downloaded again. `refresh` re-reads the
+    rows changed since the index watermark and merges them under the lock;
+    `get` returns the index and schedules a throttled refresh.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        columns: Sequence[str],
+        fields: Sequence[str],
+        embedded: str,
+        source_of: Callable[[Dict[str, Any]], Optional[str]],
+        fetch_vector: Callable[[str], Optional[np.ndarray]],
+        changed_at: str = "updated_at",
+        prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        snapshot_dir: Optional[Path] = None,
+        label: Optional[str] = None,
+        max_workers: int = 8,
+    ):
+        self.name = name
+        self.table = table
+        self.columns = tuple(columns)
+        self.fields = tuple(fields)
+        self.embedded = embedded
+        self.source_of = source_of
+        self.fetch_vector = fetch_vector
+        self.changed_at = changed_at
+        self.prepare = prepare
+        self.default_snapshot_dir = snapshot_dir
+        self.label = label or name
+        self.max_workers = max_workers
+        self.index: Optional[EmbeddingIndex] = None
+        self.refresh_throttle = RefreshThrottle()
+        self._lock = threading.Lock()
+
+    def _version(self, cur) -> Dict[str, Any]:
+        cur.execute(
+            f"SELECT COUNT(*) AS row_count, MAX({self.changed_at}) AS updated_at "
+            f"FROM {self.table} WHERE {self.embedded}"
+        )
+        stamp = cur.fetchone()
+        return snapshot_version(stamp["row_count"], stamp["updated_at"])
+
+    def _rows(self, cur, since: Optional[EmbeddingIndex] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE ({self.embedded})"
+        if since is None:
+            cur.execute(query)
+        else:
+            # >= : les lignes au watermark exact sont relues, les vecteurs inchangés ne sont pas retéléchargés.
+            cur.execute(f"{query} AND (%s IS NULL OR {self.changed_at} >= %s)", (since.watermark, since.watermark))
+        rows = cur.fetchall()
+        return [self.prepare(row) for row in rows] if self.prepare else list(rows)
+
+    def load(self) -> EmbeddingIndex:
+        if self.index is not None:
+            return self.index
+        from shared.postgres import get_connection
+
+        with self._lock:
+            if self.index is not None:
+                return self.index
+            snapshot_dir = get_snapshot_dir(self.default_snapshot_dir)
+            snapshot = load_snapshot(snapshot_dir, self.name, self.fields)
+            with get_connection() as conn, conn.cursor() as cur:
+                version = self._version(cur)
+                if snapshot is not None and snapshot.version == version:
+                    self.index = snapshot
+                    return snapshot
+                rows = self._rows(cur)
+
+            index, fetched = build_index(
+                rows,
+                self.fields,
+                source_of=self.source_of,
+                fetch_vector=self.fetch_vector,
+                previous=snapshot,
+                max_workers=self.max_workers,
+            )
+            index.version = version
+            if save_snapshot(index, snapshot_dir, self.name):
+                print(f"🧬 Snapshot embeddings {self.label}: {len(index)} vecteurs ({fetched} téléchargés)")
+            self.index = index
+            return index
+
+    def refresh(self) -> int:
+        """Merge the rows changed since the index watermark; returns the number of rows merged."""
+        index = self.index
+        if index is None:
+            return 0
+        from shared.postgres import get_connection
+
+        with get_connection() as conn, conn.cursor() as cur:
+            version = self._version(cur)
+            if version == index.version:
+                return 0
+            rows = self._rows(cur, since=index)
+            live_ids = None
+            if len(index) + len(rows) > version["rows"]:
+                # Des embeddings ont pu être supprimés : on récupère la liste des ids vivants.
+                cur.execute(f"SELECT id FROM {self.table} WHERE {self.embedded}")
+                live_ids = {row["id"] for row in cur.fetchall()}
+
+        items, fetched = collect_items(
+            rows,
+            self.fields,
+            source_of=self.source_of,
+            fetch_vector=self.fetch_vector,
+            previous=index,
+            max_workers=self.max_workers,
+        )
+        with self._lock:
+            current = self.index
+            drop_ids = [] if live_ids is None else [i for i in current.ids.tolist() if i not in live_ids]
+            updated = current.upsert(items, drop_ids)
+            updated.version = version
+            self.index = updated
+        save_snapshot(updated, get_snapshot_dir(self.default_snapshot_dir), self.name)
+        print(f"🧬 Embeddings {self.label} rafraîchis: {len(items)} lignes ({fetched} téléchargées)")
+        return len(items)
+
+    def get(self) -> EmbeddingIndex:
+        """The index, loading it if needed, with a throttled background refresh."""
+        index = self.load()
+        self.refresh_throttle.trigger(self.refresh)
+        return index
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the OpenAI client (`OPENAI_FAKE=1`, benchmarks).
+
+`FakeOpenAI().chat.completions.create(...)` sleeps for a simulated
+latency and returns a response shaped like the real one, whose message
+content is a JSON object with the fields the analysis prompts ask for.
+A fraction of calls can fail with a 429 to exercise retry paths.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+class FakeRateLimitError(Exception):
+    """Mimics `openai.RateLimitError` (status_code 429)."""
+
+    status_code = 429
+
+    def __init__(self, message: str = "Rate limit reached (fake)", retry_after: Optional[float] = None):
+        super().__init__(message)
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self.owner = owner
+
+    def create(self, *, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, **kwargs):
+        return self.owner._complete(model, messages, max_tokens)
+
+
+class FakeOpenAI:
+    """Thread-safe fake client with configurable latency and 429 rate."""
+
+    def __init__(self, latency: float = 0.4, jitter: float = 0.2, rate_limit_ratio: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.calls = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _complete(self, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int]):
+        with self._lock:
+            self.calls += 1
+            limited = self._random.random() < self.rate_limit_ratio
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+            if limited:
+                self.rate_limited += 1
+        if limited:
+            raise FakeRateLimitError(retry_after=0.05)
+        time.sleep(delay)
+
+        prompt = str(messages[-1].get("content") or "") if messages else ""
+        content = json.dumps(
+            {
+                "title": prompt[:60].strip() or "Document",
+                "summary": prompt[:200].strip(),
+                "keywords": ["fake", "test"],
+                "entities": [],
+                "decision_date": None,
+                "draft_date": None,
+                "language": "fr",
+            },
+            ensure_ascii=False,
+        )
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = min(len(content) // 4, max_tokens or len(content))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
@@ -0,0 +1,58 @@
+"""
+HTTP helpers shared by the harvesters.
+
+- `build_session(pool_size)`: a keep-alive `requests.Session` whose
+  connection pool holds at most `pool_size` connections per host (extra
+  threads wait for a free connection), which is how per-host concurrency
+  is bounded.
+- `RateLimiter(rate)`: thread-safe token bucket letting at most `rate`
+  acquisitions per second through, shared by every worker of a job.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = "DocHarvester/1.0"
+
+
+def build_session(pool_size: int = 8, user_agent: str = DEFAULT_USER_AGENT) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(int(pool_size), 1), pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.setdefault("User-Agent", user_agent)
+    return session
+
+
+class RateLimiter:
+    """Token bucket: `rate` tokens per second, up to `burst` stored (`rate <= 0` disables it)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = max(float(burst) if burst is not None else self.rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available and take them; returns the time spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,220 @@
+"""
+Content-addressed cache for LLM analysis and translation results.
+
+An entry is keyed by SHA-256 of (task kind, prompt template version,
+model, SHA-256 of the input text): re-running an analysis on a text that
+did not change, or a backfill after a prompt-neutral code change, returns
+the stored completion without calling OpenAI. Bumping the template version
+of a prompt invalidates its entries.
+
+Backends (`LLM_CACHE_BACKEND`):
+- `postgres` (default): table `llm_cache` (migration
+  20251017_create_llm_cache.sql);
+- `disk`: one JSON file per key under `LLM_CACHE_DIR`;
+- `off`: no caching.
+
+Cache errors never fail a call. A configuration error (missing table or
+privilege, no database URL, unwritable directory) disables the cache for
+the process with a warning; any other error (connection timeout, network
+blip) only skips the cache for that call. The Postgres backend uses its
+own small connection pool (`LLM_CACHE_POOL_SIZE`, default 4), so the
+concurrent lookups of ChatExecutor workers wait for a cache connection
+instead of exhausting the request pool.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+
+def input_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(kind: str, version: str, model: str, text: str) -> str:
+    return hashlib.sha256(f"{kind}\0{version}\0{model}\0{input_hash(text)}".encode("utf-8")).hexdigest()
+
+
+class LLMCacheConfigurationError(RuntimeError):
+    """The cache backend cannot work in this environment; the cache is turned off."""
+
+
+class PostgresLLMCache:
+    def __init__(self, pool_size: Optional[int] = None, wait_timeout: float = 5.0):
+        self.pool_size = max(pool_size or int(os.getenv("LLM_CACHE_POOL_SIZE", "4")), 1)
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    from psycopg2.extras import RealDictCursor
+                    from psycopg2.pool import ThreadedConnectionPool
+
+                    from shared.postgres import PostgresConfigurationError, _get_dsn
+
+                    try:
+                        dsn = _get_dsn()
+                    except PostgresConfigurationError as exc:
+                        raise LLMCacheConfigurationError(str(exc)) from exc
+                    self._pool = ThreadedConnectionPool(1, self.pool_size, dsn=dsn, cursor_factory=RealDictCursor)
+        return self._pool
+
+    @contextmanager
+    def _connection(self):
+        """A cache connection; waits up to `wait_timeout` for a free one."""
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise TimeoutError("no free LLM cache connection")
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            try:
+                yield conn
+            except Exception as exc:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pool.putconn(conn, close=True)
+                    conn = None
+                # SQLSTATE class 42: undefined table/column, insufficient privilege...
+                if (getattr(exc, "pgcode", None) or "").startswith("42"):
+                    raise LLMCacheConfigurationError(str(exc)) from exc
+                raise
+            finally:
+                if conn is not None:
+                    pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT content FROM llm_cache WHERE key = %s", (key,))
+            row = cur.fetchone()
+            conn.rollback()
+        return row["content"] if row else None
+
+    def put(self, key: str, content: str, model: Optional[str] = None) -> None:
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO llm_cache (key, content, model)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (key) DO UPDATE SET content = EXCLUDED.content, model = EXCLUDED.model
+                """,
+                (key, content, model),
+            )
+            conn.commit()
+
+
+class DiskLLMCache:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("LLM_CACHE_DIR") or Path(tempfile.gettempdir()) / "llm_cache")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))["content"]
+
+    def put(self, key: str, content: str, model: Optional[str] = None) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        except (PermissionError, NotADirectoryError, FileExistsError) as exc:
+            raise LLMCacheConfigurationError(str(exc)) from exc
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"content": content, "model": model}, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+
+class LLMCache:
+    """Front for the configured backend; disables itself on configuration errors only."""
+
+    def __init__(self, backend: Optional[str] = None):
+        backend = (backend or os.getenv("LLM_CACHE_BACKEND", "postgres")).lower()
+        self.store = {"postgres": PostgresLLMCache, "disk": DiskLLMCache}.get(backend, lambda: None)()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._warned_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def _failed(self, exc: Exception) -> None:
+        if isinstance(exc, (LLMCacheConfigurationError, ImportError)):
+            if self.store is not None:
+                print(f"⚠️  Cache LLM désactivé: {exc}")
+            self.store = None
+            return
+        with self._lock:
+            self.errors += 1
+            now = time.monotonic()
+            warn = now - self._warned_at > 60
+            if warn:
+                self._warned_at = now
+        if warn:
+            print(f"⚠️  Cache LLM ignoré pour cet appel: {exc}")
+
+    def get(self, key: str) -> Optional[str]:
+        store = self.store
+        if store is None:
+            return None
+        try:
+            content = store.get(key)
+        except Exception as exc:
+            self._failed(exc)
+            return None
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def put(self, key: str, content: Optional[str], model: Optional[str] = None) -> None:
+        store = self.store
+        if store is None or content is None:
+            return
+        try:
+            store.put(key, content, model)
+        except Exception as exc:
+            self._failed(exc)
+
+    def completion(self, kind: str, version: str, model: str, text: str, call: Callable[[], str]) -> str:
+        """Cached content for this input, else `call()` (the completion content) stored under its key."""
+        key = cache_key(kind, version, model, text)
+        content = self.get(key)
+        if content is None:
+            content = call()
+            self.put(key, content, model)
+        return content
+
+
+_CACHE: Optional[LLMCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = LLMCache()
+    return _CACHE
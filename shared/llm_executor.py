@@ -0,0 +1,132 @@
+"""
+Concurrent, rate-limited executor for OpenAI chat completions.
+
+`ChatExecutor` sends `chat.completions.create` calls from a thread pool
+while respecting two token buckets shared by every worker:
+
+- requests per minute (`OPENAI_RPM`, default 500);
+- tokens per minute (`OPENAI_TPM`, default 200000), estimated before each
+  call from the prompt length (about 4 characters per token) plus
+  `max_tokens`.
+
+HTTP 429 answers are retried with exponential backoff and jitter (or the
+`Retry-After` delay when the server sends one) up to `OPENAI_MAX_RETRIES`
+times. `OPENAI_CONCURRENCY` (default 8) sets the number of in-flight calls.
+
+`openai_client()` returns `shared.fake_openai.FakeOpenAI` when
+`OPENAI_FAKE=1`, so the analysis pipelines can be exercised locally
+without an API key.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from shared.http_client import RateLimiter
+
+CHARS_PER_TOKEN = 4
+
+
+def openai_available() -> bool:
+    """True when `openai_client()` can build a client (the fake, or the `openai` package)."""
+    return os.getenv("OPENAI_FAKE") == "1" or importlib.util.find_spec("openai") is not None
+
+
+def openai_client(api_key: Optional[str] = None):
+    """OpenAI client, or the local fake when `OPENAI_FAKE=1`."""
+    if os.getenv("OPENAI_FAKE") == "1":
+        from shared.fake_openai import FakeOpenAI
+
+        return FakeOpenAI()
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """Rough upper bound of the tokens a call will consume (prompt + completion)."""
+    chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return chars // CHARS_PER_TOKEN + len(messages) * 4 + (max_tokens or 0)
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ChatExecutor:
+    """Thread-pool executor for chat completions under RPM/TPM budgets."""
+
+    def __init__(
+        self,
+        client,
+        concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.client = client
+        self.concurrency = max(int(os.getenv("OPENAI_CONCURRENCY", "8")) if concurrency is None else concurrency, 1)
+        rpm = float(os.getenv("OPENAI_RPM", "500")) if requests_per_minute is None else requests_per_minute
+        tpm = float(os.getenv("OPENAI_TPM", "200000")) if tokens_per_minute is None else tokens_per_minute
+        self.requests = RateLimiter(rpm / 60.0, burst=max(rpm / 60.0, 1.0) * 2)
+        self.tokens = RateLimiter(tpm / 60.0, burst=tpm / 6.0)
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "5")) if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"calls": 0, "retries": 0, "tokens_estimated": 0, "throttled_seconds": 0.0}
+
+    def complete(self, **kwargs):
+        """`client.chat.completions.create(**kwargs)` within the budgets, retried on 429."""
+        estimate = estimate_tokens(kwargs.get("messages") or [], kwargs.get("max_tokens"))
+        # Un appel plus gros que le seau entier passerait sinon indéfiniment en attente.
+        estimate = min(estimate, self.tokens.capacity) if self.tokens.rate > 0 else estimate
+        attempt = 0
+        while True:
+            waited = self.requests.acquire() + self.tokens.acquire(estimate)
+            self.stats["throttled_seconds"] += waited
+            self.stats["calls"] += 1
+            self.stats["tokens_estimated"] += estimate
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except Exception as exc:
+                if _status_code(exc) != 429 or attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = min(self.backoff_base * 2 ** attempt, self.backoff_max) * (0.5 + random.random())
+                attempt += 1
+                self.stats["retries"] += 1
+                time.sleep(delay)
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+        """
+        Run `fn(item)` for every item on the pool (`fn` typically calls
+        `self.complete`) and yield `(item, result, error)` as they finish.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(fn, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as exc:
+                    yield item, None, exc
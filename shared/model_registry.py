@@ -0,0 +1,113 @@
+"""
+Process-wide registry of SentenceTransformer models.
+
+Every module asks `get_model()` for its embedding model instead of keeping
+its own lazy global, so a model is loaded exactly once per process however
+many blueprints, batch endpoints or scripts use it.
+
+Configuration:
+- `EMBEDDING_MODEL_NAME`: default model (`all-MiniLM-L6-v2`, the model the
+  R2 embeddings were computed with);
+- `EMBED_MODEL_BACKEND`: `torch` (default), `onnx`, or `onnx-int8` for a
+  quantized ONNX export on CPU (`EMBED_ONNX_FILE` selects the file inside
+  the model repository). ONNX needs sentence-transformers >= 3.2 with the
+  `onnx` extra; on failure the model falls back to torch.
+
+Load time and resident-memory growth of each model are printed and kept
+in `model_stats()`; `warm_up()` loads and runs the models at app start.
+"""
+
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+_MODELS: Dict[Tuple[str, str], Any] = {}
+_STATS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+
+
+def model_backend() -> str:
+    backend = (os.getenv("EMBED_MODEL_BACKEND") or "torch").strip().lower()
+    return backend if backend in ("torch", "onnx", "onnx-int8") else "torch"
+
+
+def _rss_mb() -> float:
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    # Pas de /proc (macOS) : pic de RSS, en octets.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+def _load(name: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(name), backend
+    kwargs: Dict[str, Any] = {"backend": "onnx"}
+    if backend == "onnx-int8":
+        kwargs["model_kwargs"] = {"file_name": os.getenv("EMBED_ONNX_FILE", DEFAULT_ONNX_INT8_FILE)}
+    try:
+        return SentenceTransformer(name, **kwargs), backend
+    except Exception as exc:
+        print(f"⚠️ Backend {backend} indisponible pour {name} ({exc}), repli sur torch")
+        return SentenceTransformer(name), "torch"
+
+
+def get_model(name: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Shared SentenceTransformer instance for `name` (default model when
+    omitted), loaded on first use. Returns None when sentence-transformers
+    is not installed.
+    """
+    name = name or DEFAULT_MODEL
+    backend = backend or model_backend()
+    key = (name, backend)
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+    with _LOCK:
+        model = _MODELS.get(key)
+        if model is not None:
+            return model
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        try:
+            model, used = _load(name, backend)
+        except ImportError as exc:
+            print(f"⚠️ sentence-transformers indisponible: {exc}")
+            return None
+        elapsed = time.perf_counter() - start
+        rss_delta = max(_rss_mb() - rss_before, 0.0)
+        _STATS[name] = {
+            "backend": used,
+            "load_seconds": round(elapsed, 2),
+            "rss_delta_mb": round(rss_delta, 1),
+        }
+        print(f"🧠 Modèle {name} ({used}) chargé en {elapsed:.1f}s, +{rss_delta:.0f} Mo de RSS")
+        _MODELS[key] = model
+        return model
+
+
+def warm_up(names: Iterable[Optional[str]] = (None,)) -> Dict[str, Dict[str, Any]]:
+    """Load the given models and run one encode so the first request pays nothing."""
+    for name in names:
+        model = get_model(name)
+        if model is not None:
+            model.encode(["warm-up"], convert_to_numpy=True)
+    return model_stats()
+
+
+def model_stats() -> Dict[str, Dict[str, Any]]:
+    """Load time and RSS growth of each loaded model."""
+    return {name: dict(stats) for name, stats in _STATS.items()}
@@ -0,0 +1,410 @@
+"""
+OpenAI Batch API mode for bulk analysis / translation backfills.
+
+Instead of one chat completion per document, pending items are written to
+JSONL request files (`/v1/chat/completions`, one line per `custom_id`),
+submitted as batches, polled, and their results ingested in bulk.
+
+- A corpus registers a kind with `register_batch_kind(kind, build, ingest)`:
+  `build(limit, exclude)` yields request lines (see `batch_request`) for the
+  pending items whose `custom_id` is not in `exclude`; `ingest(results)`
+  stores a list of `BatchResult` and returns counters.
+- `submit(kind, client)` writes the files (split under the API limits),
+  uploads them and records every batch in `openai_batches` (migration
+  20251017_create_openai_batches.sql).
+- `collect(client)` polls the open batches, ingests the finished ones and
+  marks them ingested. Items of an open batch are never resubmitted and
+  ingestion only rewrites the same values, so both steps can be re-run
+  after an interruption.
+- Lines built with a `cache_key` are first looked up in the LLM cache
+  (shared/llm_cache.py): hits are ingested at submit time without being
+  sent, and collected results are stored under their key.
+
+The client is pluggable: `OpenAIBatchClient` wraps the OpenAI SDK and
+`LocalBatchClient` is a file-based stand-in that answers with
+`shared.fake_openai.FakeOpenAI` (no network, no API key).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from psycopg2.extras import Json
+
+from shared.llm_cache import get_llm_cache
+from shared.postgres import get_connection
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Limites de l'API : 50 000 requêtes et 200 Mo par fichier d'entrée.
+MAX_REQUESTS_PER_FILE = 50_000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+
+_KINDS: Dict[str, "BatchKind"] = {}
+
+
+@dataclass
+class BatchKind:
+    build: Callable[[Optional[int], set], Iterable[Dict[str, Any]]]
+    ingest: Callable[[List["BatchResult"]], Dict[str, int]]
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    content: Optional[str]
+    error: Optional[str] = None
+
+
+def register_batch_kind(kind: str, build, ingest) -> None:
+    _KINDS[kind] = BatchKind(build, ingest)
+
+
+def batch_kinds() -> List[str]:
+    return sorted(_KINDS)
+
+
+def custom_id(kind: str, *parts: Any) -> str:
+    return ":".join([kind, *(str(part) for part in parts)])
+
+
+def parse_custom_id(value: str) -> List[str]:
+    return value.split(":")[1:]
+
+
+def batch_request(custom_id: str, cache_key: Optional[str] = None, **body: Any) -> Dict[str, Any]:
+    """One JSONL line; `body` holds the `chat.completions.create` arguments."""
+    request = {"custom_id": custom_id, "method": "POST", "url": CHAT_ENDPOINT, "body": body}
+    if cache_key:
+        request["cache_key"] = cache_key
+    return request
+
+
+def workdir() -> Path:
+    path = Path(os.getenv("OPENAI_BATCH_DIR") or Path(tempfile.gettempdir()) / "openai_batches")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_batch_files(
+    kind: str,
+    requests: Iterable[Dict[str, Any]],
+    directory: Optional[Path] = None,
+    max_requests: int = MAX_REQUESTS_PER_FILE,
+    max_bytes: int = MAX_BYTES_PER_FILE,
+) -> List[tuple]:
+    """Write the requests as JSONL files within the API limits; returns `[(path, custom_ids, cache_keys)]`."""
+    directory = directory or workdir()
+    files: List[tuple] = []
+    handle = None
+    size = 0
+    ids: List[str] = []
+    keys: Dict[str, str] = {}
+    try:
+        for request in requests:
+            key = request.pop("cache_key", None)
+            line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+            if handle is None or len(ids) >= max_requests or size + len(line) > max_bytes:
+                if handle is not None:
+                    handle.close()
+                path = directory / f"{kind}-{uuid.uuid4().hex[:12]}.jsonl"
+                handle = path.open("wb")
+                ids, keys = [], {}
+                files.append((path, ids, keys))
+                size = 0
+            handle.write(line)
+            size += len(line)
+            ids.append(request["custom_id"])
+            if key:
+                keys[request["custom_id"]] = key
+    finally:
+        if handle is not None:
+            handle.close()
+    return files
+
+
+def parse_output(text: str) -> Iterator[BatchResult]:
+    """Results of an output or error file (one JSON object per line)."""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        response = row.get("response") or {}
+        body = response.get("body") or {}
+        error = row.get("error")
+        if error or response.get("status_code") != 200:
+            message = (error or {}).get("message") or (body.get("error") or {}).get("message")
+            yield BatchResult(row["custom_id"], None, message or f"HTTP {response.get('status_code')}")
+            continue
+        try:
+            content = body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            yield BatchResult(row["custom_id"], None, "Réponse sans contenu")
+            continue
+        yield BatchResult(row["custom_id"], content)
+
+
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    if isinstance(obj, dict):
+        return obj
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return dict(vars(obj))
+
+
+class OpenAIBatchClient:
+    """Batch API through the OpenAI SDK (files + batches endpoints)."""
+
+    provider = "openai"
+
+    def __init__(self, client=None):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+
+    def submit(self, path: Path, metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        with open(path, "rb") as handle:
+            uploaded = self.client.files.create(file=handle, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window="24h",
+            metadata=metadata or {},
+        )
+        return _as_dict(batch)
+
+    def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        return _as_dict(self.client.batches.retrieve(batch_id))
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchClient:
+    """
+    File-based stand-in for the Batch API: submitted files are copied to
+    `directory` and answered on the first `retrieve` by a chat client
+    (FakeOpenAI by default), producing output / error files in the same
+    format as the real API.
+    """
+
+    provider = "local"
+
+    def __init__(self, directory: Optional[Path] = None, chat_client=None):
+        self.directory = Path(directory or workdir() / "local")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if chat_client is None:
+            from shared.fake_openai import FakeOpenAI
+
+            chat_client = FakeOpenAI(latency=0.0, jitter=0.0)
+        self.chat_client = chat_client
+
+    def _file(self, file_id: str) -> Path:
+        return self.directory / f"{file_id}.jsonl"
+
+    def _batch_path(self, batch_id: str) -> Path:
+        return self.directory / f"{batch_id}.json"
+
+    def submit(self, path: Path, metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        input_file_id = f"file-{uuid.uuid4().hex}"
+        self._file(input_file_id).write_bytes(Path(path).read_bytes())
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "status": "in_progress",
+            "input_file_id": input_file_id,
+            "output_file_id": None,
+            "error_file_id": None,
+            "metadata": metadata or {},
+        }
+        self._batch_path(batch["id"]).write_text(json.dumps(batch))
+        return batch
+
+    def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        batch = json.loads(self._batch_path(batch_id).read_text())
+        if batch["status"] == "in_progress":
+            batch = self._run(batch)
+        return batch
+
+    def download(self, file_id: str) -> str:
+        return self._file(file_id).read_text(encoding="utf-8")
+
+    def _run(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        outputs, errors = [], []
+        for line in self.download(batch["input_file_id"]).splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            row = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "error": None}
+            try:
+                response = self.chat_client.chat.completions.create(**request["body"])
+                message = response.choices[0].message
+                row["response"] = {
+                    "status_code": 200,
+                    "body": {
+                        "model": getattr(response, "model", request["body"].get("model")),
+                        "choices": [{"index": 0, "message": {"role": message.role, "content": message.content}}],
+                    },
+                }
+                outputs.append(row)
+            except Exception as exc:
+                row["response"] = {"status_code": getattr(exc, "status_code", None) or 500, "body": {}}
+                row["error"] = {"code": type(exc).__name__, "message": str(exc)}
+                errors.append(row)
+
+        for key, rows in (("output_file_id", outputs), ("error_file_id", errors)):
+            if rows:
+                file_id = f"file-{uuid.uuid4().hex}"
+                self._file(file_id).write_text(
+                    "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows), encoding="utf-8"
+                )
+                batch[key] = file_id
+        batch["status"] = "completed"
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        self._batch_path(batch["id"]).write_text(json.dumps(batch))
+        return batch
+
+
+def batch_client(local: bool = False):
+    """Local stand-in when `local` or `OPENAI_FAKE=1`, else the OpenAI SDK."""
+    if local or os.getenv("OPENAI_FAKE") == "1":
+        return LocalBatchClient()
+    return OpenAIBatchClient()
+
+
+def open_custom_ids(kind: str) -> set:
+    """custom_ids of the batches of `kind` whose results are not ingested yet."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT unnest(custom_ids) AS custom_id FROM openai_batches WHERE kind = %s AND ingested_at IS NULL",
+            (kind,),
+        )
+        return {row["custom_id"] for row in cur.fetchall()}
+
+
+def _without_cached(requests: Iterable[Dict[str, Any]], hits: List[BatchResult]) -> Iterator[Dict[str, Any]]:
+    cache = get_llm_cache()
+    for request in requests:
+        content = cache.get(request["cache_key"]) if request.get("cache_key") else None
+        if content is None:
+            yield request
+        else:
+            hits.append(BatchResult(request["custom_id"], content))
+
+
+def submit(kind: str, client, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Build, upload and record the batches for the pending items of `kind`."""
+    handler = _KINDS[kind]
+    hits: List[BatchResult] = []
+    files = write_batch_files(kind, _without_cached(handler.build(limit, open_custom_ids(kind)), hits))
+    submitted = []
+    if hits:
+        counters = handler.ingest(hits)
+        submitted.append({"id": "llm_cache", "kind": kind, "requests": 0, "cached": len(hits), **counters})
+    for path, ids, keys in files:
+        batch = client.submit(path, metadata={"kind": kind})
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO openai_batches (id, kind, provider, status, input_file_id, custom_ids, request_count, cache_keys)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO NOTHING
+                """,
+                (batch["id"], kind, client.provider, batch.get("status") or "validating",
+                 batch.get("input_file_id"), ids, len(ids), Json(keys)),
+            )
+            conn.commit()
+        path.unlink(missing_ok=True)
+        submitted.append({"id": batch["id"], "kind": kind, "requests": len(ids)})
+    return submitted
+
+
+def list_batches(kind: Optional[str] = None, only_open: bool = False) -> List[Dict[str, Any]]:
+    clauses, params = [], []
+    if kind:
+        clauses.append("kind = %s")
+        params.append(kind)
+    if only_open:
+        clauses.append("ingested_at IS NULL")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, kind, provider, status, request_count, succeeded, failed, error,
+                   created_at, completed_at, ingested_at
+            FROM openai_batches {where}
+            ORDER BY created_at
+            """,
+            params,
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
+def _cache_results(batch_id: str, results: List[BatchResult]) -> None:
+    cache = get_llm_cache()
+    if not cache.enabled:
+        return
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT cache_keys FROM openai_batches WHERE id = %s", (batch_id,))
+        row = cur.fetchone()
+    keys = (row or {}).get("cache_keys") or {}
+    for result in results:
+        if result.error is None and result.custom_id in keys:
+            cache.put(keys[result.custom_id], result.content)
+
+
+def collect(client, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Poll the open batches and ingest the finished ones."""
+    report = []
+    for row in list_batches(kind, only_open=True):
+        if row["provider"] != client.provider:
+            continue
+        batch = client.retrieve(row["id"])
+        status = batch.get("status")
+        entry = {"id": row["id"], "kind": row["kind"], "status": status}
+
+        if status not in TERMINAL_STATUSES:
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute("UPDATE openai_batches SET status = %s WHERE id = %s", (status, row["id"]))
+                conn.commit()
+            report.append(entry)
+            continue
+
+        results: List[BatchResult] = []
+        for key in ("output_file_id", "error_file_id"):
+            if batch.get(key):
+                results.extend(parse_output(client.download(batch[key])))
+        counters = _KINDS[row["kind"]].ingest(results) if results else {}
+        _cache_results(row["id"], results)
+        succeeded = sum(1 for result in results if result.error is None)
+        errors = batch.get("errors") or {}
+        error = "; ".join(item.get("message", "") for item in (errors.get("data") or [])) if isinstance(errors, dict) else None
+
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE openai_batches
+                SET status = %s,
+                    output_file_id = %s,
+                    error_file_id = %s,
+                    succeeded = %s,
+                    failed = %s,
+                    error = %s,
+                    completed_at = timezone('utc', now()),
+                    ingested_at = timezone('utc', now())
+                WHERE id = %s
+                """,
+                (status, batch.get("output_file_id"), batch.get("error_file_id"), succeeded,
+                 len(results) - succeeded, error or None, row["id"]),
+            )
+            conn.commit()
+        entry.update(succeeded=succeeded, failed=len(results) - succeeded, **counters)
+        report.append(entry)
+    return report
@@ -0,0 +1,175 @@
+"""
+Optional pgvector storage for document embeddings.
+
+With `EMBED_STORAGE=pgvector`, vectors are stored in a `vector(384)`
+column (`embedding`) of `supreme_court_decisions` / `joradp_documents`
+with an HNSW cosine index (see migration/20251017_add_pgvector_embeddings.sql),
+and semantic endpoints rank rows in SQL with
+`ORDER BY embedding <=> %s::vector LIMIT k` instead of loading the corpus
+into each web worker. `nearest` sizes `hnsw.ef_search` to the limit and
+switches to iterative or exact scans when filters would otherwise starve
+the HNSW candidate list.
+
+Vectors are passed as pgvector text literals (`[0.1,0.2,...]`), so no
+type adapter has to be registered on the pooled connections.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from shared.embedding_index import collect_items, normalize_vector
+
+EMBEDDING_COLUMN = "embedding"
+# pgvector defaults / bounds for `hnsw.ef_search`.
+HNSW_DEFAULT_EF_SEARCH = 40
+HNSW_MAX_EF_SEARCH = 1000
+# Candidates examined per requested row (recall headroom over `limit`).
+HNSW_EF_SEARCH_FACTOR = 2
+
+_PGVECTOR_VERSION: Optional[tuple] = None
+
+
+def pgvector_enabled() -> bool:
+    """True when `EMBED_STORAGE=pgvector`."""
+    return (os.getenv("EMBED_STORAGE") or "r2").strip().lower() == "pgvector"
+
+
+def to_vector_literal(vec: Any) -> Optional[str]:
+    """Normalized pgvector literal for `vec`, or None when it is empty/null."""
+    arr = normalize_vector(vec)
+    if arr is None:
+        return None
+    return "[" + ",".join(f"{x:.7g}" for x in arr.tolist()) + "]"
+
+
+def write_vectors(cur, table: str, pairs: Iterable[tuple], page_size: int = 500) -> int:
+    """
+    Store `(id, vector)` pairs in `<table>.embedding` with one
+    `UPDATE ... FROM (VALUES ...)` per page. Returns the number of rows sent.
+    """
+    values = []
+    for doc_id, vec in pairs:
+        literal = to_vector_literal(vec)
+        if literal is not None:
+            values.append((doc_id, literal))
+    if not values:
+        return 0
+    execute_values(
+        cur,
+        f"""
+        UPDATE {table} AS t
+        SET {EMBEDDING_COLUMN} = v.embedding::vector
+        FROM (VALUES %s) AS v(id, embedding)
+        WHERE t.id = v.id
+        """,
+        values,
+        page_size=page_size,
+    )
+    return len(values)
+
+
+def _pgvector_version(cur) -> tuple:
+    global _PGVECTOR_VERSION
+    if _PGVECTOR_VERSION is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        version = row["extversion"] if row else "0"
+        _PGVECTOR_VERSION = tuple(int(part) for part in version.split(".") if part.isdigit())
+    return _PGVECTOR_VERSION
+
+
+def _plan_search(cur, limit: int, filtered: bool) -> str:
+    """
+    Session settings for one ranking query (transaction-local); returns the
+    strategy used: `hnsw`, `hnsw_iterative` or `exact`.
+
+    An HNSW scan yields at most `hnsw.ef_search` candidates (pgvector
+    default 40) and applies WHERE filters after the fact, so:
+    - `ef_search` is raised to at least `HNSW_EF_SEARCH_FACTOR * limit`;
+    - with filters, pgvector >= 0.8 keeps scanning the graph until `limit`
+      rows pass them (`hnsw.iterative_scan`), older versions rank exactly;
+    - limits above the HNSW ceiling (`ef_search` <= 1000) rank exactly.
+    """
+    if limit > HNSW_MAX_EF_SEARCH or (filtered and _pgvector_version(cur) < (0, 8)):
+        cur.execute("SELECT set_config('enable_indexscan', 'off', true)")
+        return "exact"
+    ef_search = max(limit * HNSW_EF_SEARCH_FACTOR, int(os.getenv("PGVECTOR_EF_SEARCH") or HNSW_DEFAULT_EF_SEARCH))
+    cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(min(ef_search, HNSW_MAX_EF_SEARCH)),))
+    if filtered:
+        cur.execute("SELECT set_config('hnsw.iterative_scan', 'strict_order', true)")
+        return "hnsw_iterative"
+    return "hnsw"
+
+
+def nearest(
+    cur,
+    table: str,
+    columns: Sequence[str],
+    query_vec: np.ndarray,
+    limit: int,
+    where: Sequence[str] = (),
+    params: Sequence[Any] = (),
+) -> List[Dict[str, Any]]:
+    """
+    The `limit` rows of `table` closest to `query_vec` (cosine), best
+    first, each with a `score` column (cosine similarity). `where`/`params`
+    are extra SQL filters evaluated in the same query. Run inside a
+    transaction: the search settings are local to it.
+    """
+    if limit is None or int(limit) <= 0:
+        raise ValueError("nearest() requires a positive limit")
+    literal = to_vector_literal(query_vec)
+    if literal is None:
+        return []
+    _plan_search(cur, int(limit), bool(where))
+    conditions = [f"{EMBEDDING_COLUMN} IS NOT NULL", *where]
+    cur.execute(
+        f"""
+        SELECT {', '.join(columns)},
+               1 - ({EMBEDDING_COLUMN} <=> %s::vector) AS score
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {EMBEDDING_COLUMN} <=> %s::vector
+        LIMIT %s
+        """,
+        (literal, *params, literal, int(limit)),
+    )
+    return [dict(row) for row in cur.fetchall()]
+
+
+def count_embedded(cur, table: str) -> int:
+    cur.execute(f"SELECT COUNT(*) AS total FROM {table} WHERE {EMBEDDING_COLUMN} IS NOT NULL")
+    return int(cur.fetchone()["total"])
+
+
+def backfill(
+    conn,
+    table: str,
+    rows: Sequence[Dict[str, Any]],
+    source_of: Callable[[Dict[str, Any]], Optional[str]],
+    fetch_vector: Callable[[str], Optional[np.ndarray]],
+    batch_size: int = 500,
+    max_workers: int = 12,
+) -> Dict[str, int]:
+    """
+    Copy R2 embeddings into `<table>.embedding`, `batch_size` rows at a time.
+    Vectors are downloaded concurrently with the same workers as the
+    in-memory index (`collect_items`); each batch is committed on its own
+    so an interrupted backfill can be resumed.
+    """
+    stats = {"rows": len(rows), "written": 0, "missing": 0}
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        items, _ = collect_items(batch, (), source_of, fetch_vector, max_workers=max_workers)
+        with conn.cursor() as cur:
+            written = write_vectors(cur, table, ((item["id"], item["vector"]) for item in items))
+        conn.commit()
+        stats["written"] += written
+        stats["missing"] += len(batch) - written
+        print(f"   {min(start + batch_size, len(rows))}/{len(rows)} lignes traitées ({stats['written']} vecteurs)")
+    return stats
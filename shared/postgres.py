@@ -22,7 +22,7 @@ class PostgresConfigurationError(RuntimeError):
     """Raised when PostgreSQL configuration is missing or invalid."""
 
 
-_POOL: Optional[pool.SimpleConnectionPool] = None
+_POOL: Optional[pool.ThreadedConnectionPool] = None
 
 
 def _get_dsn() -> str:
@@ -45,14 +45,15 @@ def _get_dsn() -> str:
     return dsn
 
 
-def get_pool(minconn: int = 1, maxconn: int = 10) -> pool.SimpleConnectionPool:
+def get_pool(minconn: int = 1, maxconn: int = 10) -> pool.ThreadedConnectionPool:
     """
     Get or create the global connection pool.
-    The pool is lazily initialized on first access.
+    The pool is lazily initialized on first access and is safe to share
+    between threads (request threads, harvester workers).
     """
     global _POOL
     if _POOL is None:
-        _POOL = psycopg2.pool.SimpleConnectionPool(
+        _POOL = psycopg2.pool.ThreadedConnectionPool(
             minconn,
             maxconn,
             dsn=_get_dsn(),
@@ -0,0 +1,128 @@
+"""
+Query embedding front-end shared by the semantic search endpoints.
+
+- An LRU cache keyed by (model name, normalized query text) returns the
+  unit vector of queries that were already encoded, so repeated legal
+  queries skip the SentenceTransformer forward pass entirely.
+- Cache misses go through a micro-batcher: queries arriving within
+  `QUERY_BATCH_WINDOW_MS` of each other (default 5 ms, up to
+  `QUERY_BATCH_MAX`) are encoded with a single `model.encode([...])` call
+  on a background thread, and identical in-flight queries share one slot.
+
+`QUERY_CACHE_SIZE` sets the number of cached vectors (default 1024,
+0 disables the cache).
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.embedding_index import normalize_vector
+
+
+def normalize_query(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+class QueryEncoder:
+    """Cached, micro-batched `encode(query) -> unit vector` for one model."""
+
+    def __init__(
+        self,
+        model_loader: Callable[[], Any],
+        model_name: str,
+        cache_size: Optional[int] = None,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+    ):
+        self.model_loader = model_loader
+        self.model_name = model_name
+        self.cache_size = int(os.getenv("QUERY_CACHE_SIZE", "1024")) if cache_size is None else cache_size
+        window_ms = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5")) if window_ms is None else window_ms
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch = int(os.getenv("QUERY_BATCH_MAX", "32")) if max_batch is None else max_batch
+        self.stats = {"hits": 0, "misses": 0, "batches": 0, "encoded": 0}
+        self._cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[Tuple[str, str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def encode(self, text: str, timeout: float = 60.0) -> Optional[np.ndarray]:
+        """Normalized float32 vector of `text` (read-only), or None if the model returns nothing usable."""
+        key = (self.model_name, normalize_query(text))
+        with self._lock:
+            vec = self._cache.get(key)
+            if vec is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return vec
+            self.stats["misses"] += 1
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._queue.put((key, future))
+                self._ensure_worker()
+        return future.result(timeout=timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=f"query-encoder-{self.model_name}", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> List[Tuple[Tuple[str, str], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                model = self.model_loader()
+                if model is None:
+                    raise RuntimeError("Modèle d'embedding indisponible")
+                raw = model.encode([key[1] for key, _ in batch], convert_to_numpy=True)
+                vectors = [normalize_vector(row) for row in raw]
+            except Exception as exc:
+                with self._lock:
+                    for key, future in batch:
+                        self._inflight.pop(key, None)
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["encoded"] += len(batch)
+                for (key, _), vec in zip(batch, vectors):
+                    self._inflight.pop(key, None)
+                    if vec is None:
+                        continue
+                    vec.setflags(write=False)
+                    if self.cache_size > 0:
+                        self._cache[key] = vec
+                        self._cache.move_to_end(key)
+                while len(self._cache) > max(self.cache_size, 0):
+                    self._cache.popitem(last=False)
+            for (_, future), vec in zip(batch, vectors):
+                future.set_result(vec)
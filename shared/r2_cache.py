@@ -0,0 +1,220 @@
+"""
+Read-through disk cache for R2 objects, shared by every process of a host.
+
+Layout under `R2_CACHE_DIR` (default: `<tmp>/r2_cache`):
+- `blobs/ab/<sha256 of the body>`: object bodies, content-addressed, so
+  identical objects (e.g. the default and AR copies of a decision) are
+  stored once;
+- `index/ab/<sha256 of the key>`: `etag`, body hash, size and the time
+  the entry was last validated against the bucket.
+
+Entries validated less than `R2_CACHE_TTL` seconds ago (default 3600) are
+served without any request; older ones are revalidated with a conditional
+GET (`If-None-Match`), a 304 refreshing them without a download. Objects
+written through `shared.r2_storage` invalidate their entry on this host.
+
+The blobs are bounded by `R2_CACHE_MAX_MB` (default 2048, `0` disables
+the cache) and evicted least-recently-used first (a hit touches the blob
+mtime). Files are written to a temporary name then renamed, so concurrent
+readers and writers never see a partial body, and eviction is serialized
+across processes with a lock file. The total size of the blobs is kept in
+`.size`, updated under a file lock by every process writing to the
+directory, and resynchronized with the real size by each eviction.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is only serialized within a process
+    fcntl = None
+
+# Bodies above this fraction of the budget are not cached.
+MAX_OBJECT_FRACTION = 0.1
+# A hit refreshes the blob mtime at most this often (seconds).
+TOUCH_INTERVAL = 60
+
+
+class CachedObject(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    fresh: bool
+
+
+def _digest(value: bytes) -> str:
+    return hashlib.sha256(value).hexdigest()
+
+
+class R2DiskCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.directory = Path(directory or os.getenv("R2_CACHE_DIR") or Path(tempfile.gettempdir()) / "r2_cache")
+        self.max_bytes = int(os.getenv("R2_CACHE_MAX_MB", "2048")) * 1024 * 1024 if max_bytes is None else max_bytes
+        self.ttl = float(os.getenv("R2_CACHE_TTL", "3600")) if ttl is None else ttl
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def _index_path(self, key: str) -> Path:
+        digest = _digest(key.encode("utf-8"))
+        return self.directory / "index" / digest[:2] / digest
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _write_index(self, key: str, etag: Optional[str], digest: str, size: int, validated_at: float) -> None:
+        self._write(self._index_path(key), f"{etag or ''}\n{digest}\n{size}\n{validated_at}".encode("utf-8"))
+
+    def lookup(self, key: str) -> Optional[CachedObject]:
+        """Cached body of `key` (with its ETag and whether it is within the TTL), None on a miss."""
+        try:
+            etag, digest, _size, validated_at = self._index_path(key).read_text(encoding="utf-8").split("\n")
+            blob = self._blob_path(digest)
+            body = blob.read_bytes()
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        if _digest(body) != digest:
+            self.invalidate(key)
+            self._count("misses")
+            return None
+        if time.time() - os.stat(blob).st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(blob)
+            except OSError:
+                pass
+        fresh = time.time() - float(validated_at) < self.ttl
+        self._count("hits" if fresh else "stale")
+        return CachedObject(body, etag or None, fresh)
+
+    def revalidated(self, key: str, cached: CachedObject) -> None:
+        """The bucket answered 304 for `cached`: restart its TTL."""
+        self._count("revalidated")
+        try:
+            self._write_index(key, cached.etag, _digest(cached.body), len(cached.body), time.time())
+        except OSError:
+            pass
+
+    def store(self, key: str, body: bytes, etag: Optional[str]) -> None:
+        if len(body) > self.max_bytes * MAX_OBJECT_FRACTION:
+            return
+        digest = _digest(body)
+        blob = self._blob_path(digest)
+        try:
+            added = 0
+            if not blob.exists():
+                self._write(blob, body)
+                added = len(body)
+            self._write_index(key, etag, digest, len(body), time.time())
+        except OSError:
+            return
+        self._count("stored")
+        if added and self._grow(added) > self.max_bytes:
+            self.evict()
+
+    def invalidate(self, key: str) -> None:
+        try:
+            self._index_path(key).unlink()
+        except OSError:
+            pass
+
+    def _scan_size(self) -> int:
+        return sum(size for _path, size, _mtime in self._blobs())
+
+    def _update_size(self, update) -> int:
+        """Apply `update(current) -> new` to the shared size counter and return the new total."""
+        with self._lock:
+            if fcntl is None:  # compteur propre au processus
+                if self._size is None:
+                    self._size = self._scan_size()
+                self._size = update(self._size)
+                return self._size
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / ".size", "a+") as size_file:
+                fcntl.flock(size_file, fcntl.LOCK_EX)
+                size_file.seek(0)
+                try:
+                    current = int(size_file.read().strip())
+                except ValueError:
+                    current = self._scan_size()
+                total = max(0, update(current))
+                size_file.seek(0)
+                size_file.truncate()
+                size_file.write(str(total))
+                size_file.flush()
+            self._size = total
+            return total
+
+    def _grow(self, added: int) -> int:
+        return self._update_size(lambda current: current + added)
+
+    def _blobs(self):
+        root = self.directory / "blobs"
+        if not root.is_dir():
+            return
+        for bucket in os.scandir(root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self, target_ratio: float = 0.9) -> None:
+        """Delete least-recently-used blobs until the cache is under `target_ratio` of its budget."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".evict.lock", "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return  # another process is already evicting
+            counted = self._grow(0)
+            blobs = sorted(self._blobs(), key=lambda blob: blob[2])
+            total = sum(size for _path, size, _mtime in blobs)
+            evicted = 0
+            for path, size, _mtime in blobs:
+                if total <= self.max_bytes * target_ratio:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            # Taille réelle, plus ce que les autres processus ont ajouté pendant le parcours.
+            self._update_size(lambda current: total + current - counted)
+        # Index entries of evicted blobs are dropped on their next lookup.
+        self._count("evicted", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["bytes"] = self._size or 0
+        return stats
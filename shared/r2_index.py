@@ -0,0 +1,200 @@
+"""
+Batched existence checks for R2 objects.
+
+`exists_many(paths)` answers for a whole batch at once instead of one
+presign + HEAD per path. Modes (`R2_EXISTS_MODE`):
+
+- `index` (default): keys are looked up in the `r2_objects` table
+  (migration 20251017_create_r2_objects.sql) with one query. The table
+  mirrors the bucket listing: `sync_prefix()` pages through
+  `list_objects_v2`, upserts every key and drops the keys that were not
+  listed (run periodically by BB/scripts/sync_r2_index.py). Uploads and
+  deletes made through `shared.r2_storage` update the table immediately
+  (`record_key`). Keys absent
+  from the index, e.g. uploaded since the last sync, are confirmed with
+  HEAD requests in parallel, and the ones found are added to the index.
+  Set `R2_INDEX_CONFIRM_MISSES=0` to trust the index alone.
+- `db`: trust the database columns. A recorded path counts as present.
+- `head`: the previous behaviour, one HEAD per path, in parallel.
+
+If the index table cannot be queried, the lookup falls back to `head`
+with a warning.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+from shared.r2_storage import get_bucket_name, get_r2_client, get_r2_reader, normalize_key
+
+SYNC_PAGE_SIZE = 1000
+
+
+def sync_prefix(prefix: str) -> int:
+    """Mirror the listing of `prefix` into `r2_objects`; returns the number of keys listed."""
+    from psycopg2.extras import execute_values
+
+    from shared.postgres import get_connection
+
+    prefix = normalize_key(prefix) or ""
+    paginator = get_r2_client().get_paginator("list_objects_v2")
+    listed = 0
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT timezone('utc', now()) AS started_at")
+        started_at = cur.fetchone()["started_at"]
+        pages = paginator.paginate(
+            Bucket=get_bucket_name(),
+            Prefix=prefix,
+            PaginationConfig={"PageSize": SYNC_PAGE_SIZE},
+        )
+        for page in pages:
+            rows = [
+                (obj["Key"], obj.get("Size"), (obj.get("ETag") or "").strip('"') or None, obj.get("LastModified"))
+                for obj in page.get("Contents", [])
+            ]
+            if not rows:
+                continue
+            execute_values(
+                cur,
+                """
+                INSERT INTO r2_objects (key, size, etag, last_modified)
+                VALUES %s
+                ON CONFLICT (key) DO UPDATE SET
+                    size = EXCLUDED.size,
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    synced_at = timezone('utc', now())
+                """,
+                rows,
+            )
+            listed += len(rows)
+            conn.commit()
+        cur.execute(
+            "DELETE FROM r2_objects WHERE key LIKE %s AND synced_at < %s",
+            (prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%", started_at),
+        )
+        cur.execute(
+            """
+            INSERT INTO r2_index_syncs (prefix, object_count, synced_at)
+            VALUES (%s, %s, timezone('utc', now()))
+            ON CONFLICT (prefix) DO UPDATE SET
+                object_count = EXCLUDED.object_count,
+                synced_at = EXCLUDED.synced_at
+            """,
+            (prefix, listed),
+        )
+        conn.commit()
+    return listed
+
+
+_RECORD_WARNED = False
+
+
+def record_key(key: str, present: bool, size: Optional[int] = None) -> None:
+    """Keep `r2_objects` in step with a write (`present=True`) or delete made by this process."""
+    global _RECORD_WARNED
+    if os.getenv("R2_EXISTS_MODE", "index").lower() != "index":
+        return
+    from shared.postgres import get_connection
+
+    try:
+        with get_connection() as conn, conn.cursor() as cur:
+            if present:
+                cur.execute(
+                    """
+                    INSERT INTO r2_objects (key, size, last_modified)
+                    VALUES (%s, %s, timezone('utc', now()))
+                    ON CONFLICT (key) DO UPDATE SET
+                        size = EXCLUDED.size,
+                        last_modified = EXCLUDED.last_modified,
+                        synced_at = timezone('utc', now())
+                    """,
+                    (key, size),
+                )
+            else:
+                cur.execute("DELETE FROM r2_objects WHERE key = %s", (key,))
+            conn.commit()
+    except Exception as exc:
+        if not _RECORD_WARNED:
+            print(f"⚠️  Index R2 non mis à jour ({key}): {exc}")
+            _RECORD_WARNED = True
+
+
+class R2ExistenceIndex:
+    def __init__(self, mode: Optional[str] = None, confirm_misses: Optional[bool] = None):
+        self.mode = (mode or os.getenv("R2_EXISTS_MODE", "index")).lower()
+        if confirm_misses is None:
+            confirm_misses = os.getenv("R2_INDEX_CONFIRM_MISSES", "1") != "0"
+        self.confirm_misses = confirm_misses
+
+    def exists(self, raw_path: Optional[str]) -> bool:
+        return self.exists_many([raw_path]).get(raw_path, False) if raw_path else False
+
+    def exists_many(self, raw_paths: Iterable[Optional[str]]) -> Dict[str, bool]:
+        """Existence of each non-empty path, keyed by path."""
+        paths = list(dict.fromkeys(path for path in raw_paths if path))
+        if not paths:
+            return {}
+        if self.mode == "db":
+            return {path: True for path in paths}
+        if self.mode == "head":
+            return self._probe(paths)
+
+        keys = {path: normalize_key(path) for path in paths}
+        try:
+            indexed = self._indexed_keys([key for key in keys.values() if key])
+        except Exception as exc:
+            print(f"⚠️  Index R2 indisponible, vérification par HEAD: {exc}")
+            return self._probe(paths)
+
+        found = {path: keys[path] in indexed for path in paths}
+        misses = [path for path, present in found.items() if not present and keys[path]]
+        if misses and self.confirm_misses:
+            confirmed = self._probe(misses)
+            found.update(confirmed)
+            self._remember([keys[path] for path, present in confirmed.items() if present])
+        return found
+
+    @staticmethod
+    def _indexed_keys(keys: list) -> set:
+        from shared.postgres import get_connection
+
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT key FROM r2_objects WHERE key = ANY(%s)", (keys,))
+            return {row["key"] for row in cur.fetchall()}
+
+    @staticmethod
+    def _remember(keys: list) -> None:
+        if not keys:
+            return
+        from shared.postgres import get_connection
+
+        try:
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO r2_objects (key)
+                    SELECT unnest(%s::text[])
+                    ON CONFLICT (key) DO NOTHING
+                    """,
+                    (keys,),
+                )
+                conn.commit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _probe(paths: list) -> Dict[str, bool]:
+        reader = get_r2_reader()
+        if len(paths) == 1:
+            return {paths[0]: reader.exists(paths[0])}
+        with ThreadPoolExecutor(max_workers=min(reader.concurrency, len(paths))) as pool:
+            return dict(zip(paths, pool.map(reader.exists, paths)))
+
+
+@lru_cache
+def get_r2_index() -> R2ExistenceIndex:
+    return R2ExistenceIndex()
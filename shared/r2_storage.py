@@ -7,15 +7,44 @@ boto3 client that can be reused to generate presigned URLs or upload
 objects during harvesting.
 
 Unified version combining AA and BB implementations.
+
+Presigned GET URLs are signed locally (SigV4 query signing with cached
+signing keys, no boto3 call) and cached per (key, expiry) for a time
+window: every URL is signed at the start of its window
+(`R2_PRESIGN_WINDOW` seconds, default 900) and stays valid for
+`expires_in` plus one window, so a cached URL always has at least
+`expires_in` seconds left and identical rows reuse the same URL.
+`R2_PRESIGN_SIGNER=boto3` restores the boto3 signer (still cached).
+
+Reads go through one pooled `R2Reader` (`get_r2_reader()`): keep-alive
+connections (`R2_POOL_SIZE`), `get_many` fan-out bounded by
+`R2_READ_CONCURRENCY`, optional byte ranges, retries with jittered
+exponential backoff on network errors / 429 / 5xx (`R2_READ_RETRIES`) and
+per-call latency metrics (`R2Reader.stats()`). Whole-object reads are
+served through the host-wide disk cache of `shared.r2_cache` (ETag
+revalidation, LRU size bound), which uploads and deletes made here
+invalidate.
 """
 
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Optional
+from typing import BinaryIO, Dict, Iterable, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlsplit
 
-import boto3
+PRESIGN_WINDOW = int(os.getenv("R2_PRESIGN_WINDOW", "900"))
+PRESIGN_CACHE_SIZE = int(os.getenv("R2_PRESIGN_CACHE_SIZE", "50000"))
+PRESIGN_MAX_EXPIRES = 7 * 24 * 3600
+R2_REGION = "auto"
 
 
 class R2ConfigurationError(RuntimeError):
@@ -31,13 +60,15 @@ def _get_env(name: str, required: bool = True) -> Optional[str]:
     return value
 
 
+class R2Credentials(NamedTuple):
+    access_key: str
+    secret_key: str
+    endpoint: str
+
+
 @lru_cache
-def get_r2_client():
-    """
-    Lazily build and cache a boto3 client configured for Cloudflare R2.
-    The region is always `auto`, but the endpoint must include the
-    account identifier (e.g. https://<account-id>.r2.cloudflarestorage.com).
-    """
+def get_r2_credentials() -> R2Credentials:
+    """Access keys and S3 endpoint of the bucket account."""
     account_id = _get_env("HARVESTER_R2_ACCOUNT_ID")
     access_key = _get_env("HARVESTER_R2_ACCESS_KEY_ID")
     secret_key = _get_env("HARVESTER_R2_SECRET_ACCESS_KEY")
@@ -45,25 +76,34 @@ def get_r2_client():
         "HARVESTER_R2_S3_ENDPOINT",
         f"https://{account_id}.r2.cloudflarestorage.com",
     )
+    return R2Credentials(access_key, secret_key, endpoint.rstrip("/"))
+
 
+@lru_cache
+def get_r2_client():
+    """
+    Lazily build and cache a boto3 client configured for Cloudflare R2.
+    The region is always `auto`, but the endpoint must include the
+    account identifier (e.g. https://<account-id>.r2.cloudflarestorage.com).
+    """
+    import boto3
+
+    credentials = get_r2_credentials()
     return boto3.client(
         "s3",
-        region_name="auto",
-        endpoint_url=endpoint,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
+        region_name=R2_REGION,
+        endpoint_url=credentials.endpoint,
+        aws_access_key_id=credentials.access_key,
+        aws_secret_access_key=credentials.secret_key,
     )
 
 
-@lru_cache
 def get_r2_session():
     """
     Retourne une session HTTP réutilisable pour R2 (boto3 non requis ici).
-    Utile pour les téléchargements parallèles d'embeddings.
+    Il s'agit de la session poolée du lecteur partagé (`get_r2_reader`).
     """
-    import requests
-    sess = requests.Session()
-    return sess
+    return get_r2_reader().session
 
 
 def get_bucket_name() -> str:
@@ -150,14 +190,96 @@ def url_to_key(url: str) -> str:
     return relative
 
 
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+@lru_cache(maxsize=8)
+def _signing_key(secret_key: str, datestamp: str, region: str, service: str = "s3") -> bytes:
+    key = f"AWS4{secret_key}".encode("utf-8")
+    for part in (datestamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    return key
+
+
+def presign_get_url(
+    endpoint: str,
+    bucket: str,
+    key: str,
+    access_key: str,
+    secret_key: str,
+    expires_in: int,
+    signed_at: datetime,
+    region: str = R2_REGION,
+) -> str:
+    """SigV4 query-string signature of a path-style GET (what boto3 produces, without boto3)."""
+    parts = urlsplit(endpoint)
+    host = parts.netloc
+    path = f"{parts.path.rstrip('/')}/{bucket}/{key}" if bucket else f"{parts.path.rstrip('/')}/{key}"
+    canonical_uri = _uri_encode(path, safe="-_.~/")
+    amz_date = signed_at.strftime("%Y%m%dT%H%M%SZ")
+    datestamp = amz_date[:8]
+    scope = f"{datestamp}/{region}/s3/aws4_request"
+    query = "&".join(
+        f"{_uri_encode(name)}={_uri_encode(value)}"
+        for name, value in sorted({
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(int(expires_in)),
+            "X-Amz-SignedHeaders": "host",
+        }.items())
+    )
+    canonical_request = f"GET\n{canonical_uri}\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+    string_to_sign = (
+        f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+        f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+    )
+    signature = hmac.new(
+        _signing_key(secret_key, datestamp, region), string_to_sign.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return f"{parts.scheme}://{host}{canonical_uri}?{query}&X-Amz-Signature={signature}"
+
+
+class PresignCache:
+    """Bounded LRU of signed URLs, each valid for the window it was signed in."""
+
+    def __init__(self, max_entries: int = PRESIGN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: tuple, window: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] != window:
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry[1]
+
+    def put(self, cache_key: tuple, window: int, url: str) -> None:
+        with self._lock:
+            self._entries[cache_key] = (window, url)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_PRESIGN_CACHE = PresignCache()
+
+
 def generate_presigned_url(raw_path: Optional[str], expires_in: int = 3600) -> Optional[str]:
     """
     Generate a presigned download URL for an object stored in R2.
-    If the environment lacks credentials, this function returns None so
-    that the caller can fall back to the public URL instead.
+    If the environment lacks credentials, the public URL is returned
+    instead. URLs are cached per expiry window (see module docstring).
     """
     try:
-        client = get_r2_client()
+        credentials = get_r2_credentials()
         bucket = get_bucket_name()
     except R2ConfigurationError:
         return build_public_url(raw_path)
@@ -166,11 +288,34 @@ def generate_presigned_url(raw_path: Optional[str], expires_in: int = 3600) -> O
     if not key:
         return None
 
-    return client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": bucket, "Key": key},
-        ExpiresIn=expires_in,
-    )
+    now = time.time()
+    window = int(now // PRESIGN_WINDOW) if PRESIGN_WINDOW > 0 else int(now)
+    signed_at = window * PRESIGN_WINDOW if PRESIGN_WINDOW > 0 else now
+    lifetime = min(expires_in + max(PRESIGN_WINDOW, 0), PRESIGN_MAX_EXPIRES)
+
+    cache_key = (key, expires_in)
+    url = _PRESIGN_CACHE.get(cache_key, window)
+    if url is not None:
+        return url
+
+    if os.getenv("R2_PRESIGN_SIGNER", "local") == "boto3":
+        url = get_r2_client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=lifetime,
+        )
+    else:
+        url = presign_get_url(
+            credentials.endpoint,
+            bucket,
+            key,
+            credentials.access_key,
+            credentials.secret_key,
+            lifetime,
+            datetime.fromtimestamp(signed_at, tz=timezone.utc),
+        )
+    _PRESIGN_CACHE.put(cache_key, window, url)
+    return url
 
 
 def upload_bytes(key: str, data: bytes, content_type: Optional[str] = None) -> str:
@@ -184,6 +329,31 @@ def upload_bytes(key: str, data: bytes, content_type: Optional[str] = None) -> s
         extra["ContentType"] = content_type
 
     client.put_object(Bucket=bucket, Key=key, Body=data, **extra)
+    _after_write(key, True, len(data))
+    return f"{get_base_url()}/{key.lstrip('/')}"
+
+
+def upload_stream(
+    key: str,
+    fileobj: BinaryIO,
+    content_type: Optional[str] = None,
+    chunk_size: int = 8 * 1024 * 1024,
+) -> str:
+    """
+    Stream a file-like object to R2 (multipart above `chunk_size`) without
+    holding the whole body in memory, and return the public URL.
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    client = get_r2_client()
+    bucket = get_bucket_name()
+    extra: dict = {}
+    if content_type:
+        extra["ContentType"] = content_type
+
+    config = TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size, use_threads=False)
+    client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra or None, Config=config)
+    _after_write(key, True)
     return f"{get_base_url()}/{key.lstrip('/')}"
 
 
@@ -200,8 +370,206 @@ def delete_object(raw_path: Optional[str]) -> bool:
         client = get_r2_client()
         bucket = get_bucket_name()
         client.delete_object(Bucket=bucket, Key=key)
+        _after_write(key, False)
         return True
     except R2ConfigurationError:
         return False
     except Exception:
         return False
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@lru_cache
+def _disk_cache():
+    """Host-wide read-through cache (shared.r2_cache), None when `R2_CACHE_MAX_MB=0`."""
+    from shared.r2_cache import R2DiskCache
+
+    cache = R2DiskCache()
+    return cache if cache.enabled else None
+
+
+def _invalidate_cached(raw_path: Optional[str]) -> None:
+    key = normalize_key(raw_path)
+    cache = _disk_cache()
+    if cache is not None and key:
+        cache.invalidate(key)
+
+
+def _after_write(key: str, present: bool, size: Optional[int] = None) -> None:
+    """Drop the local cached copy and update the existence index (shared.r2_index) for `key`."""
+    from shared.r2_index import record_key
+
+    _invalidate_cached(key)
+    record_key(normalize_key(key) or key, present, size)
+
+
+def _slice(body: bytes, byte_range: Optional[Tuple[int, Optional[int]]]) -> bytes:
+    if byte_range is None:
+        return body
+    start, end = byte_range
+    return body[start:None if end is None else end + 1]
+
+
+class R2Reader:
+    """
+    Pooled reader for bucket objects (presigned GET through a keep-alive
+    session). Missing objects (403/404) return None without retrying.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        retries: Optional[int] = None,
+        timeout: float = 60.0,
+        backoff: float = 0.25,
+    ):
+        from shared.http_client import build_session
+
+        self.pool_size = pool_size or int(os.getenv("R2_POOL_SIZE", "32"))
+        self.concurrency = max(concurrency or int(os.getenv("R2_READ_CONCURRENCY", "16")), 1)
+        self.retries = int(os.getenv("R2_READ_RETRIES", "3")) if retries is None else retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.session = build_session(self.pool_size, "DocHarvester/1.0")
+        self.cache = _disk_cache()
+        self._latencies: deque = deque(maxlen=2048)
+        self._counters = {"calls": 0, "errors": 0, "retries": 0, "missing": 0, "bytes": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def url(raw_path: Optional[str]) -> Optional[str]:
+        if not raw_path:
+            return None
+        try:
+            return generate_presigned_url(raw_path) or build_public_url(raw_path)
+        except R2ConfigurationError:
+            return None
+
+    def _record(self, started: float, **counters: int) -> None:
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+            self._counters["calls"] += 1
+            for name, value in counters.items():
+                self._counters[name] += value
+
+    def _request(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        timeout: Optional[float],
+    ) -> Tuple[Optional[int], Optional[bytes], Optional[str]]:
+        """(status, body, etag) of a GET retried on transient failures; status None when unreachable."""
+        started = time.perf_counter()
+        retried = 0
+        while True:
+            try:
+                with self.session.get(url, headers=headers, timeout=timeout or self.timeout) as resp:
+                    status = resp.status_code
+                    if status in (200, 206):
+                        body = resp.content
+                        self._record(started, retries=retried, bytes=len(body))
+                        return status, body, resp.headers.get("ETag")
+                if status == 304:
+                    self._record(started, retries=retried)
+                    return status, None, None
+                if status not in RETRY_STATUSES:
+                    self._record(started, retries=retried, missing=1)
+                    return status, None, None
+            except Exception:
+                pass
+            if retried >= self.retries:
+                self._record(started, retries=retried, errors=1)
+                return None, None, None
+            time.sleep(self.backoff * (2 ** retried) * (0.5 + random.random()))
+            retried += 1
+
+    def get(
+        self,
+        raw_path: Optional[str],
+        byte_range: Optional[Tuple[int, Optional[int]]] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[bytes]:
+        """Object body (or `byte_range=(start, end)` inclusive slice), None if absent or unreachable."""
+        key = normalize_key(raw_path) if raw_path else None
+        cached = self.cache.lookup(key) if self.cache and key else None
+        if cached is not None and cached.fresh:
+            return _slice(cached.body, byte_range)
+
+        url = self.url(raw_path)
+        if not url:
+            return None
+        headers: Dict[str, str] = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        elif byte_range is not None:
+            start, end = byte_range
+            headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+        status, body, etag = self._request(url, headers, timeout)
+        if status == 304 and cached is not None:
+            self.cache.revalidated(key, cached)
+            return _slice(cached.body, byte_range)
+        if status == 200 and self.cache and key:
+            self.cache.store(key, body, etag)
+            return _slice(body, byte_range)
+        if status == 304:
+            return None
+        return body
+
+    def get_text(self, raw_path: Optional[str], timeout: Optional[float] = None) -> Optional[str]:
+        body = self.get(raw_path, timeout=timeout)
+        return body.decode("utf-8", errors="replace") if body is not None else None
+
+    def get_many(
+        self,
+        raw_paths: Iterable[Optional[str]],
+        byte_range: Optional[Tuple[int, Optional[int]]] = None,
+    ) -> Dict[str, Optional[bytes]]:
+        """Fetch several objects in parallel (at most `concurrency` in flight); keyed by path."""
+        unique = list(dict.fromkeys(path for path in raw_paths if path))
+        if not unique:
+            return {}
+        if len(unique) == 1:
+            return {unique[0]: self.get(unique[0], byte_range)}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(unique))) as pool:
+            bodies = pool.map(lambda path: self.get(path, byte_range), unique)
+            return dict(zip(unique, bodies))
+
+    def exists(self, raw_path: Optional[str]) -> bool:
+        """HEAD on the object; buckets refusing HEAD (403) are probed with a 1-byte range GET."""
+        url = self.url(raw_path)
+        if not url:
+            return False
+        started = time.perf_counter()
+        try:
+            with self.session.head(url, timeout=10) as resp:
+                status = resp.status_code
+            if status == 403:
+                with self.session.get(url, headers={"Range": "bytes=0-0"}, timeout=10) as resp:
+                    status = 200 if resp.status_code in (200, 206) else resp.status_code
+        except Exception:
+            self._record(started, errors=1)
+            return False
+        self._record(started, missing=int(status != 200))
+        return status == 200
+
+    def stats(self) -> Dict[str, float]:
+        """Counters and latency percentiles (ms) over the last calls."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats: Dict[str, float] = dict(self._counters)
+        if latencies:
+            stats["p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats["p95_ms"] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 1)
+        if self.cache is not None:
+            stats.update({f"cache_{name}": value for name, value in self.cache.stats().items()})
+        return stats
+
+
+@lru_cache
+def get_r2_reader() -> R2Reader:
+    """Process-wide pooled reader."""
+    return R2Reader()